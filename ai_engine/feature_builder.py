@@ -0,0 +1,134 @@
+"""
+Incremental Feature Builder
+Running per-player state updated in O(1) per completed match, so features for
+match N only cost what match N adds (no re-scan of a player's career):
+- recent results ring buffer (last FORM_HISTORY, newest read first)
+- per-surface played/won counters, keyed by normalize_surface (so "clay",
+  "Clay" and "Indoor Hard" group as CLAY / INDOOR; missing or unknown -> HARD)
+- per-surface time-decayed win rate (half-life DECAY_HALF_LIFE_DAYS)
+- pairwise H2H win counters
+
+Matches must be applied in chronological order. Shared by the training
+pipelines (pre-match snapshot, then update) and live inference (FeatureStore).
+"""
+import math
+from functools import partial
+from collections import defaultdict, deque
+from datetime import datetime
+
+FORM_HISTORY = 10            # Longest form window any model uses
+DECAY_HALF_LIFE_DAYS = 180
+NEUTRAL = 0.5                # Rate reported when there is no history
+SURFACES = ('HARD', 'CLAY', 'GRASS', 'INDOOR', 'CARPET')
+
+def normalize_surface(surface):
+    """
+    "Hard" / "clay" / "Indoor Hard" -> HARD / CLAY / INDOOR (unknown -> HARD).
+    """
+    s = str(surface or 'Hard').strip().upper()
+    if 'INDOOR' in s:
+        return 'INDOOR'
+    return s if s in SURFACES else 'HARD'
+
+def _to_datetime(value):
+    """
+    Naive datetime from datetime / pandas Timestamp / ISO string (None if unparseable).
+    """
+    if value is None:
+        return None
+    if hasattr(value, 'to_pydatetime'): # pandas Timestamp
+        value = value.to_pydatetime()
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value)[:19])
+        except ValueError:
+            return None
+    return value.replace(tzinfo=None)
+
+class SurfaceStats:
+    __slots__ = ('played', 'wins', 'decayed_wins', 'decayed_played', 'last_date')
+
+    def __init__(self):
+        self.played = 0
+        self.wins = 0
+        self.decayed_wins = 0.0
+        self.decayed_played = 0.0
+        self.last_date = None
+
+def _win_counter():
+    return defaultdict(int)
+
+class FeatureBuilder:
+    # No lambdas in the state: builders are pickled with cached feature matrices
+    def __init__(self, form_history=FORM_HISTORY, half_life_days=DECAY_HALF_LIFE_DAYS):
+        self.recent = defaultdict(partial(deque, maxlen=form_history)) # player -> 1/0, oldest first
+        self.surface = defaultdict(SurfaceStats)                        # (player, surface) -> stats
+        self.h2h = defaultdict(_win_counter)                            # frozenset(p1, p2) -> {winner: wins}
+        self.played = defaultdict(int)
+        self.decay_rate = math.log(2) / half_life_days
+
+    # --- Update (post-match) ---
+
+    def update(self, p1, p2, winner, surface=None, date=None):
+        surf = normalize_surface(surface)
+        when = _to_datetime(date)
+        for pid in (p1, p2):
+            won = 1 if winner == pid else 0
+            self.recent[pid].append(won)
+            self.played[pid] += 1
+
+            st = self.surface[(pid, surf)]
+            if when is not None and st.last_date is not None:
+                days = max(0.0, (when - st.last_date).total_seconds() / 86400.0)
+                factor = math.exp(-self.decay_rate * days)
+                st.decayed_wins *= factor
+                st.decayed_played *= factor
+            st.decayed_wins += won
+            st.decayed_played += 1
+            st.played += 1
+            st.wins += won
+            if when is not None:
+                st.last_date = when
+        self.h2h[frozenset([p1, p2])][winner] += 1
+
+    # --- Reads (pre-match) ---
+
+    def form(self, player, window=5):
+        """
+        Results of the last `window` matches, newest first.
+        """
+        results = list(self.recent.get(player, ()))[-window:]
+        results.reverse()
+        return results
+
+    def form_rate(self, player, window=5, default=NEUTRAL):
+        results = self.form(player, window)
+        return sum(results) / len(results) if results else default
+
+    def surface_rate(self, player, surface, default=NEUTRAL):
+        st = self.surface.get((player, normalize_surface(surface)))
+        return st.wins / st.played if st and st.played else default
+
+    def surface_decayed_rate(self, player, surface, default=NEUTRAL):
+        """
+        Recency-weighted win rate on a surface (older results count less).
+        """
+        st = self.surface.get((player, normalize_surface(surface)))
+        return st.decayed_wins / st.decayed_played if st and st.decayed_played else default
+
+    def surface_played(self, player, surface):
+        st = self.surface.get((player, normalize_surface(surface)))
+        return st.played if st else 0
+
+    def h2h_counts(self, p1, p2):
+        wins = self.h2h.get(frozenset([p1, p2]), {})
+        p1_wins = wins.get(p1, 0)
+        total = p1_wins + wins.get(p2, 0)
+        return {"total": total, "p1_wins": p1_wins, "p2_wins": total - p1_wins}
+
+    def h2h_rate(self, p1, p2, default=NEUTRAL):
+        h2h = self.h2h_counts(p1, p2)
+        return h2h['p1_wins'] / h2h['total'] if h2h['total'] else default
+
+    def matches_played(self, player):
+        return self.played.get(player, 0)
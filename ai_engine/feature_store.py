@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from ai_engine.feature_builder import FeatureBuilder
+
+FORM_WINDOW = 5          # Same window as StatsEngine.get_player_recent_form
+REFRESH_INTERVAL = 60    # Seconds between incremental pulls of new results
+PAGE_SIZE = 1000
+
+class FeatureStore:
+    """
+    Process-resident player features for inference, kept in a FeatureBuilder
+    (the same incremental state the training pipelines use):
+    - recent results, per-surface counters and decayed win rates
+    - pairwise H2H win counters
+    Built once from match history, then kept current by pulling results
+    newer than the watermark (or by pushing them with add_matches).
+    Answers the same shapes as StatsEngine.get_player_recent_form / get_h2h_stats.
+    """
+    def __init__(self, db, form_window=FORM_WINDOW, refresh_interval=REFRESH_INTERVAL):
+        self.db = db
+        self.form_window = form_window
+        self.refresh_interval = refresh_interval
+        self.builder = FeatureBuilder()
+        self.versions = defaultdict(int) # player_id -> bumps on every new result
+        self.seen_ids = set()
+        self.watermark = None
+        self.last_refresh = 0.0
+        self.lock = threading.RLock()
+
+    # --- Building / updating ---
+
+    def _fetch_completed(self, since=None):
+        endpoint = f"{self.db.url}/rest/v1/matches"
+        params = {
+            "select": "id,player1_id,player2_id,winner_id,date,surface",
+            "winner_id": "not.is.null",
+            "order": "date.asc,id.asc"
+        }
+        if since:
+            params["date"] = f"gte.{since}"
+
+        rows = []
+        offset = 0
+        while True:
+            page_params = dict(params, limit=str(PAGE_SIZE), offset=str(offset))
+            r = self.db._request_with_retry('get', endpoint, params=page_params)
+            if not r or r.status_code != 200:
+                print(f"  [FeatureStore] Fetch failed: {r.text if r else 'No resp'}")
+                break
+            page = r.json()
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return rows
+
+    def add_matches(self, matches):
+        """
+        Apply completed matches in chronological order. Already seen ids are ignored,
+        so overlapping pulls are safe. Returns how many were applied.
+        """
+        applied = 0
+        with self.lock:
+            for m in matches:
+                p1, p2, winner = m.get('player1_id'), m.get('player2_id'), m.get('winner_id')
+                if not p1 or not p2 or not winner:
+                    continue
+                if m.get('id'):
+                    if m['id'] in self.seen_ids:
+                        continue
+                    self.seen_ids.add(m['id'])
+
+                self.builder.update(p1, p2, winner, m.get('surface'), m.get('date'))
+                self.versions[p1] += 1
+                self.versions[p2] += 1
+
+                if m.get('date') and (self.watermark is None or str(m['date']) > self.watermark):
+                    self.watermark = str(m['date'])
+                applied += 1
+        return applied
+
+    def load_history(self):
+        started = time.time()
+        rows = self._fetch_completed()
+        applied = self.add_matches(rows)
+        self.last_refresh = time.time()
+        print(f"  [FeatureStore] Built from {applied} matches, {len(self.builder.played)} players in {time.time() - started:.1f}s")
+        return applied
+
+    def refresh(self):
+        """
+        Pull results on/after the watermark. Matches backfilled with older dates
+        are only picked up by a rebuild (load_history on a fresh store).
+        """
+        rows = self._fetch_completed(since=self.watermark)
+        self.last_refresh = time.time()
+        return self.add_matches(rows)
+
+    def maybe_refresh(self):
+        if time.time() - self.last_refresh >= self.refresh_interval:
+            try:
+                applied = self.refresh()
+                if applied:
+                    print(f"  [FeatureStore] +{applied} new results (watermark {self.watermark})")
+            except Exception as e:
+                print(f"  [FeatureStore] Refresh error: {e}")
+
+    # --- Lookups ---
+
+    def recent_form(self, player_id):
+        with self.lock:
+            results = self.builder.form(player_id, self.form_window)
+        wins = sum(results)
+        return {
+            "matches_played": len(results),
+            "wins": wins,
+            "win_rate": (wins / len(results)) if results else 0.0,
+            "streak_data": results
+        }
+
+    def version(self, player_id):
+        """
+        Changes whenever the player's features change (cache invalidation key).
+        """
+        with self.lock:
+            return self.versions.get(player_id, 0)
+
+    def h2h_stats(self, p1_id, p2_id):
+        with self.lock:
+            return self.builder.h2h_counts(p1_id, p2_id)
+
+    def surface_form(self, player_id, surface):
+        with self.lock:
+            played = self.builder.surface_played(player_id, surface)
+            win_rate = self.builder.surface_rate(player_id, surface, default=0.0)
+            return {
+                "matches_played": played,
+                "wins": round(win_rate * played),
+                "win_rate": win_rate,
+                "decayed_win_rate": self.builder.surface_decayed_rate(player_id, surface, default=0.0)
+            }
+
+    def stats(self):
+        return {
+            "players": len(self.builder.played),
+            "pairs": len(self.builder.h2h),
+            "matches": len(self.seen_ids),
+            "watermark": self.watermark,
+            "last_refresh": datetime.fromtimestamp(self.last_refresh).isoformat() if self.last_refresh else None
+        }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_feature_store(db=None):
+    """
+    Process-wide store, built from history on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if db is None:
+                from scrapers.db_client import get_db_client
+                db = get_db_client()
+            _store = FeatureStore(db)
+            _store.load_history()
+    return _store
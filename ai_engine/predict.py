@@ -24,15 +24,36 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from scrapers.db_client import get_db_client
+from ai_engine.feature_builder import normalize_surface
+
+# Heuristic weights (also used by the vectorized copy in ml/ensemble.py)
+H2H_WEIGHT = 0.3
+FORM_WEIGHT = 0.4
+SCORE_BOUNDS = (0.1, 0.9)
+
+ID_CHUNK = 100 # Player ids per in.(...) filter (URL length), as in EloEngine.get_ratings_bulk
+WRITE_CHUNK = 500 # {id, prediction} rows per set_match_predictions call
 
 class StatsEngine:
-    def __init__(self, db):
+    def __init__(self, db, feature_store=None):
         self.db = db
+        # Optional in-memory FeatureStore (ai_engine/feature_store.py): form and
+        # H2H are then answered from memory instead of querying matches.
+        self.feature_store = feature_store
+
+    def _from_store(self, limit=5):
+        return self.feature_store is not None and limit == self.feature_store.form_window
 
-    def get_player_recent_form(self, player_id, limit=5):
+    def get_player_recent_form(self, player_id, limit=5, surface=None):
         """
         Fetch last N matches for a player to calculate win rate.
+        With `surface`, only matches on that surface count (the feature store
+        answers with the player's full surface record and decayed win rate).
         """
+        if surface and self.feature_store is not None:
+            return self.feature_store.surface_form(player_id, surface)
+        if not surface and self._from_store(limit):
+            return self.feature_store.recent_form(player_id)
         try:
             # We need to query matches where player was p1 OR p2 involved. 
             # Supabase REST doesn't support thorough OR queries easily in one GET param 
@@ -44,6 +65,8 @@ class StatsEngine:
             # We want completed matches (winner_id not null)
             # order by date desc
             endpoint = f"{self.db.url}/rest/v1/matches?select=*&{query}&winner_id=not.is.null&order=date.desc&limit={limit}"
+            if surface:
+                endpoint += f"&surface=ilike.*{normalize_surface(surface).lower()}*"
             
             r = self.db._request_with_retry('get', endpoint)
             if r and r.status_code == 200:
@@ -66,6 +89,8 @@ class StatsEngine:
         """
         Fetch past matches between p1 and p2.
         """
+        if self.feature_store is not None:
+            return self.feature_store.h2h_stats(p1_id, p2_id)
         try:
             # (p1=A AND p2=B) OR (p1=B AND p2=A)
             # Syntax: or=(and(player1_id.eq.A,player2_id.eq.B),and(player1_id.eq.B,player2_id.eq.A))
@@ -92,6 +117,122 @@ class StatsEngine:
             print(f"  [Stats] H2H error: {e}")
         return {"total": 0, "p1_wins": 0, "p2_wins": 0}
 
+    def _fetch_pages(self, params, page_size=1000, stop=None):
+        """
+        Paged GET on matches (PostgREST caps rows per response).
+        `stop(rows_so_far)` lets callers end early once they have enough.
+        """
+        endpoint = f"{self.db.url}/rest/v1/matches"
+        rows = []
+        offset = 0
+        while True:
+            page_params = dict(params, limit=str(page_size), offset=str(offset))
+            r = self.db._request_with_retry('get', endpoint, params=page_params)
+            if not r or r.status_code != 200:
+                print(f"  [Stats] Bulk fetch failed: {r.text if r else 'No resp'}")
+                break
+            page = r.json()
+            rows.extend(page)
+            if len(page) < page_size or (stop and stop(rows)):
+                break
+            offset += page_size
+        return rows
+
+    def get_recent_forms_bulk(self, player_ids, limit=5):
+        """
+        Recent form for many players from paged, date-ordered scans
+        (one per ID_CHUNK players). Same output per player as get_player_recent_form.
+        """
+        ids = sorted(set(player_ids))
+        if self._from_store(limit):
+            return {pid: self.feature_store.recent_form(pid) for pid in ids}
+        history = {pid: [] for pid in ids}
+        if not ids:
+            return {}
+
+        for i in range(0, len(ids), ID_CHUNK):
+            chunk = ids[i:i + ID_CHUNK]
+            id_list = ','.join(chunk)
+            params = {
+                "select": "player1_id,player2_id,winner_id,date",
+                "or": f"(player1_id.in.({id_list}),player2_id.in.({id_list}))",
+                "winner_id": "not.is.null",
+                "order": "date.desc"
+            }
+            wanted = set(chunk)
+
+            def consume(rows):
+                for m in rows[consume.seen:]:
+                    for pid in (m.get('player1_id'), m.get('player2_id')):
+                        if pid in wanted and len(history[pid]) < limit:
+                            history[pid].append(m)
+                consume.seen = len(rows)
+                return all(len(history[pid]) >= limit for pid in wanted)
+            consume.seen = 0
+
+            try:
+                rows = self._fetch_pages(params, stop=consume)
+                consume(rows)
+            except Exception as e:
+                print(f"  [Stats] Bulk form error: {e}")
+
+        forms = {}
+        for pid, matches in history.items():
+            wins = sum(1 for m in matches if m.get('winner_id') == pid)
+            forms[pid] = {
+                "matches_played": len(matches),
+                "wins": wins,
+                "win_rate": (wins / len(matches)) if matches else 0.0,
+                "streak_data": [1 if m.get('winner_id') == pid else 0 for m in matches]
+            }
+        return forms
+
+    def get_h2h_bulk(self, pairs):
+        """
+        H2H for many pairs: one query per group of pairs covering at most
+        ID_CHUNK players (both sides in the group's id list).
+        Returns {(p1, p2): {total, p1_wins, p2_wins}} keyed as requested.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        if self.feature_store is not None:
+            return {(p1, p2): self.feature_store.h2h_stats(p1, p2) for p1, p2 in pairs}
+        counts = {frozenset(p): {} for p in pairs}
+
+        groups, current = [], set()
+        for pair in dict.fromkeys(frozenset(p) for p in pairs):
+            if current and len(current | pair) > ID_CHUNK:
+                groups.append(current)
+                current = set()
+            current |= pair
+        if current:
+            groups.append(current)
+
+        seen = set() # A match can come back for several groups
+        for players in groups:
+            id_list = ','.join(sorted(players))
+            params = {
+                "select": "id,player1_id,player2_id,winner_id",
+                "player1_id": f"in.({id_list})",
+                "player2_id": f"in.({id_list})",
+                "winner_id": "not.is.null"
+            }
+            try:
+                for m in self._fetch_pages(params):
+                    key = frozenset([m['player1_id'], m['player2_id']])
+                    if key in counts and m['id'] not in seen:
+                        seen.add(m['id'])
+                        counts[key][m['winner_id']] = counts[key].get(m['winner_id'], 0) + 1
+            except Exception as e:
+                print(f"  [Stats] Bulk H2H error: {e}")
+
+        result = {}
+        for p1, p2 in pairs:
+            wins = counts[frozenset([p1, p2])]
+            p1_wins = wins.get(p1, 0)
+            total = p1_wins + wins.get(p2, 0)
+            result[(p1, p2)] = {"total": total, "p1_wins": p1_wins, "p2_wins": total - p1_wins}
+        return result
+
     def predict_match(self, match):
         p1 = match['player1_id']
         p2 = match['player2_id']
@@ -103,6 +244,36 @@ class StatsEngine:
         form_p1 = self.get_player_recent_form(p1)
         form_p2 = self.get_player_recent_form(p2)
         
+        result = self._score(p1, p2, h2h, form_p1, form_p2)
+        # Surface record is informational (free with the in-memory store)
+        if self.feature_store is not None and match.get('surface'):
+            result['metrics']['surface_p1'] = self.get_player_recent_form(p1, surface=match['surface'])
+            result['metrics']['surface_p2'] = self.get_player_recent_form(p2, surface=match['surface'])
+        return result
+
+    def predict_matches(self, matches):
+        """
+        Batch version of predict_match: one paged form scan for the union
+        of players and one H2H query for all pairs, then scoring in memory.
+        Returns predictions in the same order as `matches`.
+        """
+        matches = [m for m in matches if m.get('player1_id') and m.get('player2_id')]
+        players = set()
+        pairs = []
+        for m in matches:
+            players.update([m['player1_id'], m['player2_id']])
+            pairs.append((m['player1_id'], m['player2_id']))
+
+        forms = self.get_recent_forms_bulk(players)
+        h2hs = self.get_h2h_bulk(pairs)
+
+        return [
+            self._score(m['player1_id'], m['player2_id'], h2hs[(m['player1_id'], m['player2_id'])],
+                        forms[m['player1_id']], forms[m['player2_id']])
+            for m in matches
+        ]
+
+    def _score(self, p1, p2, h2h, form_p1, form_p2):
         # 3. Scoring
         score_p1 = 0.5 # start even
         
@@ -112,7 +283,7 @@ class StatsEngine:
         if h2h['total'] > 0:
             h2h_rate = h2h['p1_wins'] / h2h['total']
             diff = h2h_rate - 0.5
-            score_p1 += (diff * 0.3)
+            score_p1 += (diff * H2H_WEIGHT)
             reasoning.append(f"H2H: P1 has {h2h['p1_wins']} wins in {h2h['total']} matches.")
         else:
             reasoning.append("H2H: No past matches.")
@@ -120,12 +291,12 @@ class StatsEngine:
         # Weight: Recent Form (40%)
         # Compare win rates
         form_diff = form_p1['win_rate'] - form_p2['win_rate']
-        score_p1 += (form_diff * 0.4)
+        score_p1 += (form_diff * FORM_WEIGHT)
         
         reasoning.append(f"Form: P1 {int(form_p1['win_rate']*100)}% ({form_p1['wins']}/{form_p1['matches_played']}) vs P2 {int(form_p2['win_rate']*100)}% ({form_p2['wins']}/{form_p2['matches_played']}).")
         
         # Clamp
-        score_p1 = max(0.1, min(0.9, score_p1))
+        score_p1 = max(SCORE_BOUNDS[0], min(SCORE_BOUNDS[1], score_p1))
         
         predicted_winner = p1 if score_p1 >= 0.5 else p2
         confidence = score_p1 if score_p1 >= 0.5 else (1.0 - score_p1)
@@ -157,7 +328,7 @@ def predict_upcoming_matches():
         # Fetch matches where prediction is NULL
         # And date >= today
         today = datetime.now().strftime("%Y-%m-%d")
-        endpoint = f"{db.url}/rest/v1/matches?date=gte.{today}&select=id,player1_id,player2_id,prediction&prediction=is.null"
+        endpoint = f"{db.url}/rest/v1/matches?date=gte.{today}&select=id,player1_id,player2_id&prediction=is.null"
         
         r = db._request_with_retry('get', endpoint)
         if not r or r.status_code != 200:
@@ -166,19 +337,25 @@ def predict_upcoming_matches():
             
         matches = r.json()
         print(f"  [AI] Found {len(matches)} matches needing prediction.")
+        matches = [m for m in matches if m.get('player1_id') and m.get('player2_id')]
+        if not matches:
+            return
         
-        for m in matches:
-            print(f"  Predicting Match {m['id']}...")
-            prediction = engine.predict_match(m)
-            
-            # Save Prediction
-            patch_endpoint = f"{db.url}/rest/v1/matches?id=eq.{m['id']}"
-            r_patch = db._request_with_retry('patch', patch_endpoint, json={"prediction": prediction})
-            
-            if r_patch and r_patch.status_code in [200, 204]:
-                print(f"    -> Predicted Winner: {prediction['winner_id']} (Conf: {prediction['confidence']})")
+        predictions = engine.predict_matches(matches)
+        
+        # Save only the prediction column (ingest may have written score/winner meanwhile),
+        # one RPC per chunk (database/fn_match_predictions.sql)
+        rows = [{"id": m['id'], "prediction": p} for m, p in zip(matches, predictions)]
+        saved = 0
+        for i in range(0, len(rows), WRITE_CHUNK):
+            chunk = rows[i:i + WRITE_CHUNK]
+            r_rpc = db._request_with_retry('post', f"{db.url}/rest/v1/rpc/set_match_predictions", json={"rows": chunk})
+            if r_rpc and r_rpc.status_code == 200:
+                saved += r_rpc.json()
             else:
-                print(f"    -> Update Failed: {r_patch.text if r_patch else 'No resp'}")
+                print(f"    -> Update failed for {len(chunk)} matches: {r_rpc.text if r_rpc else 'No resp'}")
+        
+        print(f"  [AI] Saved {saved}/{len(matches)} predictions.")
                 
     except Exception as e:
         print(f"  [AI] Critical Error: {e}")
@@ -10,5 +10,12 @@ class PredictRequest(BaseModel):
     player2_id: str
 
 @router.post("/predict")
-def predict_matchup(req: PredictRequest):
-    return service.predict_matchup(req.player1_id, req.player2_id)
+async def predict_matchup(req: PredictRequest):
+    return await service.predict_matchup_async(req.player1_id, req.player2_id)
+
+@router.get("/metrics")
+def inference_metrics():
+    """
+    Micro-batcher queue depth, batch sizes and latency percentiles.
+    """
+    return service.metrics()
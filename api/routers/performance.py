@@ -1,5 +1,7 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Query
 from api.services.performance_service import PerformanceService
+from metrics.calibration import get_calibration_monitor
 
 router = APIRouter(prefix="/performance", tags=["Performance"])
 service = PerformanceService()
@@ -7,3 +9,14 @@ service = PerformanceService()
 @router.get("/summary")
 def get_performance_summary():
     return service.get_performance_summary()
+
+@router.get("/calibration")
+def get_calibration(
+    model_version: Optional[str] = Query(None, description="Only this model version"),
+    surface: Optional[str] = Query(None, description="HARD, CLAY, GRASS, INDOOR, CARPET or UNKNOWN")
+):
+    """
+    Reliability bins, Brier, log loss and drift flags of resolved ledger predictions,
+    per model version and surface.
+    """
+    return get_calibration_monitor().report(model_version, surface)
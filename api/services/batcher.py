@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+# Tunables (env overrides)
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+LATENCY_WINDOW = 1000 # Recent requests kept for percentiles
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to `max_wait_ms` (or `max_batch` items),
+    scores them with one call to `score_fn(items) -> results` (run in a worker
+    thread, it may block on I/O) and resolves each caller with its own result.
+    """
+    def __init__(self, score_fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self.worker = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"requests": 0, "batches": 0, "errors": 0}
+
+    def _ensure_worker(self):
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        self.counters['requests'] += 1
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._dispatch(batch)
+            except Exception as e:
+                # Never let one bad batch stop the worker: queued and future callers would hang
+                print(f"  [Batcher] Dispatch error: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _dispatch(self, batch):
+        items = [b[0] for b in batch]
+        try:
+            results = await asyncio.to_thread(self.score_fn, items)
+            if results is None or len(results) != len(items):
+                raise RuntimeError(f"score_fn returned {len(results) if results is not None else None} results for {len(items)} items")
+            error = None
+        except Exception as e:
+            results, error = None, e
+            self.counters['errors'] += 1
+            print(f"  [Batcher] Batch of {len(items)} failed: {e}")
+
+        done_at = time.perf_counter()
+        for i, (_, future, queued_at) in enumerate(batch):
+            self.latencies.append(done_at - queued_at)
+            if future.done(): # Caller went away
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+        self.counters['batches'] += 1
+        self.batch_sizes.append(len(batch))
+
+    def metrics(self):
+        lat = sorted(self.latencies)
+
+        def pct(p):
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2) if lat else None
+
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            **self.counters,
+            "avg_batch_size": round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else None,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)}
+        }
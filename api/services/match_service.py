@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 from scrapers.db_client import get_db_client
+from ml.slate import slate_to_prediction
 
 class MatchService:
     def __init__(self):
@@ -35,6 +36,9 @@ class MatchService:
             response = query.execute()
             data = response.data if response.data else []
             
+            # Materialized slate predictions (one query for the page)
+            slate = self.get_slate_rows([m['id'] for m in data])
+            
             # Today's date for status detection
             today = datetime.now().strftime('%Y-%m-%d')
             
@@ -74,7 +78,7 @@ class MatchService:
                         "ranking": m['player_b'].get('rank_single', 999) if m.get('player_b') else 999
                     },
                     "winner_id": m.get('winner_id'),
-                    "prediction": m.get('prediction')
+                    "prediction": slate_to_prediction(slate[m['id']], m['player1_id']) if m['id'] in slate else m.get('prediction')
                 })
                 
             return results
@@ -83,6 +87,16 @@ class MatchService:
             return []
 
 
+    def get_slate_rows(self, match_ids):
+        if not match_ids:
+            return {}
+        try:
+            response = self.db.from_('slate_predictions').select('*').in_('match_id', match_ids).execute()
+            return {row['match_id']: row for row in (response.data or [])}
+        except Exception as e:
+            print(f"[API Error] get_slate_rows: {e}")
+            return {}
+
     def get_match_details(self, match_id: str):
         try:
             query = self.db.from_('matches') \
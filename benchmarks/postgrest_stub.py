@@ -0,0 +1,357 @@
+"""
+Local PostgREST Stand-in
+In-memory tables behind a threaded HTTP server that speaks the subset of the
+PostgREST dialect this repo uses (scrapers/db_client.py and the engines that
+build URLs by hand), so the benchmarks hit real HTTP + JSON round trips
+without a Supabase project:
+
+- GET    /rest/v1/<table>  select (with alias:fk(cols) / table(cols) / !inner embeds),
+                           eq, neq, gt, gte, lt, lte, in, is, not.*, or=(), and=(),
+                           alias.column filters on embeds,
+                           order (asc/desc, nullsfirst/nullslast, alias(column)), limit, offset
+- POST   /rest/v1/<table>  insert / upsert (on_conflict + resolution=merge-duplicates),
+                           Prefer: return=representation
+- PATCH  /rest/v1/<table>  update of the filtered rows
+
+Not a database: no types, constraints or transactions. Values are compared as
+numbers when the stored value is numeric, else as strings (ISO dates sort).
+"""
+import json
+import uuid
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+# Foreign key column -> referenced table, for alias:column(...) embeds
+FOREIGN_KEYS = {
+    'player1_id': 'players', 'player2_id': 'players', 'winner_id': 'players',
+    'player_id': 'players', 'match_id': 'matches'
+}
+# Embedded table -> foreign key column on the parent row, for table(...) embeds
+EMBED_KEYS = {'players': 'player_id', 'matches': 'match_id'}
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+def _split_top(text, sep=','):
+    """
+    Split on `sep` outside parentheses and double quotes.
+    """
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append(''.join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+def _coerce(stored, raw):
+    """
+    (stored, raw) made comparable: numbers as floats, everything else as strings.
+    """
+    if isinstance(stored, bool):
+        return stored, raw.lower() == 'true'
+    if isinstance(stored, (int, float)):
+        try:
+            return float(stored), float(raw)
+        except ValueError:
+            return str(stored), raw
+    return str(stored), raw
+
+def _compare(stored, op, raw):
+    if op == 'is':
+        raw = raw.lower()
+        if raw == 'null':
+            return stored is None
+        return stored is (raw == 'true')
+    if op == 'in':
+        values = {_unquote(v) for v in _split_top(raw.strip()[1:-1])}
+        return stored is not None and (str(stored).lower() if isinstance(stored, bool) else str(stored)) in values
+    if stored is None:
+        return False
+    a, b = _coerce(stored, _unquote(raw))
+    if op == 'eq':
+        return a == b
+    if op == 'neq':
+        return a != b
+    if op == 'gt':
+        return a > b
+    if op == 'gte':
+        return a >= b
+    if op == 'lt':
+        return a < b
+    if op == 'lte':
+        return a <= b
+    raise ValueError(f"unsupported operator {op}")
+
+def parse_condition(expr):
+    """
+    'op.value' (query parameter form, possibly negated with not.) -> predicate(value).
+    """
+    negate = expr.startswith('not.')
+    if negate:
+        expr = expr[4:]
+    op, _, raw = expr.partition('.')
+    return lambda value: _compare(value, op, raw) != negate
+
+def parse_logic(kind, body):
+    """
+    or=(a.eq.1,b.eq.2) / and=(...) -> predicate(row). Nested or()/and() allowed.
+    """
+    predicates = []
+    for term in _split_top(body.strip()[1:-1]):
+        if term.startswith(('or(', 'and(')):
+            inner_kind, _, inner = term.partition('(')
+            predicates.append(parse_logic(inner_kind, '(' + inner))
+        else:
+            column, _, expr = term.partition('.')
+            check = parse_condition(expr)
+            predicates.append(lambda row, c=column, f=check: f(row.get(c)))
+    if kind == 'or':
+        return lambda row: any(p(row) for p in predicates)
+    return lambda row: all(p(row) for p in predicates)
+
+def parse_filters(params, embeds=()):
+    """
+    Row predicates, plus {alias: [predicate(embedded row)]} for alias.column filters.
+    """
+    predicates, embedded = [], {}
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+        if key in ('or', 'and'):
+            predicates.append(parse_logic(key, value))
+            continue
+        check = parse_condition(value)
+        alias, _, column = key.partition('.')
+        if column and alias in embeds:
+            embedded.setdefault(alias, []).append(lambda row, c=column, f=check: f(row.get(c)))
+        else:
+            predicates.append(lambda row, c=key, f=check: f(row.get(c)))
+    return predicates, embedded
+
+def parse_select(select):
+    """
+    'a,b,alias:fk(x,y),alias:table!inner(*)' ->
+    (columns or None for *, [(alias, target, columns, inner)]).
+    """
+    columns, embeds = [], []
+    for item in _split_top(select or '*'):
+        if '(' in item:
+            head, _, inner = item.partition('(')
+            alias, _, target = head.partition(':')
+            if not target:
+                alias, target = head, head
+            target, _, hint = target.partition('!')
+            if alias == head:
+                alias = target
+            embeds.append((alias.strip(), target.strip(), parse_select(inner[:-1])[0], hint.strip() == 'inner'))
+        elif item == '*':
+            columns = None
+        elif columns is not None:
+            columns.append(item.split(':')[-1].split('::')[0])
+    return columns, embeds
+
+def _project(row, columns):
+    return dict(row) if columns is None else {c: row.get(c) for c in columns}
+
+class Tables:
+    """
+    In-memory tables: {name: [row dicts]} with an id index per table.
+    """
+    def __init__(self, tables=None):
+        self.rows = {}
+        self.by_id = {}
+        self.lock = threading.RLock()
+        for name, rows in (tables or {}).items():
+            self.load(name, rows)
+
+    def load(self, name, rows):
+        """
+        Replace a table's contents (rows are copied).
+        """
+        with self.lock:
+            self.rows[name] = [dict(r) for r in rows]
+            self.by_id[name] = {r['id']: r for r in self.rows[name] if r.get('id') is not None}
+
+    def table(self, name):
+        with self.lock:
+            if name not in self.rows:
+                self.load(name, [])
+            return self.rows[name]
+
+    def _resolve_embed(self, row, target, columns):
+        table = FOREIGN_KEYS.get(target)
+        key = target
+        if table is None:
+            table, key = target, EMBED_KEYS.get(target, f"{target.rstrip('s')}_id")
+        ref = self.by_id.get(table, {}).get(row.get(key))
+        return _project(ref, columns) if ref is not None else None
+
+    def select(self, name, params):
+        opts = dict(params)
+        columns, embeds = parse_select(opts.get('select'))
+        embed_aliases = {e[0]: e for e in embeds}
+        with self.lock:
+            rows = self.table(name)
+            predicates, embedded_filters = parse_filters(params, embed_aliases)
+            matched = []
+            for r in rows:
+                if not all(p(r) for p in predicates):
+                    continue
+                # Embedded rows resolved before ordering/limit: !inner embeds filter the parent
+                resolved = {}
+                for alias, target, embed_columns, inner in embeds:
+                    ref = self._resolve_embed(r, target, None)
+                    if ref is not None and not all(p(ref) for p in embedded_filters.get(alias, [])):
+                        ref = None
+                    if ref is None and inner:
+                        break
+                    resolved[alias] = ref
+                else:
+                    matched.append((r, resolved))
+
+        def sort_value(item, column):
+            alias, _, inner = column.partition('(')
+            if inner:
+                ref = item[1].get(alias)
+                return ref.get(inner[:-1]) if ref else None
+            return item[0].get(column)
+
+        if opts.get('order'):
+            # Stable sorts from the last key to the first; nulls last on asc, first on desc by default
+            for term in reversed(_split_top(opts['order'])):
+                parts = term.split('.')
+                column, desc = parts[0], 'desc' in parts[1:]
+                nulls_first = 'nullsfirst' in parts[1:] or (desc and 'nullslast' not in parts[1:])
+                present = [m for m in matched if sort_value(m, column) is not None]
+                missing = [m for m in matched if sort_value(m, column) is None]
+                present.sort(key=lambda m: sort_value(m, column), reverse=desc)
+                matched = missing + present if nulls_first else present + missing
+        offset = int(opts.get('offset') or 0)
+        limit = opts.get('limit')
+        matched = matched[offset:offset + int(limit)] if limit is not None else matched[offset:]
+
+        out = []
+        for r, resolved in matched:
+            row = _project(r, columns)
+            for alias, target, embed_columns, inner in embeds:
+                ref = resolved[alias]
+                row[alias] = _project(ref, embed_columns) if ref is not None else None
+            out.append(row)
+        return out
+
+    def insert(self, name, payload, on_conflict=None, merge=False):
+        rows = payload if isinstance(payload, list) else [payload]
+        now = datetime.utcnow().isoformat()
+        written = []
+        with self.lock:
+            table = self.table(name)
+            index = self.by_id[name]
+            keys = None
+            if merge:
+                conflict = [c.strip() for c in (on_conflict or 'id').split(',')]
+                keys = {tuple(r.get(c) for c in conflict): r for r in table}
+            for new in rows:
+                new = dict(new)
+                existing = keys.get(tuple(new.get(c) for c in conflict)) if keys is not None else None
+                if existing is not None:
+                    existing.update(new)
+                    written.append(existing)
+                    continue
+                new.setdefault('id', str(uuid.uuid4()))
+                new.setdefault('created_at', now)
+                table.append(new)
+                index[new['id']] = new
+                if keys is not None:
+                    keys[tuple(new.get(c) for c in conflict)] = new
+                written.append(new)
+            return [dict(r) for r in written]
+
+    def update(self, name, params, changes):
+        with self.lock:
+            predicates, _ = parse_filters(params)
+            updated = []
+            for r in self.table(name):
+                if all(p(r) for p in predicates):
+                    r.update(changes)
+                    updated.append(dict(r))
+            return updated
+
+class _Handler(BaseHTTPRequestHandler):
+    tables = None # Set per server class in start_stub
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None):
+        data = json.dumps(body, default=str).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        prefix = '/rest/v1/'
+        if not parts.path.startswith(prefix):
+            return None, []
+        return parts.path[len(prefix):].strip('/'), parse_qsl(parts.query, keep_blank_values=True)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _handle(self, method):
+        name, params = self._route()
+        if not name:
+            return self._send(404, {"message": "not found"})
+        try:
+            prefer = self.headers.get('Prefer') or ''
+            if method == 'GET':
+                return self._send(200, self.tables.select(name, params))
+            if method == 'POST':
+                rows = self.tables.insert(name, self._body(), dict(params).get('on_conflict'),
+                                          merge='merge-duplicates' in prefer)
+            else:
+                rows = self.tables.update(name, params, self._body() or {})
+            if 'return=representation' in prefer:
+                return self._send(201 if method == 'POST' else 200, rows)
+            return self._send(201 if method == 'POST' else 204)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {"message": str(e)})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+def start_stub(tables=None, host="127.0.0.1", port=0):
+    """
+    Serve `tables` ({name: rows} or a Tables) on a background thread.
+    Returns (server, Tables, base_url); stop with server.shutdown().
+    """
+    store = tables if isinstance(tables, Tables) else Tables(tables)
+    handler = type('StubHandler', (_Handler,), {'tables': store})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, store, f"http://{host}:{server.server_address[1]}"
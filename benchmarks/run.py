@@ -0,0 +1,448 @@
+"""
+Benchmark Suite
+Times the hot paths on seeded synthetic data (scrapers/ai_engine/populate_synthetic.py)
+served by a local PostgREST stand-in (benchmarks/postgrest_stub.py), so runs are
+reproducible and need no Supabase project:
+
+- elo_replay            EloEngine.process_matches over the whole history
+- fatigue               FatigueEngine.calculate_fatigue_index for the most active players
+- history_fetch         MLPipeline.fetch_data (matches + player embeds)
+- feature_matrix_cold   build_feature_matrix from an empty cache
+- feature_matrix_incr   build_feature_matrix with the cache one day behind
+- scoring_batch         CompiledScorer.predict_proba on a large batch
+- scoring_single        CompiledScorer.predict_proba one row at a time
+- serving_predict       ModelServer.predict_matches for the upcoming card (cold cache)
+- value_scan            ValueEngine.run_daily_scan on fresh odds
+- value_replay          odds replay + bankroll simulation over past matches
+- api_*                 API endpoints through FastAPI's TestClient (skipped without fastapi)
+
+Each benchmark reports the median of --repeat runs (after one warm-up run).
+Results are appended to benchmarks/history.jsonl; a benchmark regresses when
+its median is more than --threshold slower than the median of the last
+BASELINE_RUNS recorded runs for the same size and machine (and at least
+MIN_DELTA seconds slower). Any regression exits with status 1.
+
+Usage:
+    python benchmarks/run.py [--size small|medium|large] [--repeat 5] [--threshold 0.25]
+                             [--only elo_replay,fatigue] [--no-record] [--accept]
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import warnings
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from functools import cached_property
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from benchmarks.postgrest_stub import start_stub
+from scrapers.ai_engine.populate_synthetic import (
+    generate_players, generate_matches, generate_fixtures, generate_odds, generate_ledger,
+    player_rows, match_rows, to_records
+)
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+REPEAT = 5
+THRESHOLD = 0.25       # Relative slowdown that fails the run
+MIN_DELTA = 0.005      # Seconds; smaller absolute differences are timer noise
+BASELINE_RUNS = 5
+SEED = 7
+
+SIZES = {
+    "small":  {"players": 300,  "matches": 20000,  "days": 730,  "fixtures": 150,  "fatigue_players": 25,
+               "replay_matches": 3000,  "scoring_rows": 10000,  "single_rows": 500,  "api_requests": 10},
+    "medium": {"players": 800,  "matches": 100000, "days": 1460, "fixtures": 400,  "fatigue_players": 50,
+               "replay_matches": 15000, "scoring_rows": 50000,  "single_rows": 1000, "api_requests": 20},
+    "large":  {"players": 2000, "matches": 400000, "days": 3650, "fixtures": 1000, "fatigue_players": 100,
+               "replay_matches": 50000, "scoring_rows": 200000, "single_rows": 2000, "api_requests": 50}
+}
+
+class BenchContext:
+    """
+    Synthetic dataset, stub server and the expensive shared fixtures
+    (feature matrix, trained model), built on first use.
+    """
+    def __init__(self, size, seed=SEED):
+        self.size = size
+        self.spec = SIZES[size]
+        self.tmp = tempfile.mkdtemp(prefix="bench-")
+        spec = self.spec
+
+        self.players = generate_players(spec['players'], seed)
+        self.matches = generate_matches(self.players, spec['matches'], days=spec['days'], seed=seed + 1)
+        self.fixtures = generate_fixtures(self.players, spec['fixtures'], seed=seed + 2)
+        # Fresh quotes for the value scan (it only reads the last hour)
+        live_odds = generate_odds(self.fixtures, self.players, snapshots=1, seed=seed + 3,
+                                  end=datetime.utcnow() - timedelta(minutes=10))
+        self.tables = {
+            "players": to_records(player_rows(self.players)),
+            "matches": to_records(match_rows(pd.concat([self.matches, self.fixtures], ignore_index=True))),
+            "market_odds": to_records(live_odds),
+            "prediction_ledger": to_records(generate_ledger(self.matches, seed=seed + 4)),
+            "elo_ratings": [], "value_alerts": [], "slate_predictions": []
+        }
+        self.server, self.store, url = start_stub(self.tables)
+
+        # Modules that read these at import/first use (DatabaseClient singleton) see the stub
+        os.environ["SUPABASE_URL"] = url
+        os.environ["SUPABASE_KEY"] = "benchmark"
+        with quiet():
+            from scrapers.db_client import get_db_client
+            self.db = get_db_client()
+        # Process-wide client: re-point it (and every engine holding it) at this run's stub
+        self.db.url = url
+
+    def close(self):
+        self.server.shutdown()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def reset_table(self, name):
+        self.store.load(name, self.tables[name])
+
+    @cached_property
+    def history(self):
+        from ml.train_pipeline import MLPipeline
+        with quiet():
+            return MLPipeline().fetch_data()
+
+    def build_matrix(self, df, cache_dir):
+        from ml.train_pipeline import MLPipeline, FEATURE_SET_VERSION
+        from ml.feature_matrix import build_feature_matrix
+        from ai_engine.feature_builder import FeatureBuilder
+        return build_feature_matrix(
+            df[df['winner_id'].notna()], "xgb", FEATURE_SET_VERSION,
+            init_state=lambda: {"elo": {}, "builder": FeatureBuilder()},
+            row_fn=MLPipeline._feature_row, cache_dir=cache_dir
+        )
+
+    @cached_property
+    def matrix(self):
+        with quiet():
+            return self.build_matrix(self.history, os.path.join(self.tmp, "matrix"))
+
+    @cached_property
+    def registry(self):
+        """
+        Temporary registry with a small calibrated model and its compiled scorer.
+        """
+        from ml.train_pipeline import make_model
+        from ml.registry import ModelRegistry, XGB_MODEL
+        from ml.compiled import export_compiled, COMPILED_FILE
+        from ml.serving import FEATURES
+
+        X = self.matrix[FEATURES].to_numpy(dtype=np.float64)
+        y = self.matrix['target'].to_numpy()
+        model = make_model({"n_estimators": 100}, n_jobs=1).fit(X, y)
+        compiled = export_compiled(model, FEATURES, os.path.join(self.tmp, COMPILED_FILE))
+        registry = ModelRegistry(os.path.join(self.tmp, "models"))
+        with quiet():
+            registry.register(XGB_MODEL, model, FEATURES, extra_files={COMPILED_FILE: compiled})
+        return registry
+
+    @cached_property
+    def elo_loaded(self):
+        from metrics.elo import EloEngine
+        self.store.load('elo_ratings', [])
+        with quiet():
+            EloEngine(self.db).process_matches(self.tables['matches'])
+        return True
+
+    @cached_property
+    def model_server(self):
+        from ml.serving import ModelServer
+        from ai_engine.feature_store import FeatureStore
+        self.elo_loaded
+        with quiet():
+            store = FeatureStore(self.db)
+            store.load_history()
+            return ModelServer(self.db, feature_store=store, registry=self.registry)
+
+    @cached_property
+    def api_client(self):
+        try:
+            from fastapi.testclient import TestClient
+            with quiet():
+                from api.main import app
+        except ImportError as e:
+            print(f"   API benchmarks skipped: {e}")
+            return None
+        return TestClient(app)
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Engine progress prints (and artifact warnings) are part of the code paths
+    but not of the report.
+    """
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+# --- Benchmarks: each returns (setup or None, run) ---
+
+def bench_elo_replay(ctx):
+    from metrics.elo import EloEngine
+    engine = EloEngine(ctx.db)
+    completed = [m for m in ctx.tables['matches'] if m.get('winner_id')]
+    return (lambda: ctx.store.load('elo_ratings', [])), lambda: engine.process_matches(completed)
+
+def bench_fatigue(ctx):
+    from metrics.fatigue import FatigueEngine
+    engine = FatigueEngine(ctx.db)
+    recent = ctx.matches[pd.to_datetime(ctx.matches['date']) >= datetime.now() - timedelta(days=14)]
+    counts = pd.concat([recent['player1_id'], recent['player2_id']]).value_counts()
+    ids = list(counts.index[:ctx.spec['fatigue_players']])
+    return None, lambda: [engine.calculate_fatigue_index(pid) for pid in ids]
+
+def bench_history_fetch(ctx):
+    from ml.train_pipeline import MLPipeline
+    pipeline = MLPipeline()
+    return None, pipeline.fetch_data
+
+def bench_feature_matrix_cold(ctx):
+    cache_dir = os.path.join(ctx.tmp, "cold")
+    df = ctx.history
+    return (lambda: shutil.rmtree(cache_dir, ignore_errors=True)), lambda: ctx.build_matrix(df, cache_dir)
+
+def bench_feature_matrix_incr(ctx):
+    cache_dir = os.path.join(ctx.tmp, "incremental")
+    df = ctx.history
+    cutoff = df['date'].max() - pd.Timedelta(days=1)
+
+    def setup():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        ctx.build_matrix(df[df['date'] <= cutoff], cache_dir)
+    return setup, lambda: ctx.build_matrix(df, cache_dir)
+
+def _scorer(ctx):
+    from ml.compiled import CompiledScorer, COMPILED_FILE
+    from ml.registry import XGB_MODEL
+    return CompiledScorer(ctx.registry.file_path(XGB_MODEL, COMPILED_FILE))
+
+def bench_scoring_batch(ctx):
+    from ml.serving import FEATURES
+    scorer = _scorer(ctx)
+    X = ctx.matrix[FEATURES].to_numpy(dtype=np.float64)
+    X = X[np.random.default_rng(SEED).integers(0, len(X), ctx.spec['scoring_rows'])]
+    return None, lambda: scorer.predict_proba(X)
+
+def bench_scoring_single(ctx):
+    from ml.serving import FEATURES
+    scorer = _scorer(ctx)
+    rows = ctx.matrix[FEATURES].to_numpy(dtype=np.float64)[:ctx.spec['single_rows']]
+    return None, lambda: [scorer.predict_proba(row[None, :]) for row in rows]
+
+def bench_serving_predict(ctx):
+    from ml.prediction_cache import PredictionCache
+    server = ctx.model_server
+    card = to_records(ctx.fixtures[['id', 'player1_id', 'player2_id', 'date']])
+
+    def setup():
+        server.cache = PredictionCache()
+    return setup, lambda: server.predict_matches(card)
+
+def bench_value_scan(ctx):
+    from metrics.value_engine import ValueEngine
+    from ml.prediction_cache import PredictionCache
+    server = ctx.model_server
+    with quiet():
+        engine = ValueEngine()
+    engine.model = server # Benchmark model instead of whatever the default registry holds
+
+    def setup():
+        ctx.reset_table('value_alerts')
+        ctx.reset_table('prediction_ledger')
+        ctx.reset_table('players')
+        server.cache = PredictionCache()
+    return setup, engine.run_daily_scan
+
+def bench_value_replay(ctx):
+    from ml.odds_replay import replay_odds, match_prices, two_sided_bets
+    from ml.bankroll import simulate, strategy_grid
+    past = ctx.matches.tail(ctx.spec['replay_matches'])
+    names = dict(zip(ctx.players['id'], ctx.players['name']))
+    matches = pd.DataFrame({
+        'match_id': past['id'], 'date': past['date'],
+        'p1_name': past['player1_id'].map(names), 'p2_name': past['player2_id'].map(names)
+    })
+    odds = generate_odds(past, ctx.players, seed=SEED + 5)
+    odds['extracted_at'] = odds['extracted_at'].astype('datetime64[ns]')
+    # Model probabilities: the true price seen through some noise
+    set_prob = past['p1_set_prob'].to_numpy()
+    prob_p1 = np.clip(set_prob + np.random.default_rng(SEED).normal(0, 0.05, len(past)), 0.02, 0.98)
+    p1_won = (past['winner_id'] == past['player1_id']).astype(int).to_numpy()
+    grid = strategy_grid(flat_stakes=(10.0, 20.0), kelly_multipliers=(1.0, 0.5, 0.25),
+                         min_evs=(0.0, 0.02, 0.05), min_edges=(0.0, 0.02))
+
+    def run():
+        prices = match_prices(replay_odds(matches, odds), "closing")
+        priced = matches[['match_id']].assign(prob=prob_p1, won=p1_won).merge(prices, on='match_id')
+        probs, prices_, outcomes = two_sided_bets(priced['prob'], priced['odds_p1'], priced['odds_p2'], priced['won'])
+        return simulate(probs, prices_, outcomes, grid)
+    return None, run
+
+def _api_bench(path_fn):
+    def bench(ctx):
+        client = ctx.api_client
+        if client is None:
+            return None
+        paths = path_fn(ctx)
+        return None, lambda: [client.get(path) for path in paths]
+    return bench
+
+api_matches = _api_bench(lambda ctx: [f"/matches/?date={ctx.fixtures['date'].min():%Y-%m-%d}&limit=100"] * ctx.spec['api_requests'])
+api_fatigue = _api_bench(lambda ctx: [f"/fatigue/{pid}" for pid in ctx.players['id'][:ctx.spec['api_requests']]])
+api_calibration = _api_bench(lambda ctx: ["/performance/calibration"] * ctx.spec['api_requests'])
+
+BENCHMARKS = {
+    "elo_replay": bench_elo_replay,
+    "fatigue": bench_fatigue,
+    "history_fetch": bench_history_fetch,
+    "feature_matrix_cold": bench_feature_matrix_cold,
+    "feature_matrix_incr": bench_feature_matrix_incr,
+    "scoring_batch": bench_scoring_batch,
+    "scoring_single": bench_scoring_single,
+    "serving_predict": bench_serving_predict,
+    "value_scan": bench_value_scan,
+    "value_replay": bench_value_replay,
+    "api_matches": api_matches,
+    "api_fatigue": api_fatigue,
+    "api_calibration": api_calibration
+}
+
+def measure(setup, run, repeat=REPEAT):
+    """
+    Wall-clock seconds of `run` (median/min/max over `repeat`, after one warm-up).
+    """
+    times = []
+    for i in range(repeat + 1):
+        if setup:
+            with quiet():
+                setup()
+        with quiet():
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        if i:
+            times.append(elapsed)
+    return {"median": round(statistics.median(times), 6), "min": round(min(times), 6), "max": round(max(times), 6)}
+
+# --- History / regression check ---
+
+def machine_id():
+    return f"{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu-py{platform.python_version()}"
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def load_history(path=HISTORY_FILE):
+    entries = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+def baseline(history, name, size, machine, runs=BASELINE_RUNS):
+    """
+    Median of the last `runs` recorded medians of `name` (regressed runs excluded).
+    """
+    medians = [e['results'][name]['median'] for e in history
+               if e.get('size') == size and e.get('machine') == machine
+               and name in e.get('results', {}) and name not in e.get('regressions', [])]
+    return statistics.median(medians[-runs:]) if medians else None
+
+def check_regressions(results, history, size, machine, threshold=THRESHOLD):
+    regressions = []
+    for name, result in results.items():
+        base = baseline(history, name, size, machine)
+        result['baseline'] = base
+        if base is None:
+            continue
+        result['change'] = round(result['median'] / base - 1, 4) if base else None
+        if result['median'] > base * (1 + threshold) and result['median'] - base > MIN_DELTA:
+            regressions.append(name)
+    return regressions
+
+def run_suite(size="small", repeat=REPEAT, threshold=THRESHOLD, only=None, record=True, accept=False,
+              history_file=HISTORY_FILE):
+    names = [n for n in BENCHMARKS if not only or n in only]
+    unknown = set(only or []) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    print(f"--- Benchmarks ({size}, {repeat} runs) ---")
+    started = time.time()
+    ctx = BenchContext(size)
+    print(f"   Synthetic data: {len(ctx.players)} players, {len(ctx.matches)} matches, "
+          f"{len(ctx.fixtures)} fixtures ({time.time() - started:.1f}s)")
+
+    results = {}
+    try:
+        for name in names:
+            bench = BENCHMARKS[name](ctx)
+            if bench is None:
+                continue
+            results[name] = measure(*bench, repeat=repeat)
+            print(f"   {name:<22} {results[name]['median'] * 1000:>10.1f} ms  "
+                  f"(min {results[name]['min'] * 1000:.1f}, max {results[name]['max'] * 1000:.1f})")
+    finally:
+        ctx.close()
+
+    machine = machine_id()
+    regressions = check_regressions(results, load_history(history_file), size, machine, threshold)
+    for name in regressions:
+        r = results[name]
+        print(f"   [REGRESSION] {name}: {r['median'] * 1000:.1f} ms vs baseline {r['baseline'] * 1000:.1f} ms ({r['change']:+.0%})")
+
+    if record:
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "machine": machine,
+            "size": size,
+            "repeat": repeat,
+            "results": {n: {k: r[k] for k in ("median", "min", "max")} for n, r in results.items()},
+            "regressions": [] if accept else regressions
+        }
+        os.makedirs(os.path.dirname(history_file), exist_ok=True)
+        with open(history_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"   Recorded to {history_file}")
+
+    if regressions and not accept:
+        print(f"   {len(regressions)} benchmark(s) regressed more than {threshold:.0%}.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=list(SIZES), default="small", help="Synthetic dataset size")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Timed runs per benchmark")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--only", default=None, help="Comma-separated benchmark names")
+    parser.add_argument("--no-record", action="store_true", help="Do not append to the history file")
+    parser.add_argument("--accept", action="store_true", help="Record this run as a valid baseline even if slower")
+    args = parser.parse_args()
+    only = [n.strip() for n in args.only.split(',')] if args.only else None
+    sys.exit(run_suite(args.size, args.repeat, args.threshold, only, not args.no_record, args.accept))
@@ -0,0 +1,20 @@
+-- Match Predictions (bulk write-back)
+-- Escribe la columna prediction de muchos partidos en una sola llamada
+-- (POST /rest/v1/rpc/set_match_predictions, ai_engine/predict.py).
+-- Solo toca prediction y solo en partidos aún sin predicción: el ingest puede
+-- haber escrito score/winner mientras tanto.
+
+CREATE OR REPLACE FUNCTION set_match_predictions(rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    UPDATE matches m
+    SET prediction = r.prediction
+    FROM jsonb_to_recordset(rows) AS r(id UUID, prediction JSONB)
+    WHERE m.id = r.id
+      AND m.prediction IS NULL;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
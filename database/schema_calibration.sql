@@ -0,0 +1,9 @@
+
+-- Monitor de calibración: marca de tiempo de resolución en el ledger
+-- El Oracle (scripts/resolve_results.py) la completa al pasar de 'pending' a won/lost
+-- (el Oracle no resuelve void; el monitor solo lee won/lost), permitido por el
+-- trigger de inmutabilidad porque el registro aún está pendiente.
+ALTER TABLE prediction_ledger ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP WITH TIME ZONE;
+
+-- Indice para lecturas incrementales del monitor (solo filas resueltas después del watermark)
+CREATE INDEX IF NOT EXISTS idx_ledger_resolved_at ON prediction_ledger(resolved_at) WHERE resolved_at IS NOT NULL;
@@ -0,0 +1,50 @@
+-- Estadísticas por partido con esquema fijo (columnas tipadas)
+-- Reemplaza la lectura de stats_json: modelos y fatiga proyectan solo las columnas que necesitan.
+-- p1/p2 siguen a matches.player1_id / player2_id. Las métricas 'ratio' guardan ganados + total.
+CREATE TABLE IF NOT EXISTS match_stats (
+    match_id UUID PRIMARY KEY REFERENCES matches(id) ON DELETE CASCADE,
+    p1_id UUID REFERENCES players(id),
+    p2_id UUID REFERENCES players(id),
+
+    p1_aces SMALLINT,
+    p1_double_faults SMALLINT,
+    p1_first_serve_in SMALLINT,
+    p1_first_serve_in_total SMALLINT,
+    p1_first_serve_won SMALLINT,
+    p1_first_serve_won_total SMALLINT,
+    p1_second_serve_won SMALLINT,
+    p1_second_serve_won_total SMALLINT,
+    p1_break_points_won SMALLINT,
+    p1_break_points_won_total SMALLINT,
+    p1_break_points_saved SMALLINT,
+    p1_break_points_saved_total SMALLINT,
+    p1_return_points_won SMALLINT,
+    p1_return_points_won_total SMALLINT,
+    p1_total_points_won SMALLINT,
+    p1_total_points_won_total SMALLINT,
+    p1_first_serve_pct NUMERIC(5, 2),
+
+    p2_aces SMALLINT,
+    p2_double_faults SMALLINT,
+    p2_first_serve_in SMALLINT,
+    p2_first_serve_in_total SMALLINT,
+    p2_first_serve_won SMALLINT,
+    p2_first_serve_won_total SMALLINT,
+    p2_second_serve_won SMALLINT,
+    p2_second_serve_won_total SMALLINT,
+    p2_break_points_won SMALLINT,
+    p2_break_points_won_total SMALLINT,
+    p2_break_points_saved SMALLINT,
+    p2_break_points_saved_total SMALLINT,
+    p2_return_points_won SMALLINT,
+    p2_return_points_won_total SMALLINT,
+    p2_total_points_won SMALLINT,
+    p2_total_points_won_total SMALLINT,
+    p2_first_serve_pct NUMERIC(5, 2),
+
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Lecturas por jugador (forma de saque/resto)
+CREATE INDEX IF NOT EXISTS idx_match_stats_p1 ON match_stats(p1_id);
+CREATE INDEX IF NOT EXISTS idx_match_stats_p2 ON match_stats(p2_id);
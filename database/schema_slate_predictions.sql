@@ -0,0 +1,34 @@
+-- Predicciones materializadas del slate (próximos partidos)
+-- Se generan una vez por ejecución del pipeline (ml/slate.py) y la API las sirve tal cual.
+-- Una fila por partido: modelo principal + probabilidades de cada modelo, features usadas y explicación.
+CREATE TABLE IF NOT EXISTS slate_predictions (
+    match_id UUID PRIMARY KEY REFERENCES matches(id) ON DELETE CASCADE,
+    player1_id UUID REFERENCES players(id),
+    player2_id UUID REFERENCES players(id),
+    match_date TIMESTAMP WITH TIME ZONE,
+
+    -- Modelo principal
+    model_version TEXT NOT NULL,
+    prob_p1 NUMERIC(5, 4) NOT NULL,
+    predicted_winner_id UUID REFERENCES players(id),
+    confidence NUMERIC(5, 4),
+
+    -- Todos los modelos: {"xgb_calibrated@...": 0.61, "v1.0-stats-engine": 0.58}
+    model_probs JSONB DEFAULT '{}'::jsonb,
+    -- Valores de features usados por el modelo principal
+    features JSONB DEFAULT '{}'::jsonb,
+    -- Explicación legible (razonamiento por modelo)
+    explanation JSONB DEFAULT '{}'::jsonb,
+    -- Contribuciones por feature del modelo principal (log-odds, pred_contribs de XGBoost)
+    attribution JSONB DEFAULT '{}'::jsonb,
+
+    run_id TEXT NOT NULL,
+    generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Búsqueda por par de jugadores (inference) y por fecha (dashboard)
+CREATE INDEX IF NOT EXISTS idx_slate_players ON slate_predictions(player1_id, player2_id);
+CREATE INDEX IF NOT EXISTS idx_slate_date ON slate_predictions(match_date);
+
+-- Tablas creadas antes de la columna de atribución
+ALTER TABLE slate_predictions ADD COLUMN IF NOT EXISTS attribution JSONB DEFAULT '{}'::jsonb;
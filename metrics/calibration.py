@@ -0,0 +1,226 @@
+"""
+Calibration Monitor
+Streaming calibration of production probabilities in `prediction_ledger`.
+Resolved rows (won/lost) are folded once into running counters per
+(model_version, surface); later refreshes only pull rows with resolved_at
+past the watermark (set by ResultOracle, scripts/resolve_results.py).
+
+Per group: Brier score, log loss, expected calibration error (ECE), mean
+bias and a reliability table of N_BINS probability bins. Drift flags are
+computed on the last RECENT_WINDOW resolutions of each group, once it has
+MIN_SAMPLES of them.
+"""
+import math
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+from ai_engine.feature_builder import normalize_surface
+
+N_BINS = 10
+RECENT_WINDOW = 500
+MIN_SAMPLES = 100
+REFRESH_INTERVAL = 300 # Seconds between ledger pulls
+PAGE_SIZE = 1000
+EPS = 1e-6
+
+# Drift thresholds
+MAX_ECE = 0.05
+MAX_BIAS = 0.03
+MAX_LOG_LOSS = math.log(2) # Worse than a coin flip
+
+class CalibrationStats:
+    """
+    Running counters for one (model_version, surface) group.
+    """
+    def __init__(self, n_bins=N_BINS, recent_window=RECENT_WINDOW):
+        self.n = 0
+        self.sum_prob = 0.0
+        self.sum_outcome = 0
+        self.sum_brier = 0.0
+        self.sum_log_loss = 0.0
+        self.bin_count = [0] * n_bins
+        self.bin_prob = [0.0] * n_bins
+        self.bin_outcome = [0] * n_bins
+        self.recent = deque(maxlen=recent_window) # (prob, outcome)
+
+    def add(self, prob, outcome):
+        prob = min(max(prob, EPS), 1 - EPS)
+        self.n += 1
+        self.sum_prob += prob
+        self.sum_outcome += outcome
+        self.sum_brier += (prob - outcome) ** 2
+        self.sum_log_loss -= math.log(prob) if outcome else math.log(1 - prob)
+        b = min(int(prob * len(self.bin_count)), len(self.bin_count) - 1)
+        self.bin_count[b] += 1
+        self.bin_prob[b] += prob
+        self.bin_outcome[b] += outcome
+        self.recent.append((prob, outcome))
+
+    @staticmethod
+    def _ece(pairs, n_bins):
+        counts, probs, outcomes = [0] * n_bins, [0.0] * n_bins, [0] * n_bins
+        for prob, outcome in pairs:
+            b = min(int(prob * n_bins), n_bins - 1)
+            counts[b] += 1
+            probs[b] += prob
+            outcomes[b] += outcome
+        total = sum(counts)
+        return sum(abs(p - o) for p, o in zip(probs, outcomes)) / total if total else 0.0
+
+    def drift(self):
+        """
+        Flags on the recent window: ECE, mean bias and log loss past thresholds.
+        """
+        if len(self.recent) < MIN_SAMPLES:
+            return {"checked": False, "samples": len(self.recent), "flags": []}
+        n = len(self.recent)
+        bias = sum(p - o for p, o in self.recent) / n
+        ll = -sum(math.log(p) if o else math.log(1 - p) for p, o in self.recent) / n
+        ece = self._ece(self.recent, len(self.bin_count))
+        flags = []
+        if ece > MAX_ECE:
+            flags.append("ece")
+        if abs(bias) > MAX_BIAS:
+            flags.append("overconfident_p1" if bias > 0 else "underconfident_p1")
+        if ll > MAX_LOG_LOSS:
+            flags.append("log_loss")
+        return {"checked": True, "samples": n, "ece": round(ece, 4), "bias": round(bias, 4),
+                "log_loss": round(ll, 4), "flags": flags}
+
+    def summary(self):
+        n = max(self.n, 1)
+        n_bins = len(self.bin_count)
+        return {
+            "samples": self.n,
+            "brier": round(self.sum_brier / n, 4),
+            "log_loss": round(self.sum_log_loss / n, 4),
+            "ece": round(sum(abs(p - o) for p, o in zip(self.bin_prob, self.bin_outcome)) / n, 4),
+            "mean_prob": round(self.sum_prob / n, 4),
+            "win_rate": round(self.sum_outcome / n, 4),
+            "bins": [
+                {"range": [round(i / n_bins, 2), round((i + 1) / n_bins, 2)], "count": c,
+                 "mean_prob": round(p / c, 4), "observed": round(o / c, 4)}
+                for i, (c, p, o) in enumerate(zip(self.bin_count, self.bin_prob, self.bin_outcome)) if c
+            ],
+            "drift": self.drift()
+        }
+
+def ledger_outcome(row):
+    """
+    (prob_p1, 1 if player 1 won) for a resolved ledger row, None if unusable.
+    Status is relative to the pick: a won 'player_b' pick means player 1 lost.
+    """
+    status = row.get('result_status')
+    if status not in ('won', 'lost') or row.get('prob_p1') is None:
+        return None
+    p1_won = (status == 'won') == (row.get('selected_pick') == 'player_a')
+    return float(row['prob_p1']), int(p1_won)
+
+class CalibrationMonitor:
+    def __init__(self, db, refresh_interval=REFRESH_INTERVAL):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.groups = {} # (model_version, surface) -> CalibrationStats
+        self.seen_ids = set()
+        self.watermark = None # Latest resolved_at folded in
+        self.last_refresh = 0.0
+        self.lock = threading.RLock()
+
+    def _fetch_resolved(self, since=None):
+        endpoint = f"{self.db.url}/rest/v1/prediction_ledger"
+        params = {
+            "select": "id,prob_p1,model_version,selected_pick,result_status,resolved_at,match:matches(surface)",
+            "result_status": "in.(won,lost)",
+            "order": "resolved_at.asc.nullsfirst,id.asc"
+        }
+        if since:
+            params["resolved_at"] = f"gte.{since}"
+
+        rows = []
+        offset = 0
+        while True:
+            page_params = dict(params, limit=str(PAGE_SIZE), offset=str(offset))
+            r = self.db._request_with_retry('get', endpoint, params=page_params)
+            if not r or r.status_code != 200:
+                print(f"  [Calibration] Fetch failed: {r.text if r else 'No resp'}")
+                break
+            page = r.json()
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return rows
+
+    def add_rows(self, rows):
+        """
+        Fold resolved ledger rows into the counters (already seen ids are ignored).
+        """
+        added = 0
+        with self.lock:
+            for row in rows:
+                if row['id'] in self.seen_ids:
+                    continue
+                self.seen_ids.add(row['id'])
+                if row.get('resolved_at') and (self.watermark is None or row['resolved_at'] > self.watermark):
+                    self.watermark = row['resolved_at']
+                outcome = ledger_outcome(row)
+                if outcome is None:
+                    continue
+                surface = (row.get('match') or {}).get('surface')
+                key = (row.get('model_version') or 'unknown', normalize_surface(surface) if surface else 'UNKNOWN')
+                stats = self.groups.get(key)
+                if stats is None:
+                    stats = self.groups[key] = CalibrationStats()
+                stats.add(*outcome)
+                added += 1
+        return added
+
+    def refresh(self):
+        """
+        Pull rows resolved since the watermark (the first call reads the ledger once).
+        """
+        started = time.time()
+        added = self.add_rows(self._fetch_resolved(self.watermark))
+        self.last_refresh = time.time()
+        if added:
+            print(f"  [Calibration] +{added} resolved predictions ({time.time() - started:.1f}s)")
+        return added
+
+    def maybe_refresh(self):
+        if time.time() - self.last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def report(self, model_version=None, surface=None):
+        self.maybe_refresh()
+        with self.lock:
+            groups = [
+                {"model_version": mv, "surface": s, **stats.summary()}
+                for (mv, s), stats in sorted(self.groups.items())
+                if (model_version is None or mv == model_version) and (surface is None or s == surface.upper())
+            ]
+        return {
+            "generated_at": datetime.utcnow().isoformat(),
+            "watermark": self.watermark,
+            "thresholds": {"ece": MAX_ECE, "bias": MAX_BIAS, "log_loss": round(MAX_LOG_LOSS, 4),
+                           "recent_window": RECENT_WINDOW, "min_samples": MIN_SAMPLES},
+            "drifting": [f"{g['model_version']}/{g['surface']}" for g in groups if g['drift']['flags']],
+            "groups": groups
+        }
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_calibration_monitor(db=None):
+    """
+    Process-wide monitor; counters live for the life of the process.
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            if db is None:
+                from scrapers.db_client import get_db_client
+                db = get_db_client()
+            _monitor = CalibrationMonitor(db)
+    return _monitor
@@ -158,3 +158,89 @@ class EloEngine:
             self.update_player_elo(p1, s, new_r1, m1 + 1)
             self.update_player_elo(p2, s, new_r2, m2 + 1)
 
+
+    def get_ratings_bulk(self, player_ids, surfaces):
+        """
+        Fetch ELO data for many players in one query per chunk.
+        Returns {(player_id, surface): {rating, matches_played, last_update}}.
+        """
+        state = {}
+        ids = sorted(set(player_ids))
+        for i in range(0, len(ids), 100):
+            chunk = ids[i:i + 100]
+            try:
+                endpoint = f"{self.db.url}/rest/v1/elo_ratings"
+                params = {
+                    "select": "player_id,surface,rating,matches_played,last_update",
+                    "player_id": f"in.({','.join(chunk)})",
+                    "surface": f"in.({','.join(surfaces)})"
+                }
+                r = self.db._request_with_retry('get', endpoint, params=params)
+                if r and r.status_code == 200:
+                    for row in r.json():
+                        state[(row['player_id'], row['surface'])] = row
+            except Exception as e:
+                print(f"  [ELO] Bulk fetch error: {e}")
+        return state
+
+    def process_matches(self, matches):
+        """
+        Batch version of process_match for ingest.
+        Reads all involved ratings once, replays the matches in order in memory
+        and writes every touched rating back in a single upsert.
+        """
+        matches = [m for m in matches if m.get('player1_id') and m.get('player2_id') and m.get('winner_id')]
+        if not matches:
+            return 0
+
+        player_ids = set()
+        for m in matches:
+            player_ids.update([m['player1_id'], m['player2_id']])
+
+        all_surfaces = ["OVERALL", "HARD", "CLAY", "GRASS", "INDOOR"]
+        state = self.get_ratings_bulk(player_ids, all_surfaces)
+        now = datetime.now().isoformat()
+        touched = set()
+
+        for m in matches:
+            p1, p2, winner = m['player1_id'], m['player2_id'], m['winner_id']
+            surfaces = ["OVERALL"]
+            match_surface = (m.get('surface') or 'HARD').upper()
+            if match_surface in ['HARD', 'CLAY', 'GRASS', 'INDOOR']:
+                surfaces.append(match_surface)
+
+            for s in surfaces:
+                default = {"rating": 1500, "matches_played": 0, "last_update": None}
+                d1 = state.get((p1, s), default)
+                d2 = state.get((p2, s), default)
+
+                r1 = self.apply_decay(p1, d1['rating'], d1['last_update'], s)
+                r2 = self.apply_decay(p2, d2['rating'], d2['last_update'], s)
+                m1, m2 = d1.get('matches_played', 0), d2.get('matches_played', 0)
+
+                score_p1 = 1 if p1 == winner else 0
+                new_r1, new_r2 = self.calculate_new_ratings(r1, r2, score_p1, m1, m2)
+
+                state[(p1, s)] = {"rating": new_r1, "matches_played": m1 + 1, "last_update": now}
+                state[(p2, s)] = {"rating": new_r2, "matches_played": m2 + 1, "last_update": now}
+                touched.update([(p1, s), (p2, s)])
+
+        payload = [{
+            "player_id": pid,
+            "surface": s,
+            "rating": state[(pid, s)]['rating'],
+            "matches_played": state[(pid, s)]['matches_played'],
+            "last_update": state[(pid, s)]['last_update']
+        } for pid, s in touched]
+
+        try:
+            endpoint = f"{self.db.url}/rest/v1/elo_ratings?on_conflict=player_id,surface"
+            headers = {"Prefer": "resolution=merge-duplicates"}
+            r = self.db._request_with_retry('post', endpoint, json=payload, headers=headers)
+            if not r or r.status_code not in [200, 201, 204]:
+                print(f"  [ELO] Bulk update failed: {r.text if r else 'No resp'}")
+                return 0
+        except Exception as e:
+            print(f"  [ELO] Bulk update error: {e}")
+            return 0
+        return len(payload)
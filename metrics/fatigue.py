@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from scrapers.db_client import get_db_client
+from scrapers.match_stats import get_player_stats
 
 # ATP Tour Zones for travel calculation
 TOUR_ZONES = {
@@ -137,6 +138,17 @@ class FatigueEngine:
         # Normalize (Heuristic max adjusted for new factors)
         norm_index = min(1.0, raw_fatigue / 15.0)
         
+        # Real workload where detail stats exist (typed match_stats, one projected column)
+        points_played = None
+        try:
+            since = (datetime.now() - timedelta(days=14)).strftime('%Y-%m-%d')
+            rows = get_player_stats(self.db, player_id, ["total_points_won"], since=since)
+            totals = [r['total_points_won_total'] for r in rows if r.get('total_points_won_total')]
+            if totals:
+                points_played = sum(totals)
+        except Exception as e:
+            print(f"  [Fatigue] Stats lookup failed for {player_id}: {e}")
+        
         return {
             "fatigue_index": round(norm_index, 2),
             "raw_score": round(raw_fatigue, 2),
@@ -146,6 +158,7 @@ class FatigueEngine:
             "grind_factor": tie_breaks,
             "estimated_minutes_14d": estimated_minutes,
             "travel_score": round(travel_score, 2),
+            "points_played_14d": points_played,
             "last_calculated": datetime.now().isoformat()
         }
 
@@ -6,12 +6,16 @@ from datetime import datetime, timedelta
 
 # Add root context
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from scrapers.db_client import get_db_client
+from scrapers.db_client import get_db_client, get_or_create_players
 from ai_engine.predict import StatsEngine
+from ml.serving import get_model_server
+from ai_engine.feature_store import get_feature_store
+from ml.bankroll import kelly_fraction
 
 # Configuration
 DEFAULT_MIN_EV_THRESHOLD = 3.0  # Minimum EV% to trigger alert
 DEFAULT_MIN_KELLY = 0.5  # Minimum Kelly stake % for high confidence
+KELLY_MULTIPLIER = 0.5  # Half Kelly for safety
 SHARP_BOOKS = ['pinnacle', 'betfair']  # Sharp bookmakers for reference
 SOFT_BOOKS = ['bet365', 'williamhill', 'unibet', '1xbet']  # Soft books for value
 
@@ -19,6 +23,9 @@ class ValueEngine:
     def __init__(self, min_ev=DEFAULT_MIN_EV_THRESHOLD, multi_book=True):
         self.db = get_db_client()
         self.ai = StatsEngine(self.db)
+        # Feature store versions key the model's prediction cache across repeated scans
+        self.features = get_feature_store(self.db)
+        self.model = get_model_server(self.db, feature_store=self.features)
         self.min_ev = min_ev
         self.multi_book = multi_book
 
@@ -30,6 +37,7 @@ class ValueEngine:
             bookmakers: List of bookmakers to scan. If None, scans all available.
         """
         print(f"[{datetime.now()}] Starting Value Scan (Min EV: {self.min_ev}%)...")
+        self.features.maybe_refresh() # New results invalidate cached predictions for those players
         
         # 1. Get Fresh Odds (Assuming they were just scraped)
         # Filter for odds from last hour to ensure relevance
@@ -77,34 +85,36 @@ class ValueEngine:
         
         deduped_markets = list(market_map.values())
         print(f"Processing {len(deduped_markets)} unique matches...")
+        # Every name on the card resolved in one lookup (missing players created)
+        player_ids = get_or_create_players(self.db, [m[k] for m in deduped_markets for k in ('player_home', 'player_away')])
         
         alerts = []
-        
+
+        # 2. Get AI Predictions: the whole card in one batch
+        scanned = []
         for market in deduped_markets:
+            id_home = player_ids.get(market['player_home'].strip())
+            id_away = player_ids.get(market['player_away'].strip())
+            if not id_home or not id_away:
+                print(f"Could not map players: {market['player_home']} vs {market['player_away']}")
+                continue
+            scanned.append((market, id_home, id_away))
+
+        matches_synth = [{
+            "player1_id": id_home,
+            "player2_id": id_away,
+            "id": "value_scan",
+            "date": str(datetime.now())
+        } for _, id_home, id_away in scanned]
+        predictions = self.predict_card(matches_synth)
+
+        for (market, id_home, id_away), pred in zip(scanned, predictions):
             p_home = market['player_home']
             p_away = market['player_away']
             price_home = float(market['price_home'])
             price_away = float(market['price_away'])
             
-            # 2. Get AI Prediction
-            id_home = self.db.get_or_create_player(p_home)
-            id_away = self.db.get_or_create_player(p_away)
-            
-            if not id_home or not id_away:
-                print(f"Could not map players: {p_home} vs {p_away}")
-                continue
-                
-            # Run Inference
-            match_synth = {
-                "player1_id": id_home,
-                "player2_id": id_away,
-                "id": "value_scan",
-                "date": str(datetime.now())
-            }
-            
             try:
-                pred = self.ai.predict_match(match_synth) 
-                
                 # 3. Calculate EV
                 if pred['winner_id'] == id_home:
                     prob_home = pred['confidence']
@@ -124,13 +134,13 @@ class ValueEngine:
                 # Apply minimum EV threshold
                 found_value = False
                 if ev_home_pct >= self.min_ev:
-                    alert = self.create_alert(market, "Home", p_home, price_home, prob_home, ev_home)
+                    alert = self.create_alert(market, "Home", p_home, price_home, prob_home, ev_home, pred['model_version'])
                     if alert:
                         alerts.append(alert)
                     found_value = True
                     
                 if ev_away_pct >= self.min_ev:
-                    alert = self.create_alert(market, "Away", p_away, price_away, prob_away, ev_away)
+                    alert = self.create_alert(market, "Away", p_away, price_away, prob_away, ev_away, pred['model_version'])
                     if alert:
                         alerts.append(alert)
                     found_value = True
@@ -145,15 +155,24 @@ class ValueEngine:
         print(f"\n[COMPLETE] Generated {len(alerts)} value alerts.")
         return alerts
 
-    def create_alert(self, market, side, selection_name, price, prob, ev):
+    def predict_card(self, matches):
+        """
+        One prediction per synthetic match, in order: the model server in one
+        batch (ratings / ranks / forms fetched once), StatsEngine if unavailable.
+        """
+        if not matches:
+            return []
+        if self.model.available:
+            try:
+                return self.model.predict_matches(matches)
+            except Exception as e:
+                print(f"  [WARN] Model scoring failed, using StatsEngine: {e}")
+        return self.ai.predict_matches(matches)
+
+    def create_alert(self, market, side, selection_name, price, prob, ev, model_version):
         # Insert into value_alerts
-        # Kelly Criterion: f* = (bp - q) / b
-        # b = odds - 1
-        # p = prob
-        # q = 1 - p
-        b = price - 1
-        kelly = (b * prob - (1 - prob)) / b
-        kelly_fraction = max(0, kelly * 0.5) # Half Kelly for safety
+        # Kelly Criterion: f* = (bp - q) / b (shared with the bankroll simulator)
+        stake_fraction = kelly_fraction(prob, price, KELLY_MULTIPLIER)
         
         alert = {
             "player_home": market['player_home'],
@@ -163,7 +182,7 @@ class ValueEngine:
             "market_price": price,
             "model_probability": round(prob, 4),
             "ev_percentage": round(ev * 100, 2),
-            "kelly_stake": round(kelly_fraction * 100, 2),
+            "kelly_stake": round(stake_fraction * 100, 2),
             "status": "active"
         }
         
@@ -181,13 +200,13 @@ class ValueEngine:
                 "prediction_date": datetime.utcnow().isoformat(),
                 "prob_p1": prob if side == "Home" else (1-prob),
                 "prob_p2": (1-prob) if side == "Home" else prob,
-                "model_version": "xgb_v2.1_calibrated",
+                "model_version": model_version,
                 "bookmaker": market['bookmaker'],
                 "home_odds": price if side == "Home" else 0, # Partial info in alert context
                 "away_odds": price if side == "Away" else 0,
                 "selected_pick": "player_a" if side == "Home" else "player_b",
                 "ev_calculated": ev * 100,
-                "stake_suggested": kelly_fraction * 100,
+                "stake_suggested": stake_fraction * 100,
                 "result_status": "pending"
             }
             # Note: A real ledger needs robust match_id linking. 
@@ -0,0 +1,80 @@
+"""
+Feature Attribution
+Per-prediction "why" for the calibrated XGBoost model from XGBoost's native
+tree contributions (pred_contribs, TreeSHAP), computed for a whole batch in
+one call per calibration fold.
+
+Contributions are in the boosters' log-odds space, averaged over the CV folds
+of CalibratedClassifierCV: base + sum(contributions) = mean fold margin of
+player 1 winning. Platt calibration is monotonic, so signs and ranking carry
+over to the served probability.
+"""
+import numpy as np
+
+TOP_REASONS = 3
+
+# Readable labels and value formats for reasoning strings
+FEATURE_LABELS = {
+    'elo_diff': ("ELO diff", "{:+.0f}"),
+    'form_diff': ("Form diff", "{:+.2f}"),
+    'rank_diff': ("Rank diff", "{:+.0f}"),
+    'elo_p1': ("ELO P1", "{:.0f}"),
+    'elo_p2': ("ELO P2", "{:.0f}")
+}
+
+def fold_boosters(calibrated_model):
+    return [fold.estimator.get_booster() for fold in calibrated_model.calibrated_classifiers_]
+
+def tree_contributions(calibrated_model, X, features):
+    """
+    X: (n, len(features)) -> (contributions (n, len(features)), base (n,)),
+    averaged over the calibration folds.
+    """
+    import xgboost as xgb
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) == 0:
+        return np.empty((0, len(features))), np.empty(0)
+    dmatrix = xgb.DMatrix(X, feature_names=list(features))
+    total = None
+    boosters = fold_boosters(calibrated_model)
+    for booster in boosters:
+        contribs = booster.predict(dmatrix, pred_contribs=True)
+        total = contribs if total is None else total + contribs
+    total /= len(boosters)
+    return total[:, :-1], total[:, -1]
+
+def describe(features, values, contributions, base, top=TOP_REASONS):
+    """
+    One prediction's attribution as stored with slate predictions:
+    {"base", "contributions": {feature: log-odds}, "top": [...], "reasoning"}.
+    """
+    order = np.argsort(-np.abs(contributions))[:top]
+    reasons = []
+    for i in order:
+        label, fmt = FEATURE_LABELS.get(features[i], (features[i], "{:+.2f}"))
+        reasons.append({
+            "feature": features[i],
+            "value": round(float(values[i]), 4),
+            "contribution": round(float(contributions[i]), 4),
+            "text": f"{label} {fmt.format(values[i])} ({contributions[i]:+.2f})"
+        })
+    return {
+        "base": round(float(base), 4),
+        "contributions": {f: round(float(c), 4) for f, c in zip(features, contributions)},
+        "top": reasons,
+        "reasoning": " | ".join(r['text'] for r in reasons)
+    }
+
+def explain_batch(calibrated_model, X, features, top=TOP_REASONS):
+    """
+    describe() for every row of X, from one contribution pass over the batch.
+    """
+    contribs, base = tree_contributions(calibrated_model, X, features)
+    return [describe(features, x, c, b, top) for x, c, b in zip(np.asarray(X), contribs, base)]
+
+def mean_abs_contributions(calibrated_model, X, features):
+    """
+    Global importance: mean |contribution| per feature over X, all folds.
+    """
+    contribs, _ = tree_contributions(calibrated_model, X, features)
+    return {f: round(float(v), 4) for f, v in zip(features, np.abs(contribs).mean(axis=0))} if len(contribs) else {}
@@ -1,111 +1,92 @@
 import os
 import sys
+import argparse
 import pandas as pd
 import numpy as np
-import joblib
-import random
 from sklearn.model_selection import train_test_split
 
 # Add root to system path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ml.train_pipeline import MLPipeline
+from ml.registry import ModelRegistry, XGB_MODEL
+from ml.compiled import CompiledScorer, COMPILED_FILE
+from ml.bankroll import simulate, strategy_grid
+from ml.odds_replay import load_market_odds, replay_odds, match_prices, two_sided_bets, match_names
 
-MODEL_PATH = "ml/models/xgb_v1.joblib"
-
-def run_backtest():
+def run_backtest(version=None, line="closing", bookmaker=None, simulated=False):
     print("--- Financial Backtest Simulation ---")
     
-    # 1. Load Data & Model
-    model = joblib.load(MODEL_PATH)
+    # 1. Load Data & Model (current registry version unless one is given)
+    registry = ModelRegistry()
+    compiled = registry.file_path(XGB_MODEL, COMPILED_FILE, version)
+    if compiled:
+        model, metadata = CompiledScorer(compiled), registry.get_metadata(XGB_MODEL, version)
+    else:
+        model, metadata = registry.load(XGB_MODEL, version)
+    print(f"   Model: {metadata['artifact_id']} (trained on {metadata['training_window']})")
     pipeline = MLPipeline()
     raw_df = pipeline.fetch_data()
-    df = pipeline.feature_engineering(raw_df)
+    df = pipeline.feature_matrix(raw_df)
     
     # Split (Must match training split to simulate "Out of Sample" bets)
-    X = df.drop(columns=['target'])
-    y = df['target']
-    
-    # Stratified or Random Split 80/20
-    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Re-attach target to test set for evaluation
-    test_set = X_test.copy()
-    test_set['actual_winner_is_p1'] = y_test
+    # Chronological 80/20, same as training: only the most recent matches are bet on
+    # (see ml/walk_forward.py for retrain-per-fold evaluation)
+    _, test_set = train_test_split(df, test_size=0.2, shuffle=False)
+    test_set = test_set.rename(columns={'target': 'actual_winner_is_p1'}).reset_index(drop=True)
     
     print(f"   Backtesting on {len(test_set)} unseen matches...")
-    
-    # 2. Simulate Betting
-    bankroll = 1000.0
-    history = []
-    initial_bankroll = bankroll
-    
-    bets_placed = 0
-    wins = 0
-    
-    for idx, row in test_set.iterrows():
-        # Prepare feature vector (drop metadata info if any added, strict X only)
-        # We need to drop 'actual_winner_is_p1' before prediction
-        features = row.drop('actual_winner_is_p1').to_frame().T
-        
-        # Get AI Probability
-        prob_p1 = model.predict_proba(features)[0][1]
-        
-        # Simulate Market Odds
-        # Assume Market is efficient but has margin (vig)
-        # True prob +/- random noise (inefficiency)
-        # e.g. Market Prob = True_Prob + N(0, 0.05)
-        # Implied Odds = 1 / Market Prob
-        
-        # Ground Truth "True Prob" is unknown, proxy is model prob or actual result?
-        # Let's simulate Market Odds based on a slightly weaker model (heuristic) noise
-        # This simulates "beating the market" if our model is better.
-        
-        noise = np.random.normal(0, 0.08) # 8% standard deviation in market accuracy
-        market_prob_p1 = prob_p1 + noise 
-        market_prob_p1 = max(0.05, min(0.95, market_prob_p1)) # Clamp
-        
-        # Add Margin (5%)
-        market_prob_p1_vig = market_prob_p1 * 1.05
-        odds_p1 = 1 / market_prob_p1_vig
-        
-        # Strategy: Value Bet
-        # If AI Prob > Implied Prob of Odds
-        implied_prob = 1 / odds_p1
-        
-        edge = prob_p1 - implied_prob
-        
-        if edge > 0.02: # 2% Edge threshold
-            bets_placed += 1
-            # Flat Stake or Kelly?
-            # Kelly = (bp - q) / b
-            # Let's use 2% Flat Stake for stability
-            stake = 20.0 
-            
-            won = (row['actual_winner_is_p1'] == 1)
-            
-            if won:
-                profit = stake * (odds_p1 - 1)
-                bankroll += profit
-                wins += 1
-                res = "WIN"
-            else:
-                bankroll -= stake
-                res = "LOSS"
-                
-            history.append(bankroll)
-            # print(f"Match: AI {prob_p1:.2f} vs Odds {odds_p1:.2f} (Edge {edge:.2f}) -> {res}")
 
-    # 3. Metrics
-    roi = ((bankroll - initial_bankroll) / initial_bankroll) * 100
-    win_rate = (wins / bets_placed) if bets_placed > 0 else 0
-    
-    print("\n--- Results ---")
-    print(f"Total Bets: {bets_placed} / {len(test_set)}")
+    # All probabilities in one vectorized call
+    test_set['prob_p1'] = model.predict_proba(test_set[metadata['features']].to_numpy(dtype=np.float64))[:, 1]
+    outcomes = test_set['actual_winner_is_p1'].to_numpy()
+
+    # 2. Market Odds
+    if simulated:
+        # Legacy simulation: Market Prob = Model Prob + N(0, 0.08), clamped, plus a 5% margin.
+        # Only measures the betting rules, not a real edge.
+        prob_p1 = test_set['prob_p1'].to_numpy()
+        noise = np.random.normal(0, 0.08, len(prob_p1)) # 8% standard deviation in market accuracy
+        odds_p1 = 1 / (np.clip(prob_p1 + noise, 0.05, 0.95) * 1.05)
+        probs, odds, bet_outcomes = prob_p1, odds_p1, outcomes
+        print("   Odds: SIMULATED (model probability + noise)")
+    else:
+        # Real pre-match prices, as-of joined to each match start
+        matches = test_set[['match_id', 'date']].merge(match_names(raw_df), on='match_id', how='left')
+        prices = match_prices(replay_odds(matches, load_market_odds(pipeline.db)), line, bookmaker)
+        test_set = test_set.merge(prices, on='match_id', how='left')
+        priced = int(test_set['odds_p1'].notna().sum())
+        print(f"   Odds: {line} lines ({bookmaker or 'preferred book'}) for {priced}/{len(test_set)} matches")
+        if priced == 0:
+            print("   No market_odds snapshots linked to the test matches (run with --simulated-odds for the legacy simulation).")
+            return None
+        probs, odds, bet_outcomes = two_sided_bets(test_set['prob_p1'], test_set['odds_p1'], test_set['odds_p2'], outcomes)
+
+    # 3. Simulate Betting: value bets (2% edge), flat $20 stake plus Kelly variants
+    strategies = strategy_grid(flat_stakes=(20.0,), kelly_multipliers=(1.0, 0.5, 0.25), min_edges=(0.02,))
+    summary, _ = simulate(probs, odds, bet_outcomes, strategies, bankroll=1000.0)
+
+    # 4. Metrics
+    flat = summary.iloc[0]
+    bet_mask = (probs - 1 / odds) > 0.02
+    win_rate = bet_outcomes[bet_mask].mean() if bet_mask.any() else 0
+
+    print("\n--- Results (Flat $20) ---")
+    print(f"Total Bets: {int(flat['bets'])} / {len(probs)} selections")
     print(f"Win Rate: {win_rate*100:.1f}%")
-    print(f"Final Bankroll: ${bankroll:.2f} (Start $1000)")
-    print(f"ROI: {roi:.2f}%")
-    
-    # Drawdown?
-    
+    print(f"Final Bankroll: ${flat['final_bankroll']:.2f} (Start $1000)")
+    print(f"ROI: {flat['roi']:.2f}%")
+    print(f"Max Drawdown: {flat['max_drawdown']:.2f}%")
+
+    print("\n--- Staking Strategies ---")
+    print(summary[['name', 'bets', 'final_bankroll', 'roi', 'yield', 'max_drawdown', 'sharpe']]
+          .to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return summary
+
 if __name__ == "__main__":
-    run_backtest()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("version", nargs="?", default=None, help="Registry version (default: current)")
+    parser.add_argument("--line", choices=["closing", "opening"], default="closing", help="Which pre-match price to bet at")
+    parser.add_argument("--bookmaker", default=None, help="Single bookmaker, or 'best' price across books")
+    parser.add_argument("--simulated-odds", action="store_true", help="Legacy noise-based odds instead of market_odds")
+    args = parser.parse_args()
+    run_backtest(args.version, args.line, args.bookmaker, args.simulated_odds)
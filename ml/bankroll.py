@@ -0,0 +1,134 @@
+"""
+Bankroll Simulator
+Evaluates many staking strategies over the same sequence of bets at once.
+Each strategy is a row of a (strategies x bets) matrix, so equity curves are
+NumPy cumulative sums (flat stakes) or cumulative products (Kelly stakes)
+instead of a Python loop per bet.
+
+Strategies:
+- flat:  fixed `size` currency units per bet
+- kelly: `size` x Kelly fraction of the current bankroll (1.0 full, 0.5 half...)
+Both only bet when EV >= min_ev and edge (model prob - implied prob) > min_edge.
+
+Reports per strategy: bets, final bankroll, ROI (% of the starting bankroll),
+yield (profit / staked), max drawdown and a Sharpe-like ratio of per-bet
+bankroll returns.
+"""
+import itertools
+import numpy as np
+import pandas as pd
+
+BANKROLL = 1000.0
+CHUNK = 256 # Strategies simulated per matrix block (bounds memory on big sweeps)
+
+def kelly_fraction(prob, odds, multiplier=1.0):
+    """
+    Kelly criterion f* = (bp - q) / b with b = odds - 1, scaled by `multiplier`
+    and floored at 0 (no bet without an edge). Works on scalars and arrays.
+    """
+    prob = np.asarray(prob, dtype=np.float64)
+    b = np.asarray(odds, dtype=np.float64) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kelly = np.where(b > 0, (b * prob - (1 - prob)) / b, 0.0)
+    fraction = np.maximum(0.0, kelly * multiplier)
+    return float(fraction) if fraction.ndim == 0 else fraction
+
+def strategy_grid(flat_stakes=(20.0,), kelly_multipliers=(1.0, 0.5, 0.25), min_evs=(0.0,), min_edges=(0.0,)):
+    """
+    Cartesian product of staking rules and bet filters, one strategy per row.
+    """
+    rows = []
+    sizes = [("flat", s) for s in flat_stakes] + [("kelly", m) for m in kelly_multipliers]
+    for (kind, size), min_ev, min_edge in itertools.product(sizes, min_evs, min_edges):
+        rows.append({
+            "name": f"{kind}:{size:g}|ev>={min_ev:g}|edge>{min_edge:g}",
+            "kind": kind, "size": float(size), "min_ev": float(min_ev), "min_edge": float(min_edge)
+        })
+    return pd.DataFrame(rows)
+
+def _bet_mask(strategies, ev, edge):
+    return (ev[None, :] >= strategies['min_ev'].to_numpy()[:, None]) & \
+           (edge[None, :] > strategies['min_edge'].to_numpy()[:, None])
+
+def _flat_equity(strategies, bets, returns, bankroll):
+    pnl = np.where(bets, strategies['size'].to_numpy()[:, None] * returns[None, :], 0.0)
+    equity = bankroll + np.cumsum(pnl, axis=1)
+    # Ruined strategies stop betting: drop every bet after the first time equity hits 0
+    ruined = np.maximum.accumulate(equity <= 0, axis=1)
+    after_ruin = np.concatenate([np.zeros((len(bets), 1), dtype=bool), ruined[:, :-1]], axis=1)
+    if after_ruin.any():
+        bets = bets & ~after_ruin
+        pnl = np.where(bets, pnl, 0.0)
+        equity = bankroll + np.cumsum(pnl, axis=1)
+    staked = np.where(bets, strategies['size'].to_numpy()[:, None], 0.0)
+    return np.maximum(equity, 0.0), bets, staked
+
+def _kelly_equity(strategies, bets, returns, kelly, bankroll):
+    fractions = np.where(bets, kelly[None, :] * strategies['size'].to_numpy()[:, None], 0.0)
+    fractions = np.minimum(fractions, 1.0)
+    bets = bets & (fractions > 0)
+    equity = bankroll * np.cumprod(1.0 + fractions * returns[None, :], axis=1)
+    before = np.concatenate([np.full((len(bets), 1), bankroll), equity[:, :-1]], axis=1)
+    return equity, bets, fractions * before
+
+def _summarize(equity, bets, staked, bankroll):
+    n_strategies = len(equity)
+    curve = np.concatenate([np.full((n_strategies, 1), bankroll), equity], axis=1)
+    peaks = np.maximum.accumulate(curve, axis=1)
+    drawdown = np.max(np.where(peaks > 0, (peaks - curve) / np.where(peaks > 0, peaks, 1.0), 0.0), axis=1)
+
+    # Sharpe-like: mean / std of per-bet bankroll returns, scaled by sqrt(bets)
+    prev = curve[:, :-1]
+    step = np.where(bets & (prev > 0), np.diff(curve, axis=1) / np.where(prev > 0, prev, 1.0), 0.0)
+    n_bets = bets.sum(axis=1)
+    mean = step.sum(axis=1) / np.maximum(n_bets, 1)
+    std = np.sqrt((((step - mean[:, None]) * bets) ** 2).sum(axis=1) / np.maximum(n_bets - 1, 1))
+    sharpe = np.where((n_bets > 1) & (std > 0), mean / np.where(std > 0, std, 1.0) * np.sqrt(n_bets), 0.0)
+
+    total_staked = staked.sum(axis=1)
+    profit = curve[:, -1] - bankroll
+    yield_pct = np.where(total_staked > 0, profit / np.where(total_staked > 0, total_staked, 1.0) * 100, 0.0)
+    return pd.DataFrame({
+        "bets": n_bets,
+        "final_bankroll": curve[:, -1],
+        "roi": profit / bankroll * 100,
+        "yield": yield_pct,
+        "staked": total_staked,
+        "max_drawdown": drawdown * 100,
+        "sharpe": sharpe
+    })
+
+def simulate(probs, odds, outcomes, strategies=None, bankroll=BANKROLL, keep_curves=False, chunk=CHUNK):
+    """
+    probs: model probability of the selection, odds: decimal odds offered,
+    outcomes: 1 if the selection won. All 1-D, in chronological order.
+    strategies: strategy_grid() DataFrame (default grid if None).
+    Returns (summary DataFrame, equity curves [strategies x bets] or None).
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    odds = np.asarray(odds, dtype=np.float64)
+    outcomes = np.asarray(outcomes) == 1
+    strategies = (strategy_grid() if strategies is None else strategies).reset_index(drop=True)
+
+    ev = probs * odds - 1
+    edge = probs - 1 / odds
+    returns = np.where(outcomes, odds - 1, -1.0) # Per unit staked
+    kelly = kelly_fraction(probs, odds)
+
+    summaries, curves = [], []
+    for start in range(0, len(strategies), chunk):
+        block = strategies.iloc[start:start + chunk]
+        bets = _bet_mask(block, ev, edge)
+        is_kelly = (block['kind'] == 'kelly').to_numpy()
+        equity = np.empty(bets.shape)
+        staked = np.zeros(bets.shape)
+        if (~is_kelly).any():
+            equity[~is_kelly], bets[~is_kelly], staked[~is_kelly] = _flat_equity(block[~is_kelly], bets[~is_kelly], returns, bankroll)
+        if is_kelly.any():
+            equity[is_kelly], bets[is_kelly], staked[is_kelly] = _kelly_equity(block[is_kelly], bets[is_kelly], returns, kelly, bankroll)
+        summaries.append(_summarize(equity, bets, staked, bankroll))
+        if keep_curves:
+            curves.append(equity)
+
+    summary = pd.concat([strategies, pd.concat(summaries, ignore_index=True)], axis=1)
+    return summary, (np.vstack(curves) if keep_curves else None)
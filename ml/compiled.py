@@ -0,0 +1,157 @@
+"""
+Compiled Scorer
+Exports the calibrated XGBoost model (CalibratedClassifierCV over XGBClassifier,
+sigmoid method) to flat NumPy arrays and scores it without pandas, sklearn or
+xgboost at inference time:
+
+- every tree of every CV fold is flattened into node arrays
+  (feature, threshold, yes/no/missing child, leaf value); leaves point to
+  themselves so all trees are walked together, one step per depth level
+- fold margin = logit(base_score) + sum of its leaves -> sigmoid
+- per-fold Platt calibration expit(-(a * p + b)), averaged over folds
+  (what CalibratedClassifierCV.predict_proba does)
+
+Stored as a single .npz next to the joblib artifact in the model registry.
+"""
+import json
+import numpy as np
+
+COMPILED_FILE = "compiled.npz"
+MAX_EXPORT_ERROR = 1e-4 # Max |compiled - sklearn| probability accepted at export
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _flatten_tree(tree, feature_index, offset):
+    """
+    JSON tree dump -> list of node tuples with global ids:
+    (feature, threshold, yes, no, missing, value, is_leaf). Returns (nodes, depth).
+    """
+    by_id = {}
+    stack = [(tree, 0)]
+    max_depth = 0
+    while stack:
+        node, depth = stack.pop()
+        by_id[node['nodeid']] = node
+        max_depth = max(max_depth, depth)
+        for child in node.get('children', []):
+            stack.append((child, depth + 1))
+
+    # Node ids can have gaps after pruning; renumber densely
+    position = {nid: offset + i for i, nid in enumerate(sorted(by_id))}
+    nodes = []
+    for nid in sorted(by_id):
+        node = by_id[nid]
+        gid = position[nid]
+        if 'leaf' in node:
+            nodes.append((0, np.inf, gid, gid, gid, node['leaf'], True))
+        else:
+            split = node['split']
+            feat = feature_index[split] if split in feature_index else int(split.lstrip('f'))
+            nodes.append((feat, node['split_condition'], position[node['yes']], position[node['no']],
+                          position[node.get('missing', node['yes'])], 0.0, False))
+    return nodes, max_depth
+
+def _base_margin(booster):
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported objective {objective}")
+    base_score = float(str(config['learner']['learner_model_param']['base_score']).strip('[]'))
+    return float(np.log(base_score / (1.0 - base_score)))
+
+def export_compiled(calibrated_model, features, path):
+    """
+    Flatten a fitted CalibratedClassifierCV(XGBClassifier, method='sigmoid') into `path` (.npz).
+    """
+    feature_index = {name: i for i, name in enumerate(features)}
+    nodes, roots, fold_offsets, base_margins, cal_a, cal_b = [], [], [0], [], [], []
+    max_depth = 0
+
+    for fold in calibrated_model.calibrated_classifiers_:
+        estimator = getattr(fold, 'estimator', None) or fold.base_estimator
+        calibrators = getattr(fold, 'calibrators', None) or fold.calibrators_
+        booster = estimator.get_booster()
+
+        for dump in booster.get_dump(dump_format='json'):
+            roots.append(len(nodes)) # Root is node 0, first after renumbering
+            tree_nodes, depth = _flatten_tree(json.loads(dump), feature_index, len(nodes))
+            nodes.extend(tree_nodes)
+            max_depth = max(max_depth, depth)
+        fold_offsets.append(len(roots))
+        base_margins.append(_base_margin(booster))
+        cal_a.append(calibrators[0].a_)
+        cal_b.append(calibrators[0].b_)
+
+    cols = list(zip(*nodes))
+    np.savez_compressed(
+        path,
+        feature=np.array(cols[0], dtype=np.int32),
+        threshold=np.array(cols[1], dtype=np.float32),
+        yes=np.array(cols[2], dtype=np.int32),
+        no=np.array(cols[3], dtype=np.int32),
+        missing=np.array(cols[4], dtype=np.int32),
+        value=np.array(cols[5], dtype=np.float32),
+        is_leaf=np.array(cols[6], dtype=bool),
+        roots=np.array(roots, dtype=np.int32),
+        fold_offsets=np.array(fold_offsets, dtype=np.int32),
+        base_margin=np.array(base_margins, dtype=np.float64),
+        cal_a=np.array(cal_a, dtype=np.float64),
+        cal_b=np.array(cal_b, dtype=np.float64),
+        max_depth=np.array(max_depth, dtype=np.int32),
+        features=np.array(features)
+    )
+    return path
+
+class CompiledScorer:
+    """
+    Drop-in for the calibrated model's predict_proba on float arrays (n, n_features).
+    """
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.feature = data['feature']
+            self.threshold = data['threshold']
+            self.yes = data['yes']
+            self.no = data['no']
+            self.missing = data['missing']
+            self.value = data['value']
+            self.is_leaf = data['is_leaf']
+            self.roots = data['roots']
+            self.fold_offsets = data['fold_offsets']
+            self.base_margin = data['base_margin']
+            self.cal_a = data['cal_a']
+            self.cal_b = data['cal_b']
+            self.max_depth = int(data['max_depth'])
+            self.features = [str(f) for f in data['features']]
+
+    def leaf_values(self, X):
+        """
+        (n_samples, n_trees) leaf value reached in every tree.
+        """
+        X = np.asarray(X, dtype=np.float32) # XGBoost splits compare in float32
+        rows = np.arange(len(X))[:, None]
+        idx = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[idx]]
+            nxt = np.where(x < self.threshold[idx], self.yes[idx], self.no[idx])
+            idx = np.where(np.isnan(x), self.missing[idx], nxt) # Leaves loop on themselves
+        return self.value[idx]
+
+    def predict_proba(self, X):
+        leaves = self.leaf_values(X).astype(np.float64)
+        calibrated = np.zeros(len(leaves))
+        for k in range(len(self.base_margin)):
+            start, end = self.fold_offsets[k], self.fold_offsets[k + 1]
+            p = _expit(self.base_margin[k] + leaves[:, start:end].sum(axis=1))
+            calibrated += _expit(-(self.cal_a[k] * p + self.cal_b[k]))
+        p1 = calibrated / len(self.base_margin)
+        return np.column_stack([1.0 - p1, p1])
+
+def verify_compiled(calibrated_model, scorer, X):
+    """
+    Max absolute difference between compiled and original probabilities on X.
+    """
+    if len(X) == 0:
+        return 0.0
+    expected = calibrated_model.predict_proba(X)[:, 1]
+    return float(np.max(np.abs(scorer.predict_proba(np.asarray(X, dtype=np.float64))[:, 1] - expected)))
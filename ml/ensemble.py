@@ -0,0 +1,381 @@
+"""
+Ensemble Scorer
+Runs every registered predictor over one shared feature computation per batch
+of matchups and blends their probabilities:
+- stats: StatsEngine heuristic (H2H + recent form), vectorized
+- rf:    RandomForest of scrapers/ai_engine/training.py (registry rf_surface)
+- xgb:   calibrated XGBoost of ml/train_pipeline.py (active ModelServer version)
+
+The union of the models' inputs (UNION_FEATURES) is computed once per batch:
+one ratings query, one ranks query and form/surface/H2H from the in-memory
+FeatureStore (or one paged history scan of the batch's players). Each model
+declares the union columns it reads and predicts on the same arrays, so
+registering another model adds no DB queries and no per-match feature loop.
+
+Outputs are blended in log-odds space, z = intercept + sum(w_model * logit(p_model)),
+with weights learned by logistic regression on completed matches the base models
+did not train on (fit_weights), registered as ensemble_blend. Without a fitted
+blend every available model gets the same weight.
+
+Usage:
+    python ml/ensemble.py --fit [--holdout 0.2]
+"""
+import os
+import sys
+import argparse
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.registry import ModelRegistry, XGB_MODEL, RF_MODEL
+from ml.serving import ModelServer, FEATURES, DEFAULT_ELO, DEFAULT_FORM, DEFAULT_RANK
+from ai_engine.feature_builder import FeatureBuilder, NEUTRAL
+from ai_engine.predict import StatsEngine, ID_CHUNK, H2H_WEIGHT, FORM_WEIGHT, SCORE_BOUNDS
+
+ENSEMBLE_MODEL = "ensemble_blend"
+PROB_EPS = 1e-4            # Probabilities clipped before logit
+MIN_BLEND_ROWS = 200       # Fewer unseen matches than this: fit on the holdout tail instead
+HOLDOUT = 0.2
+
+# Computed once per batch; models select from these by name
+UNION_FEATURES = [
+    'elo_diff', 'form_diff', 'rank_diff', 'elo_p1', 'elo_p2', # XGBoost (serving FEATURES)
+    'wr_diff', 'form10_diff', 'h2h',                           # RandomForest (+ surface)
+    'stats_form_diff'                                          # StatsEngine (win rate 0 without history)
+]
+# RF artifact feature name -> union column
+RF_COLUMNS = {'wr_diff': 'wr_diff', 'form_diff': 'form10_diff', 'h2h': 'h2h', 'surface_encoded': 'surface'}
+
+def _logit(p):
+    p = np.clip(np.asarray(p, dtype=np.float64), PROB_EPS, 1 - PROB_EPS)
+    return np.log(p / (1 - p))
+
+def builder_columns(builder, p1, p2, surface):
+    """
+    Form / surface / H2H inputs of one matchup from a FeatureBuilder snapshot.
+    Defaults follow each model's training code.
+    """
+    form5 = builder.form(p1, 5), builder.form(p2, 5)
+    stats_rate = [sum(f) / len(f) if f else 0.0 for f in form5]
+    return {
+        'form_diff': builder.form_rate(p1, 5, DEFAULT_FORM) - builder.form_rate(p2, 5, DEFAULT_FORM),
+        'wr_diff': builder.surface_rate(p1, surface) - builder.surface_rate(p2, surface),
+        'form10_diff': builder.form_rate(p1, 10) - builder.form_rate(p2, 10),
+        'h2h': builder.h2h_rate(p1, p2),
+        'stats_form_diff': stats_rate[0] - stats_rate[1]
+    }
+
+def stats_proba(h2h, stats_form_diff):
+    """
+    StatsEngine._score for whole arrays (h2h is NEUTRAL when the pair never met).
+    """
+    score = 0.5 + (np.asarray(h2h) - NEUTRAL) * H2H_WEIGHT + np.asarray(stats_form_diff) * FORM_WEIGHT
+    return np.clip(score, *SCORE_BOUNDS)
+
+def _empty_columns(n):
+    columns = {name: np.zeros(n) for name in UNION_FEATURES}
+    columns['surface'] = np.empty(n, dtype=object)
+    return columns
+
+class EnsembleScorer:
+    def __init__(self, db, feature_store=None, model_server=None, registry=None):
+        self.db = db
+        self.feature_store = feature_store
+        self.registry = registry or ModelRegistry()
+        # The server keeps the XGBoost version current and owns the ratings / ranks lookups
+        self.server = model_server or ModelServer(db, feature_store=feature_store, registry=self.registry)
+        self.models = {} # name -> {"columns", "predict", "version"}
+        self.blend = None # {"weights": {name: w}, "intercept": b, "artifact_id"}
+        self._register_defaults()
+        self.load_blend()
+
+    # --- Models ---
+
+    def register(self, name, columns, predict, version=None):
+        """
+        predict(X) -> P(player1 wins), X: (n, len(columns)) from the shared batch.
+        A 'surface' column holds the raw surface strings (object dtype).
+        """
+        unknown = [c for c in columns if c not in UNION_FEATURES and c != 'surface']
+        if unknown:
+            raise ValueError(f"{name}: {unknown} not in UNION_FEATURES")
+        self.models[name] = {"columns": list(columns), "predict": predict, "version": version or name}
+
+    def _register_defaults(self):
+        self.register('stats', ['h2h', 'stats_form_diff'],
+                      lambda X: stats_proba(X[:, 0].astype(np.float64), X[:, 1].astype(np.float64)),
+                      version="v1.0-stats-engine")
+
+        if self.server.available:
+            self.register('xgb', FEATURES, lambda X: self.server.predict_proba(X.astype(np.float64)),
+                          version=self.server.model_version)
+
+        try:
+            artifact, metadata = self.registry.load(RF_MODEL)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"  [Ensemble] Failed to load {RF_MODEL}: {e}")
+            return
+        rf, encoder, rf_features = artifact['model'], artifact['surface_encoder'], artifact['features']
+        known = set(encoder.classes_)
+
+        def predict_rf(X):
+            frame = pd.DataFrame(X, columns=rf_features)
+            # Unknown surfaces encode as 0, like the REST predictor
+            surfaces = frame['surface_encoded'].astype(str)
+            codes = {s: int(encoder.transform([s])[0]) if s in known else 0 for s in surfaces.unique()}
+            frame['surface_encoded'] = surfaces.map(codes)
+            return rf.predict_proba(frame.astype(np.float64))[:, 1]
+
+        self.register('rf', [RF_COLUMNS[f] for f in rf_features], predict_rf, version=metadata['artifact_id'])
+
+    def load_blend(self):
+        try:
+            self.blend, metadata = self.registry.load(ENSEMBLE_MODEL)
+            self.blend = dict(self.blend, artifact_id=metadata['artifact_id'])
+            missing = [m for m in self.blend['weights'] if m not in self.models]
+            if missing:
+                print(f"  [Ensemble] Blend models {missing} unavailable, blending the rest")
+        except FileNotFoundError:
+            self.blend = None
+        return self.blend
+
+    # --- Shared features ---
+
+    def _history_builder(self, players):
+        """
+        FeatureBuilder replayed from the players' completed matches: one paged scan
+        per ID_CHUNK players, merged (a match between two chunks is fetched twice)
+        and replayed in date order.
+        """
+        builder = FeatureBuilder()
+        ids = sorted(players)
+        engine = StatsEngine(self.db)
+        history = {}
+        for i in range(0, len(ids), ID_CHUNK):
+            id_list = ','.join(ids[i:i + ID_CHUNK])
+            params = {
+                "select": "id,player1_id,player2_id,winner_id,date,surface",
+                "or": f"(player1_id.in.({id_list}),player2_id.in.({id_list}))",
+                "winner_id": "not.is.null",
+                "order": "date.asc"
+            }
+            for m in engine._fetch_pages(params):
+                history[m['id']] = m
+        for m in sorted(history.values(), key=lambda m: (m.get('date') or '', str(m['id']))):
+            if m.get('player1_id') and m.get('player2_id'):
+                builder.update(m['player1_id'], m['player2_id'], m['winner_id'], m.get('surface'), m.get('date'))
+        return builder
+
+    def compute_features(self, matches):
+        """
+        Union columns for a batch of matches ({name: array}, one row per match).
+        """
+        if not matches:
+            return _empty_columns(0)
+        pairs = [(m['player1_id'], m['player2_id']) for m in matches]
+        players = {pid for pair in pairs for pid in pair}
+        ratings = self.server.elo.get_ratings_bulk(players, ["OVERALL"])
+        ranks = self.server.get_ranks(players)
+
+        elo = {}
+        for pid in players:
+            row = ratings.get((pid, "OVERALL"))
+            elo[pid] = float(row['rating']) if row and row.get('rating') is not None else DEFAULT_ELO
+
+        columns = _empty_columns(len(matches))
+        if self.feature_store is not None:
+            self.feature_store.maybe_refresh()
+            builder, lock = self.feature_store.builder, self.feature_store.lock
+        else:
+            builder, lock = self._history_builder(players), nullcontext()
+        with lock:
+            for i, m in enumerate(matches):
+                p1, p2 = pairs[i]
+                surface = m.get('surface') or 'Hard'
+                for name, value in builder_columns(builder, p1, p2, surface).items():
+                    columns[name][i] = value
+                columns['surface'][i] = surface
+                columns['elo_p1'][i], columns['elo_p2'][i] = elo[p1], elo[p2]
+                columns['rank_diff'][i] = (ranks.get(p2) or DEFAULT_RANK) - (ranks.get(p1) or DEFAULT_RANK)
+        columns['elo_diff'] = columns['elo_p1'] - columns['elo_p2']
+        return columns
+
+    # --- Scoring ---
+
+    def predict_components(self, columns, models=None):
+        """
+        {model: P(player1 wins)} for every registered model over the same columns.
+        """
+        probs = {}
+        for name in models or self.models:
+            spec = self.models[name]
+            X = np.column_stack([columns[c] for c in spec['columns']])
+            if len(X) == 0:
+                probs[name] = np.empty(0)
+                continue
+            try:
+                probs[name] = np.asarray(spec['predict'](X), dtype=np.float64)
+            except Exception as e:
+                print(f"  [Ensemble] {name} scoring failed: {e}")
+        return probs
+
+    def weights(self, available):
+        """
+        (weights, intercept) over the available models: the fitted blend, else equal weights.
+        """
+        if self.blend:
+            weights = {m: w for m, w in self.blend['weights'].items() if m in available}
+            if weights:
+                return weights, self.blend['intercept']
+        return {m: 1.0 / len(available) for m in available}, 0.0
+
+    def blend_probs(self, components):
+        weights, intercept = self.weights(list(components))
+        z = intercept + sum(w * _logit(components[m]) for m, w in weights.items())
+        return 1.0 / (1.0 + np.exp(-z)), weights
+
+    @property
+    def model_version(self):
+        return self.blend['artifact_id'] if self.blend else "ensemble@equal"
+
+    def predict_matches(self, matches):
+        """
+        Same output shape as StatsEngine.predict_match, one dict per match, in order,
+        with every model's probability and the blend weights in metrics.
+        Matches without both player ids get None.
+        """
+        valid = [i for i, m in enumerate(matches) if m.get('player1_id') and m.get('player2_id')]
+        results = [None] * len(matches)
+        if not valid:
+            return results
+        if self.server.maybe_reload() and 'xgb' in self.models:
+            self.models['xgb']['version'] = self.server.model_version
+        columns = self.compute_features([matches[i] for i in valid])
+        components = self.predict_components(columns)
+        probs, weights = self.blend_probs(components)
+        now = datetime.now().isoformat()
+
+        for row, i in enumerate(valid):
+            m = matches[i]
+            prob = float(probs[row])
+            model_probs = {name: round(float(p[row]), 4) for name, p in components.items()}
+            results[i] = {
+                "winner_id": m['player1_id'] if prob >= 0.5 else m['player2_id'],
+                "confidence": round(max(prob, 1.0 - prob), 4),
+                "prob_p1": round(prob, 4),
+                "model_version": self.model_version,
+                "timestamp": now,
+                "reasoning": " | ".join(f"{name} {p:.0%}" for name, p in model_probs.items()),
+                "metrics": {
+                    "features": {c: round(float(columns[c][row]), 4) for c in UNION_FEATURES},
+                    "model_probs": model_probs,
+                    "weights": {name: round(w, 4) for name, w in weights.items()}
+                }
+            }
+        return results
+
+    def predict_match(self, match):
+        return self.predict_matches([match])[0]
+
+    # --- Blend fitting ---
+
+    def _trained_until(self):
+        """
+        Latest training-window end among the registered base models (None if unknown).
+        """
+        ends = []
+        for name in (XGB_MODEL, RF_MODEL):
+            metadata = self.registry.get_metadata(name)
+            window = (metadata or {}).get('training_window')
+            if window and window[1]:
+                ends.append(pd.Timestamp(window[1]))
+        return max(ends) if ends else None
+
+    def fit_weights(self, df, holdout=HOLDOUT):
+        """
+        Learn blend weights on completed matches (df as MLPipeline.fetch_data returns it).
+        Features are replayed point-in-time over the whole history; the blend is fit
+        on matches after the base models' training windows, or on the latest
+        `holdout` share when there are too few, then evaluated on the last quarter
+        of those rows. Registers the blend and returns its metadata.
+        """
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.metrics import log_loss
+        from ml.train_pipeline import MLPipeline
+
+        df = df[df['winner_id'].notna()].sort_values('date', kind='stable')
+        rows = df.to_dict('records')
+        columns = _empty_columns(len(rows))
+        target = np.zeros(len(rows), dtype=int)
+        state = {"elo": {}, "builder": FeatureBuilder()}
+        for i, row in enumerate(rows):
+            surface = row.get('surface') or 'Hard'
+            for name, value in builder_columns(state['builder'], row['player1_id'], row['player2_id'], surface).items():
+                columns[name][i] = value
+            columns['surface'][i] = surface
+            # ELO / rank snapshot exactly as the XGBoost training rows (also advances the state)
+            xgb_row = MLPipeline._feature_row(state, row)
+            for name in ('elo_diff', 'rank_diff', 'elo_p1', 'elo_p2'):
+                columns[name][i] = xgb_row[name]
+            target[i] = xgb_row['target']
+
+        dates = pd.to_datetime(df['date']).to_numpy()
+        trained_until = self._trained_until()
+        unseen = dates > np.datetime64(trained_until) if trained_until is not None else np.zeros(len(rows), dtype=bool)
+        if unseen.sum() >= MIN_BLEND_ROWS:
+            selected = np.flatnonzero(unseen)
+        else:
+            print(f"  [Ensemble] Only {int(unseen.sum())} matches after the base models' training data; "
+                  f"fitting on the latest {holdout:.0%} (in-sample for the base models)")
+            selected = np.arange(int(len(rows) * (1 - holdout)), len(rows))
+        if len(selected) < 4:
+            raise ValueError(f"Not enough matches to fit the blend ({len(selected)})")
+
+        components = self.predict_components({k: v[selected] for k, v in columns.items()})
+        names = sorted(components)
+        Z = np.column_stack([_logit(components[n]) for n in names])
+        y = target[selected]
+        split = int(len(y) * 0.75)
+
+        blender = LogisticRegression(C=1.0)
+        blender.fit(Z[:split], y[:split])
+        blend = {
+            "weights": {n: float(w) for n, w in zip(names, blender.coef_[0])},
+            "intercept": float(blender.intercept_[0]),
+            "models": {n: self.models[n]['version'] for n in names}
+        }
+
+        def logloss(p):
+            return round(float(log_loss(y[split:], np.clip(p, PROB_EPS, 1 - PROB_EPS), labels=[0, 1])), 4)
+        metrics = {f"logloss_{n}": logloss(components[n][split:]) for n in names}
+        metrics["logloss_equal"] = logloss(1 / (1 + np.exp(-Z[split:].mean(axis=1))))
+        metrics["logloss_blend"] = logloss(blender.predict_proba(Z[split:])[:, 1])
+        metrics.update(fit_rows=split, eval_rows=len(y) - split)
+        print(f"  [Ensemble] Weights {blend['weights']} | holdout log loss {metrics}")
+
+        selected_dates = dates[selected]
+        metadata = self.registry.register(
+            ENSEMBLE_MODEL, blend, features=names,
+            training_window=(pd.Timestamp(selected_dates.min()).date(), pd.Timestamp(selected_dates.max()).date()),
+            metrics=metrics, params={"C": 1.0, "holdout": holdout},
+            lineage={"base_models": blend['models'],
+                     "trained_until": str(trained_until.date()) if trained_until is not None else None}
+        )
+        self.load_blend()
+        return metadata
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fit", action="store_true", help="Learn and register blend weights")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT, help="Share of latest matches used when no unseen matches exist")
+    args = parser.parse_args()
+    if args.fit:
+        from ml.train_pipeline import MLPipeline
+        pipeline = MLPipeline()
+        EnsembleScorer(pipeline.db).fit_weights(pipeline.fetch_data(), args.holdout)
+    else:
+        parser.print_help()
@@ -0,0 +1,128 @@
+"""
+Cached Feature Matrix
+Point-in-time feature rows (each row only sees matches strictly before it)
+persisted to a local cache together with the builder state that produced them:
+
+    ml/.cache/features/<name>-<feature_set_version>.parquet   feature rows (+ match_id, date)
+    ml/.cache/features/<name>-<feature_set_version>.state.pkl builder state + watermark
+
+On the next run only matches after the watermark (date, id) are computed,
+starting from the pickled state. A match appearing at or before the watermark
+(backfill) forces a full rebuild, as does bumping the feature-set version.
+Parquet needs pyarrow; without it the matrix is cached as a pandas pickle.
+"""
+import os
+import pickle
+import time
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "features")
+META_COLUMNS = ['match_id', 'date']
+
+def _parquet_available():
+    try:
+        import pyarrow # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class FeatureMatrixCache:
+    def __init__(self, name, feature_set_version, cache_dir=CACHE_DIR):
+        self.name = name
+        self.version = feature_set_version
+        self.cache_dir = cache_dir
+        base = os.path.join(cache_dir, f"{name}-{feature_set_version}")
+        self.matrix_path = base + (".parquet" if _parquet_available() else ".pkl")
+        self.state_path = base + ".state.pkl"
+
+    def load(self):
+        """
+        (matrix DataFrame, state dict) or None if there is no usable cache.
+        """
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.state_path)):
+            return None
+        try:
+            with open(self.state_path, 'rb') as f:
+                state = pickle.load(f)
+            if self.matrix_path.endswith(".parquet"):
+                matrix = pd.read_parquet(self.matrix_path)
+            else:
+                matrix = pd.read_pickle(self.matrix_path)
+            return matrix, state
+        except Exception as e:
+            print(f"   [FeatureCache] Ignoring unreadable cache: {e}")
+            return None
+
+    def save(self, matrix, state):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write-then-rename so an interrupted run never leaves a torn cache
+        tmp_matrix, tmp_state = self.matrix_path + ".tmp", self.state_path + ".tmp"
+        if self.matrix_path.endswith(".parquet"):
+            matrix.to_parquet(tmp_matrix, index=False)
+        else:
+            matrix.to_pickle(tmp_matrix)
+        with open(tmp_state, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_state, self.state_path)
+
+def _row_key(date, match_id):
+    return (pd.Timestamp(date), str(match_id))
+
+def build_feature_matrix(df, name, feature_set_version, init_state, row_fn, cache_dir=CACHE_DIR, partial=False):
+    """
+    df: matches with 'id' and a parsed 'date' column (any order).
+    init_state(): fresh state object (dict) for a full build.
+    row_fn(state, row): feature dict for the match as seen *before* it
+        (or None to emit no row), then updates `state` with its result.
+    partial: df only holds recent matches; returns None instead of building
+        when that is not enough (no cache yet, or a backfill needs a rebuild).
+    Returns the full matrix (META_COLUMNS + features), oldest first.
+    """
+    started = time.time()
+    cache = FeatureMatrixCache(name, feature_set_version, cache_dir)
+    df = df.assign(_key_id=df['id'].astype(str)).sort_values(['date', '_key_id'])
+
+    cached = cache.load()
+    matrix, state = None, None
+    if cached is not None:
+        matrix, state = cached
+        watermark = state.get('watermark')
+        seen = state.get('seen_ids', set())
+        new = df[~df['_key_id'].isin(seen)]
+        if watermark is not None and not new.empty and _row_key(new['date'].iloc[0], new['_key_id'].iloc[0]) <= watermark:
+            if partial:
+                print(f"   [FeatureCache] Backfilled matches before the watermark, {name} needs the full history.")
+                return None
+            print(f"   [FeatureCache] Backfilled matches before the watermark, rebuilding {name}.")
+            matrix, state = None, None
+        else:
+            df = new
+
+    if state is None:
+        if partial:
+            return None
+        state = init_state()
+        state['watermark'] = None
+        state['seen_ids'] = set()
+        matrix = None
+
+    rows = []
+    for _, row in df.iterrows():
+        feats = row_fn(state, row)
+        state['seen_ids'].add(row['_key_id'])
+        state['watermark'] = _row_key(row['date'], row['_key_id'])
+        if feats is not None:
+            rows.append({'match_id': row['_key_id'], 'date': row['date'], **feats})
+
+    if rows:
+        new_rows = pd.DataFrame(rows)
+        matrix = new_rows if matrix is None or matrix.empty else pd.concat([matrix, new_rows], ignore_index=True)
+    elif matrix is None:
+        matrix = pd.DataFrame(columns=META_COLUMNS)
+
+    if len(df):
+        cache.save(matrix, state)
+    print(f"   [FeatureCache] {name}-{feature_set_version}: {len(rows)} new rows, "
+          f"{len(matrix)} total ({time.time() - started:.1f}s)")
+    return matrix
@@ -0,0 +1,200 @@
+"""
+Incremental Training
+Keeps the calibrated XGBoost model fresh without a full fit on every run.
+Only rows past the current version's training watermark (lineage.watermark in
+its registry metadata) are used:
+
+- boost:     continue each calibration fold's booster for INCREMENTAL_ROUNDS
+             more trees on the new rows, then refit each fold's sigmoid on the
+             latest BOOST_CALIBRATION_SHARE of them (held out from the new trees).
+             With fewer than MIN_CALIBRATION_ROWS for that, the calibrators are
+             kept: a refit on rows the new trees saw would be overconfident,
+             and the promotion check below catches a miscalibrated result.
+- calibrate: refit only each fold's sigmoid on the new rows (boosters kept;
+             the new rows are out-of-sample for them)
+
+The latest EVAL_SHARE of the new rows is never fit on: the updated model is
+registered only if its log loss there is not worse than the current version's.
+The watermark moves to the last row fit on, so those rows are used next time.
+
+A full retrain (MLPipeline.train_model) runs instead when the last full fit is
+older than FULL_RETRAIN_DAYS, when the current model's log loss on the new rows
+is LOSS_DRIFT worse than at training time, or when any feature's population
+stability index (new rows vs. the training tail) exceeds PSI_THRESHOLD.
+
+Usage:
+    python ml/train_pipeline.py --incremental [--mode boost|calibrate] [--full]
+"""
+import copy
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+from sklearn.metrics import log_loss
+
+from ml.registry import XGB_MODEL
+
+INCREMENTAL_ROUNDS = 25
+MIN_NEW_ROWS = 50            # Fewer new rows: keep the current version
+MIN_CALIBRATION_ROWS = 200   # Sigmoid refit needs a reasonable sample
+EVAL_SHARE = 0.2             # Newest rows kept out of the update to compare against the parent
+MIN_EVAL_ROWS = 30
+BOOST_CALIBRATION_SHARE = 0.3 # Of the fit rows (newest), for the sigmoid refit after boosting
+FULL_RETRAIN_DAYS = 7
+LOSS_DRIFT = 0.10            # Relative log-loss increase on new rows
+PSI_THRESHOLD = 0.2
+BASELINE_ROWS = 5000         # Training tail the new rows are compared against
+
+def matrix_watermark(matrix):
+    """
+    [date, match_id] of the newest row of a (date-sorted) feature matrix.
+    """
+    last = matrix.iloc[-1]
+    return [last['date'].isoformat(), str(last['match_id'])]
+
+def rows_after(matrix, watermark):
+    date = pd.Timestamp(watermark[0])
+    key = (matrix['date'] > date) | ((matrix['date'] == date) & (matrix['match_id'].astype(str) > watermark[1]))
+    return matrix[key]
+
+def population_stability(baseline, current, bins=10):
+    """
+    PSI of one feature: decile bins of the baseline, sum((c - b) * ln(c / b)).
+    """
+    edges = np.unique(np.quantile(baseline, np.linspace(0, 1, bins + 1)))
+    if len(edges) < 3:
+        return 0.0
+    edges[0], edges[-1] = -np.inf, np.inf
+    b = np.histogram(baseline, edges)[0] / len(baseline)
+    c = np.histogram(current, edges)[0] / len(current)
+    b, c = np.clip(b, 1e-4, None), np.clip(c, 1e-4, None)
+    return float(np.sum((c - b) * np.log(c / b)))
+
+def full_retrain_reason(metadata, model, history, new_rows, features, now=None):
+    """
+    Why the next run must be a full retrain (None if incremental is fine).
+    Also returns the drift metrics measured.
+    """
+    lineage = (metadata or {}).get('lineage') or {}
+    if not lineage.get('watermark') or not lineage.get('full_trained_at'):
+        return "no training watermark on the current version", {}
+
+    now = now or datetime.utcnow()
+    age = now - datetime.fromisoformat(lineage['full_trained_at'])
+    if age >= timedelta(days=FULL_RETRAIN_DAYS):
+        return f"last full retrain {age.days} days ago", {}
+
+    X_new = new_rows[features].astype(np.float64)
+    y_new = new_rows['target'].to_numpy()
+    drift = {
+        "new_rows_log_loss": round(float(log_loss(y_new, model.predict_proba(X_new)[:, 1], labels=[0, 1])), 4),
+        "psi": {f: round(population_stability(history[f].to_numpy(dtype=np.float64)[-BASELINE_ROWS:],
+                                              new_rows[f].to_numpy(dtype=np.float64)), 4) for f in features}
+    }
+    trained_loss = metadata.get('metrics', {}).get('log_loss')
+    if trained_loss and drift['new_rows_log_loss'] > trained_loss * (1 + LOSS_DRIFT):
+        return f"log loss drift {trained_loss:.4f} -> {drift['new_rows_log_loss']:.4f}", drift
+    drifted = {f: v for f, v in drift['psi'].items() if v > PSI_THRESHOLD}
+    if drifted:
+        return f"feature drift (PSI) {drifted}", drift
+    return None, drift
+
+def continue_boosting(model, X, y, rounds=INCREMENTAL_ROUNDS):
+    """
+    Copy of a CalibratedClassifierCV(XGBClassifier) whose fold boosters were
+    trained `rounds` more trees on (X, y).
+    """
+    updated = copy.deepcopy(model)
+    for fold in updated.calibrated_classifiers_:
+        params = dict(fold.estimator.get_params(), n_estimators=rounds)
+        fold.estimator = XGBClassifier(**params).fit(X, y, xgb_model=fold.estimator.get_booster())
+    return updated
+
+def refit_calibration(model, X, y):
+    """
+    Copy of a CalibratedClassifierCV whose per-fold sigmoids are refit on (X, y).
+    """
+    updated = copy.deepcopy(model)
+    for fold in updated.calibrated_classifiers_:
+        fold.calibrators[0].fit(fold.estimator.predict_proba(X)[:, 1], y)
+    return updated
+
+def train_incremental(pipeline, mode="boost", force_full=False):
+    """
+    Update the current XGB version from rows past its watermark, or fall back
+    to a full retrain. Returns the new version's metadata (None if skipped).
+    """
+    registry = pipeline.registry
+    metadata = registry.get_metadata(XGB_MODEL)
+    watermark = ((metadata or {}).get('lineage') or {}).get('watermark')
+
+    # Only matches since the watermark day are fetched; the feature cache holds the rest
+    matrix = None
+    if watermark and not force_full:
+        matrix = pipeline.feature_matrix(pipeline.fetch_data(since=watermark[0][:10]), partial=True)
+    if matrix is None:
+        matrix = pipeline.feature_matrix(pipeline.fetch_data())
+    if matrix.empty:
+        print("   No data to train.")
+        return None
+    matrix = matrix.sort_values(['date', 'match_id'], kind='stable').reset_index(drop=True)
+
+    if force_full or not watermark:
+        print(f"   Full retrain ({'requested' if force_full else 'no incremental base'}).")
+        return pipeline.train_model(matrix)
+
+    model, metadata = registry.load(XGB_MODEL)
+    features = metadata['features']
+    new_rows = rows_after(matrix, watermark)
+    print(f"   {len(new_rows)} rows past watermark {watermark[0]} ({metadata['artifact_id']})")
+    if len(new_rows) < MIN_NEW_ROWS or (mode == "calibrate" and len(new_rows) < MIN_CALIBRATION_ROWS):
+        print("   Not enough new rows, keeping the current version.")
+        return None
+
+    history = matrix.iloc[:len(matrix) - len(new_rows)]
+    reason, drift = full_retrain_reason(metadata, model, history, new_rows, features)
+    if reason:
+        print(f"   Full retrain: {reason}")
+        return pipeline.train_model(matrix)
+
+    n_eval = max(MIN_EVAL_ROWS, int(len(new_rows) * EVAL_SHARE))
+    fit_rows, eval_rows = new_rows.iloc[:-n_eval], new_rows.iloc[-n_eval:]
+    if len(fit_rows) < MIN_NEW_ROWS or (mode == "calibrate" and len(fit_rows) < MIN_CALIBRATION_ROWS):
+        print(f"   Not enough new rows besides the {n_eval} evaluation rows, keeping the current version.")
+        return None
+
+    X_fit = fit_rows[features].astype(np.float64)
+    y_fit = fit_rows['target'].to_numpy()
+    print(f"   Incremental update ({mode}) on {len(fit_rows)} rows, {n_eval} held out...")
+    if mode == "boost":
+        n_cal = int(len(fit_rows) * BOOST_CALIBRATION_SHARE)
+        if n_cal >= MIN_CALIBRATION_ROWS:
+            boosted = continue_boosting(model, X_fit.iloc[:-n_cal], y_fit[:-n_cal])
+            updated = refit_calibration(boosted, X_fit.iloc[-n_cal:], y_fit[-n_cal:])
+        else:
+            print(f"   Calibrators kept (only {n_cal} rows for an out-of-sample sigmoid refit)")
+            updated = continue_boosting(model, X_fit, y_fit)
+    else:
+        updated = refit_calibration(model, X_fit, y_fit)
+
+    # Promote only if the update is not worse than the parent on rows neither saw
+    X_eval = eval_rows[features].astype(np.float64)
+    y_eval = eval_rows['target'].to_numpy()
+    parent_loss = float(log_loss(y_eval, model.predict_proba(X_eval)[:, 1], labels=[0, 1]))
+    updated_loss = float(log_loss(y_eval, updated.predict_proba(X_eval)[:, 1], labels=[0, 1]))
+    print(f"   Held-out log loss: parent {parent_loss:.4f}, updated {updated_loss:.4f}")
+    if updated_loss > parent_loss:
+        print(f"   Update rejected, keeping {metadata['artifact_id']}.")
+        return None
+
+    lineage = dict(metadata['lineage'], mode=mode, parent=metadata['artifact_id'],
+                   watermark=matrix_watermark(fit_rows), incremental_rows=len(fit_rows), drift=drift)
+    return pipeline.register_model(
+        updated, features, X_eval,
+        metrics=dict(metadata['metrics'], new_rows_log_loss=drift.get('new_rows_log_loss'),
+                     incremental_eval={"rows": n_eval, "parent_log_loss": round(parent_loss, 4),
+                                       "log_loss": round(updated_loss, 4)}),
+        params=dict(metadata['params'], **({"incremental_rounds": INCREMENTAL_ROUNDS} if mode == "boost" else {})),
+        lineage=lineage
+    )
@@ -0,0 +1,201 @@
+"""
+Market Odds Replay
+Joins real `market_odds` snapshots (database/schema_odds.sql) to matches by
+time, so backtests bet at prices that were actually on offer:
+
+- closing: last pre-match snapshot per bookmaker with extracted_at <= match start
+- opening: first pre-match snapshot per bookmaker
+
+Snapshots are kept in a local columnar cache (ml/.cache/odds) and only
+snapshots newer than the cached watermark are pulled on each run. The join is
+a single pandas merge_asof over all matches, so a multi-season replay is one pass.
+Matches stored with a date only (no kick-off time) take every pre-match
+(is_live = false) snapshot of that day.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from ml.feature_matrix import FeatureMatrixCache
+
+ODDS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "odds")
+ODDS_STORE_VERSION = "v1"
+PAGE_SIZE = 1000
+ODDS_COLUMNS = ['id', 'match_id', 'bookmaker', 'player_home', 'player_away', 'price_home', 'price_away', 'extracted_at']
+PREFERRED_BOOKS = ['pinnacle', 'betfair'] # Sharp closing lines first when a single price is needed
+
+def _fetch_odds(db, since=None):
+    endpoint = f"{db.url}/rest/v1/market_odds"
+    params = {
+        "select": ",".join(ODDS_COLUMNS),
+        "match_id": "not.is.null",
+        "is_live": "is.false",
+        "order": "extracted_at.asc,id.asc"
+    }
+    if since:
+        params["extracted_at"] = f"gt.{since}"
+
+    rows = []
+    offset = 0
+    while True:
+        page_params = dict(params, limit=str(PAGE_SIZE), offset=str(offset))
+        r = db._request_with_retry('get', endpoint, params=page_params)
+        if not r or r.status_code != 200:
+            print(f"  [OddsReplay] Fetch failed: {r.text if r else 'No resp'}")
+            break
+        page = r.json()
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    return rows
+
+def _to_utc_naive(values):
+    return pd.to_datetime(values, errors='coerce', utc=True).dt.tz_convert(None).astype('datetime64[ns]')
+
+def load_market_odds(db, cache_dir=ODDS_CACHE_DIR):
+    """
+    All linked pre-match snapshots as a DataFrame (ODDS_COLUMNS, extracted_at
+    as naive UTC), refreshed incrementally from the cached watermark.
+    """
+    cache = FeatureMatrixCache("market_odds", ODDS_STORE_VERSION, cache_dir)
+    cached = cache.load()
+    odds, watermark = (cached[0], cached[1].get('watermark')) if cached else (pd.DataFrame(columns=ODDS_COLUMNS), None)
+
+    new = pd.DataFrame(_fetch_odds(db, watermark), columns=ODDS_COLUMNS)
+    if not new.empty:
+        new['extracted_at'] = _to_utc_naive(new['extracted_at'])
+        new[['price_home', 'price_away']] = new[['price_home', 'price_away']].astype(np.float64)
+        odds = pd.concat([odds, new], ignore_index=True) if len(odds) else new
+        odds = odds.drop_duplicates('id', keep='last').dropna(subset=['extracted_at'])
+        watermark = odds['extracted_at'].max().isoformat()
+        cache.save(odds.reset_index(drop=True), {'watermark': watermark})
+    print(f"  [OddsReplay] {len(new)} new snapshots, {len(odds)} cached (watermark {watermark})")
+    return odds
+
+def match_starts(dates):
+    """
+    Latest snapshot time allowed per match: the kick-off time, or the end of
+    the day for matches stored with a date only.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    dates = dates.astype('datetime64[ns]')
+    day_only = dates == dates.dt.normalize()
+    return dates.where(~day_only, dates + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1))
+
+def match_names(df):
+    """
+    match_id, p1_name, p2_name from MLPipeline.fetch_data() rows (player_a / player_b embeds).
+    """
+    def name(p):
+        return p.get('name') if isinstance(p, dict) else None
+    return pd.DataFrame({
+        'match_id': df['id'].astype(str).to_numpy(),
+        'p1_name': df['player_a'].map(name).to_numpy() if 'player_a' in df else None,
+        'p2_name': df['player_b'].map(name).to_numpy() if 'player_b' in df else None
+    })
+
+def _normalize_name(values):
+    return values.astype(str).str.strip().str.lower().str.split().str.join(' ')
+
+def orientation(player_home, p1_name, p2_name):
+    """
+    Per snapshot: 0 if home names player 1, 1 if it names player 2, NaN if
+    neither (or names are missing), so prices are never oriented by guess.
+    """
+    home, p1, p2 = _normalize_name(player_home), _normalize_name(p1_name), _normalize_name(p2_name)
+    known = p1_name.notna() & p2_name.notna() & player_home.notna()
+    return pd.Series(np.select([known & (home == p1), known & (home == p2)], [0.0, 1.0], np.nan), index=player_home.index)
+
+def replay_odds(matches, odds):
+    """
+    matches: DataFrame with match_id, date, p1_name and p2_name (see match_names).
+    odds: load_market_odds() output.
+    Returns one row per (match_id, bookmaker) with opening/closing prices
+    oriented to player 1: open_p1, open_p2, close_p1, close_p2, close_at.
+    Snapshots are oriented by name: home must name player 1 or player 2.
+    Pairs whose closing snapshot names neither are dropped (and counted);
+    an unmatched opening snapshot leaves open_p1/open_p2 as NaN.
+    """
+    empty = pd.DataFrame(columns=['match_id', 'bookmaker', 'open_p1', 'open_p2', 'close_p1', 'close_p2', 'close_at'])
+    if matches.empty or odds.empty:
+        return empty
+
+    left = matches[['match_id']].assign(match_id=matches['match_id'].astype(str), start=match_starts(matches['date']).to_numpy())
+    for col in ('p1_name', 'p2_name'):
+        left[col] = matches[col].to_numpy() if col in matches else None # Without names nothing can be oriented
+    snaps = odds.assign(match_id=odds['match_id'].astype(str), extracted_at=odds['extracted_at'].astype('datetime64[ns]'))
+    snaps = snaps[snaps['match_id'].isin(left['match_id'])]
+    if snaps.empty:
+        return empty
+
+    # Closing line: as-of join of each (match, bookmaker) start time onto its snapshots
+    books = snaps[['match_id', 'bookmaker']].drop_duplicates().merge(left, on='match_id')
+    closing = pd.merge_asof(
+        books.dropna(subset=['start']).sort_values('start'),
+        snaps.sort_values('extracted_at')[['match_id', 'bookmaker', 'extracted_at', 'player_home', 'price_home', 'price_away']],
+        left_on='start', right_on='extracted_at', by=['match_id', 'bookmaker'], direction='backward'
+    ).dropna(subset=['extracted_at'])
+
+    # Opening line: first snapshot of each (match, bookmaker) before the start
+    pre = snaps.merge(left[['match_id', 'start']], on='match_id')
+    pre = pre[pre['extracted_at'] <= pre['start']]
+    opening = pre.sort_values('extracted_at').groupby(['match_id', 'bookmaker'], as_index=False).first()
+    opening = opening[['match_id', 'bookmaker', 'player_home', 'price_home', 'price_away']]
+
+    out = closing.merge(opening, on=['match_id', 'bookmaker'], suffixes=('_close', '_open'))
+    # Linked snapshots list the players by name: orient only on a positive name match
+    swapped = orientation(out['player_home_close'], out['p1_name'], out['p2_name'])
+    open_swapped = orientation(out['player_home_open'], out['p1_name'], out['p2_name'])
+    unmatched = swapped.isna()
+    if unmatched.any():
+        print(f"  [OddsReplay] {int(unmatched.sum())}/{len(out)} (match, bookmaker) lines dropped: "
+              f"home player matches neither side by name")
+    out, swapped, open_swapped = out[~unmatched], swapped[~unmatched] == 1, open_swapped[~unmatched]
+    open_known = open_swapped.notna()
+    open_swapped = open_swapped == 1
+    return pd.DataFrame({
+        'match_id': out['match_id'],
+        'bookmaker': out['bookmaker'],
+        'open_p1': np.where(open_known, np.where(open_swapped, out['price_away_open'], out['price_home_open']), np.nan),
+        'open_p2': np.where(open_known, np.where(open_swapped, out['price_home_open'], out['price_away_open']), np.nan),
+        'close_p1': np.where(swapped, out['price_away_close'], out['price_home_close']),
+        'close_p2': np.where(swapped, out['price_home_close'], out['price_away_close']),
+        'close_at': out['extracted_at']
+    }).reset_index(drop=True)
+
+def match_prices(replayed, line="closing", bookmaker=None):
+    """
+    One price pair per match (odds_p1, odds_p2) from replay_odds() output.
+    bookmaker: a single book, "best" (highest price per side across books)
+    or None (first of PREFERRED_BOOKS quoted, else best).
+    """
+    prefix = "close" if line == "closing" else "open"
+    p1, p2 = f"{prefix}_p1", f"{prefix}_p2"
+    if replayed.empty:
+        return pd.DataFrame(columns=['match_id', 'odds_p1', 'odds_p2'])
+    if bookmaker == "best":
+        prices = replayed.groupby('match_id')[[p1, p2]].max()
+    elif bookmaker:
+        prices = replayed[replayed['bookmaker'] == bookmaker].set_index('match_id')[[p1, p2]]
+    else:
+        rank = replayed['bookmaker'].map({b: i for i, b in enumerate(PREFERRED_BOOKS)})
+        preferred = replayed[rank.notna()].assign(_rank=rank).sort_values('_rank').groupby('match_id')[[p1, p2]].first()
+        best = replayed.groupby('match_id')[[p1, p2]].max()
+        prices = preferred.combine_first(best)
+    return prices.rename(columns={p1: 'odds_p1', p2: 'odds_p2'}).reset_index()
+
+def two_sided_bets(prob_p1, odds_p1, odds_p2, p1_won):
+    """
+    Both selections of every priced match as bankroll.simulate() inputs
+    (probs, odds, outcomes), match order preserved. Unpriced sides are dropped.
+    """
+    prob_p1 = np.asarray(prob_p1, dtype=np.float64)
+    p1_won = np.asarray(p1_won) == 1
+    probs = np.column_stack([prob_p1, 1 - prob_p1]).ravel()
+    odds = np.column_stack([np.asarray(odds_p1, dtype=np.float64), np.asarray(odds_p2, dtype=np.float64)]).ravel()
+    outcomes = np.column_stack([p1_won, ~p1_won]).ravel().astype(int)
+    priced = np.isfinite(odds) & (odds > 1)
+    return probs[priced], odds[priced], outcomes[priced]
@@ -0,0 +1,61 @@
+"""
+Prediction Cache
+LRU of scored matchups keyed by
+    (p1, p2, model_version, feature version of p1, feature version of p2)
+Feature versions come from the FeatureStore and move whenever a player gets a
+new result, so entries for that player stop matching as soon as ingest lands
+(and a new model version does the same). Old keys are simply evicted by LRU.
+A TTL bounds staleness for inputs without a version (e.g. rank updates).
+"""
+import time
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 50000
+TTL_SECONDS = 6 * 3600
+
+class PredictionCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict() # key -> (stored_at, prediction)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(p1, p2, model_version, v1, v2):
+        return (p1, p2, model_version, v1, v2)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, prediction):
+        with self.lock:
+            self.entries[key] = (time.time(), prediction)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None
+        }
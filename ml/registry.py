@@ -0,0 +1,161 @@
+"""
+Local Model Registry
+Versioned artifacts on disk, one directory per version:
+
+    ml/models/<name>/<version>/model.joblib
+    ml/models/<name>/<version>/metadata.json   (features, training window, metrics, sha256)
+    ml/models/<name>/CURRENT                   (active version id)
+
+Versions are written to a temp directory and renamed into place, and CURRENT is
+swapped with os.replace, so readers never see a half-written model. Serving
+processes poll CURRENT (see ModelServer.maybe_reload) to hot-swap without a restart.
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime
+
+import joblib
+
+REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+ARTIFACT_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"
+
+# Registered model names
+XGB_MODEL = "xgb_calibrated"   # ml/train_pipeline.py
+RF_MODEL = "rf_surface"        # scrapers/ai_engine/training.py
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _version_dir(self, name, version):
+        return os.path.join(self.root, name, version)
+
+    # --- Writing ---
+
+    def register(self, name, model, features, training_window=None, metrics=None, params=None,
+                 extra_files=None, lineage=None, promote=True):
+        """
+        Store a new version of `name` and (by default) make it current.
+        training_window: (first_date, last_date) of the training data.
+        extra_files: {file_name: source_path} stored alongside (e.g. compiled.npz).
+        lineage: how the version was produced (training watermark, parent version...).
+        Returns the version metadata.
+        """
+        os.makedirs(self._model_dir(name), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self._model_dir(name))
+        try:
+            artifact = os.path.join(staging, ARTIFACT_FILE)
+            joblib.dump(model, artifact)
+            checksum = file_sha256(artifact)
+
+            files = {}
+            for file_name, source in (extra_files or {}).items():
+                target = os.path.join(staging, file_name)
+                shutil.copyfile(source, target)
+                files[file_name] = file_sha256(target)
+
+            version = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{checksum[:8]}"
+            metadata = {
+                "name": name,
+                "version": version,
+                "artifact_id": f"{name}@{version}",
+                "created_at": datetime.utcnow().isoformat(),
+                "features": list(features),
+                "training_window": [str(d) if d is not None else None for d in training_window] if training_window else None,
+                "metrics": metrics or {},
+                "params": params or {},
+                "lineage": lineage or {},
+                "sha256": checksum,
+                "files": files
+            }
+            with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2)
+
+            os.rename(staging, self._version_dir(name, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        print(f"   Registered {metadata['artifact_id']}")
+        if promote:
+            self.set_current(name, version)
+        return metadata
+
+    def set_current(self, name, version):
+        if not os.path.isdir(self._version_dir(name, version)):
+            raise ValueError(f"Unknown version {name}@{version}")
+        pointer = os.path.join(self._model_dir(name), CURRENT_FILE)
+        tmp = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, pointer) # Atomic swap
+        print(f"   {name} -> {version}")
+
+    # --- Reading ---
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self._model_dir(name), CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self, name):
+        base = self._model_dir(name)
+        if not os.path.isdir(base):
+            return []
+        return sorted(v for v in os.listdir(base)
+                      if os.path.isfile(os.path.join(base, v, METADATA_FILE)))
+
+    def get_metadata(self, name, version=None):
+        version = version or self.current_version(name)
+        if not version:
+            return None
+        with open(os.path.join(self._version_dir(name, version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def artifact_path(self, name, version=None):
+        version = version or self.current_version(name)
+        return os.path.join(self._version_dir(name, version), ARTIFACT_FILE) if version else None
+
+    def file_path(self, name, file_name, version=None, verify=True):
+        """
+        Path of an extra file of a version, or None if that version has no such file.
+        """
+        metadata = self.get_metadata(name, version)
+        if not metadata or file_name not in metadata.get('files', {}):
+            return None
+        path = os.path.join(self._version_dir(name, metadata['version']), file_name)
+        if verify and file_sha256(path) != metadata['files'][file_name]:
+            raise ValueError(f"Checksum mismatch for {metadata['artifact_id']}/{file_name}")
+        return path
+
+    def load(self, name, version=None):
+        """
+        Load a version (default: current) after verifying its checksum.
+        Returns (model, metadata); raises FileNotFoundError if nothing is registered.
+        """
+        metadata = self.get_metadata(name, version)
+        if not metadata:
+            raise FileNotFoundError(f"No registered version of {name}")
+        path = self.artifact_path(name, metadata['version'])
+        if file_sha256(path) != metadata['sha256']:
+            raise ValueError(f"Checksum mismatch for {metadata['artifact_id']}")
+        return joblib.load(path), metadata
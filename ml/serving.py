@@ -0,0 +1,250 @@
+"""
+Model Serving
+Loads the current calibrated XGBoost version from the model registry
+(ml/registry.py) once per process, hot-swaps when CURRENT moves, and
+scores batches of matchups with the training feature vector:
+    elo_diff, form_diff, rank_diff, elo_p1, elo_p2
+Features come from current OVERALL ELO ratings, recent form (in-memory
+FeatureStore) and players.rank_single, with the same defaults as training.
+"""
+import os
+import sys
+import time
+import threading
+import numpy as np
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics.elo import EloEngine
+from ml.registry import ModelRegistry, XGB_MODEL
+from ml.compiled import CompiledScorer, COMPILED_FILE
+from ml.prediction_cache import PredictionCache
+from ml.attribution import explain_batch
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEGACY_MODEL_PATH = os.path.join(ROOT_DIR, "ml", "models", "xgb_v1.joblib") # Pre-registry artifact
+RELOAD_INTERVAL = 30 # Seconds between checks of the registry CURRENT pointer
+FEATURES = ['elo_diff', 'form_diff', 'rank_diff', 'elo_p1', 'elo_p2']
+
+# Training defaults for players without history
+DEFAULT_ELO = 1500
+DEFAULT_FORM = 0.5
+DEFAULT_RANK = 999
+
+class ModelServer:
+    def __init__(self, db, feature_store=None, registry=None, model_name=XGB_MODEL):
+        self.db = db
+        self.feature_store = feature_store
+        self.registry = registry or ModelRegistry()
+        self.model_name = model_name
+        # (model, artifact id) swapped as one reference so a batch never mixes versions
+        self.active = (None, None)
+        self.loaded_version = None
+        self.last_check = 0.0
+        self.reload_lock = threading.Lock()
+        # Keyed by feature-store versions, so only used when a store is attached
+        self.cache = PredictionCache()
+        self.explainer = (None, None) # (version, joblib model) for tree contributions
+        self.elo = EloEngine(db)
+        self.load()
+
+    def load(self):
+        version = self.registry.current_version(self.model_name)
+        if version:
+            try:
+                model, metadata = self.load_version(version)
+                if metadata['features'] != FEATURES:
+                    raise ValueError(f"feature mismatch {metadata['features']}")
+                self.active = (model, metadata['artifact_id'])
+                self.loaded_version = version
+                print(f"  [ModelServer] Loaded {metadata['artifact_id']}")
+                return True
+            except Exception as e:
+                print(f"  [ModelServer] Failed to load {self.model_name}@{version}: {e}")
+                # Keep serving whatever is already active
+                return False
+
+        if self.active[0] is None and os.path.exists(LEGACY_MODEL_PATH):
+            try:
+                import joblib
+                self.active = (joblib.load(LEGACY_MODEL_PATH), "xgb_v1_calibrated")
+                print(f"  [ModelServer] Loaded legacy artifact {LEGACY_MODEL_PATH}")
+                return True
+            except Exception as e:
+                print(f"  [ModelServer] Failed to load {LEGACY_MODEL_PATH}: {e}")
+        elif self.active[0] is None:
+            print(f"  [ModelServer] No registered {self.model_name} model")
+        return False
+
+    def load_version(self, version):
+        """
+        Prefer the compiled NumPy scorer (no sklearn/xgboost import, microsecond
+        predictions); fall back to the joblib artifact for versions without one.
+        """
+        compiled = self.registry.file_path(self.model_name, COMPILED_FILE, version)
+        if compiled:
+            return CompiledScorer(compiled), self.registry.get_metadata(self.model_name, version)
+        return self.registry.load(self.model_name, version)
+
+    def maybe_reload(self):
+        """
+        Swap to the registry's CURRENT version if it moved (checked at most every RELOAD_INTERVAL).
+        """
+        if time.time() - self.last_check < RELOAD_INTERVAL:
+            return False
+        with self.reload_lock:
+            self.last_check = time.time()
+            version = self.registry.current_version(self.model_name)
+            if not version or version == self.loaded_version:
+                return False
+            return self.load()
+
+    @property
+    def model(self):
+        return self.active[0]
+
+    @property
+    def model_version(self):
+        return self.active[1]
+
+    @property
+    def available(self):
+        return self.model is not None
+
+    # --- Features ---
+
+    def get_ranks(self, player_ids):
+        ranks = {}
+        ids = sorted(set(player_ids))
+        for i in range(0, len(ids), 100):
+            chunk = ids[i:i + 100]
+            try:
+                endpoint = f"{self.db.url}/rest/v1/players"
+                params = {"select": "id,rank_single", "id": f"in.({','.join(chunk)})"}
+                r = self.db._request_with_retry('get', endpoint, params=params)
+                if r and r.status_code == 200:
+                    for row in r.json():
+                        ranks[row['id']] = row.get('rank_single')
+            except Exception as e:
+                print(f"  [ModelServer] Rank fetch error: {e}")
+        return ranks
+
+    def get_forms(self, player_ids):
+        if self.feature_store is not None:
+            return {pid: self.feature_store.recent_form(pid) for pid in set(player_ids)}
+        from ai_engine.predict import StatsEngine
+        return StatsEngine(self.db).get_recent_forms_bulk(player_ids)
+
+    def build_features(self, pairs):
+        """
+        [(p1, p2), ...] -> float matrix (n, len(FEATURES)) in FEATURES order.
+        One ratings query and one ranks query for the whole batch.
+        """
+        players = {pid for pair in pairs for pid in pair}
+        ratings = self.elo.get_ratings_bulk(players, ["OVERALL"])
+        ranks = self.get_ranks(players)
+        forms = self.get_forms(players)
+
+        def elo(pid):
+            row = ratings.get((pid, "OVERALL"))
+            return float(row['rating']) if row and row.get('rating') is not None else DEFAULT_ELO
+
+        def form(pid):
+            f = forms.get(pid)
+            return f['win_rate'] if f and f['matches_played'] else DEFAULT_FORM
+
+        X = np.empty((len(pairs), len(FEATURES)), dtype=np.float64)
+        for i, (p1, p2) in enumerate(pairs):
+            elo1, elo2 = elo(p1), elo(p2)
+            rank1 = ranks.get(p1) or DEFAULT_RANK
+            rank2 = ranks.get(p2) or DEFAULT_RANK
+            X[i] = (elo1 - elo2, form(p1) - form(p2), rank2 - rank1, elo1, elo2)
+        return X
+
+    # --- Scoring ---
+
+    def predict_proba(self, X, model=None):
+        """
+        P(player1 wins) for each feature row.
+        """
+        if len(X) == 0:
+            return np.empty(0)
+        return (model or self.model).predict_proba(X)[:, 1]
+
+    def predict_matches(self, matches):
+        """
+        Same output shape as StatsEngine.predict_match, one dict per match, in order.
+        Pairs whose feature snapshot and model version are unchanged come from the cache.
+        """
+        matches = [m for m in matches if m.get('player1_id') and m.get('player2_id')]
+        pairs = [(m['player1_id'], m['player2_id']) for m in matches]
+        self.maybe_reload()
+        model, model_version = self.active
+
+        if self.feature_store is None:
+            return self._score_pairs(pairs, model, model_version)
+
+        keys = [self.cache.make_key(p1, p2, model_version,
+                                    self.feature_store.version(p1), self.feature_store.version(p2))
+                for p1, p2 in pairs]
+        results = [self.cache.get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            scored = self._score_pairs([pairs[i] for i in missing], model, model_version)
+            for i, prediction in zip(missing, scored):
+                self.cache.put(keys[i], prediction)
+                results[i] = prediction
+        return [dict(r) for r in results]
+
+    def _score_pairs(self, pairs, model, model_version):
+        X = self.build_features(pairs)
+        probs = self.predict_proba(X, model)
+        now = datetime.now().isoformat()
+
+        results = []
+        for (p1, p2), x, prob in zip(pairs, X, probs):
+            prob = float(prob)
+            feats = dict(zip(FEATURES, (round(float(v), 4) for v in x)))
+            results.append({
+                "winner_id": p1 if prob >= 0.5 else p2,
+                "confidence": round(max(prob, 1.0 - prob), 4),
+                "prob_p1": round(prob, 4),
+                "model_version": model_version,
+                "timestamp": now,
+                "reasoning": f"ELO diff {feats['elo_diff']:+.0f} | Form diff {feats['form_diff']:+.2f} | Rank diff {feats['rank_diff']:+.0f}",
+                "metrics": {"features": feats}
+            })
+        return results
+
+    def predict_match(self, match):
+        return self.predict_matches([match])[0]
+
+    def explain(self, X):
+        """
+        Tree-contribution attributions (ml/attribution.py) for a batch of feature
+        rows, one contribution pass per fold. Uses the joblib artifact of the
+        active version (the compiled scorer only has leaf values).
+        """
+        model, _ = self.active
+        if not hasattr(model, 'calibrated_classifiers_'):
+            version = self.loaded_version
+            if self.explainer[0] != version:
+                self.explainer = (version, self.registry.load(self.model_name, version)[0])
+            model = self.explainer[1]
+        return explain_batch(model, X, FEATURES)
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_model_server(db=None, feature_store=None):
+    """
+    Process-wide server; the artifact is loaded on first use only.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            if db is None:
+                from scrapers.db_client import get_db_client
+                db = get_db_client()
+            _server = ModelServer(db, feature_store=feature_store)
+    return _server
@@ -0,0 +1,194 @@
+"""
+Slate Predictions
+Scores the upcoming slate once per pipeline run and materializes it into
+`slate_predictions` (database/schema_slate_predictions.sql): the ensemble
+(ml/ensemble.py) probability, every base model's probability from the same
+feature batch, the feature values used, the XGBoost component's per-feature
+tree contributions (ml/attribution.py) and the reasoning. The API serves these rows; live scoring is only for ad-hoc pairs.
+
+Usage:
+    python ml/slate.py [--days 2]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrapers.db_client import get_db_client
+from ml.serving import ModelServer, FEATURES
+from ml.ensemble import EnsembleScorer
+
+DAYS_AHEAD = 2
+UPSERT_CHUNK = 500
+SLATE_TTL = 300 # Seconds the API keeps its in-memory copy of the slate
+
+def fetch_upcoming(db, days_ahead=DAYS_AHEAD):
+    today = datetime.now().strftime('%Y-%m-%d')
+    until = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y-%m-%d') + "T23:59:59"
+    endpoint = f"{db.url}/rest/v1/matches"
+    params = {
+        "select": "id,player1_id,player2_id,date,surface",
+        "winner_id": "is.null",
+        "and": f"(date.gte.{today},date.lte.{until})",
+        "order": "date.asc"
+    }
+    r = db._request_with_retry('get', endpoint, params=params)
+    if not r or r.status_code != 200:
+        print(f"  [Slate] Could not fetch upcoming matches: {r.text if r else 'No resp'}")
+        return []
+    return [m for m in r.json() if m.get('player1_id') and m.get('player2_id')]
+
+def materialize_slate(db=None, days_ahead=DAYS_AHEAD, model_server=None, scorer=None):
+    """
+    Score every upcoming match with the ensemble (all models over one shared
+    feature batch) and upsert one row per match. Returns the number of rows written.
+    """
+    started = time.time()
+    db = db or get_db_client()
+    matches = fetch_upcoming(db, days_ahead)
+    print(f"[{datetime.now()}] Slate: {len(matches)} upcoming matches (next {days_ahead} days)")
+    if not matches:
+        return 0
+
+    server = model_server or ModelServer(db)
+    scorer = scorer or EnsembleScorer(db, model_server=server)
+    predictions = scorer.predict_matches(matches)
+    primary = scorer.model_version
+    versions = {name: spec['version'] for name, spec in scorer.models.items()}
+
+    # Why: native tree contributions of the XGBoost component for the whole slate in one pass
+    attributions = [None] * len(matches)
+    if 'xgb' in scorer.models:
+        try:
+            X = np.array([[p['metrics']['features'][f] for f in FEATURES] for p in predictions], dtype=np.float64)
+            attributions = server.explain(X)
+        except Exception as e:
+            print(f"  [Slate] Attribution failed: {e}")
+    run_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}"
+    generated_at = datetime.utcnow().isoformat()
+
+    rows = []
+    for i, m in enumerate(matches):
+        p1 = m['player1_id']
+        main = predictions[i]
+        prob = main['prob_p1']
+        model_probs = {versions.get(name, name): p for name, p in main['metrics']['model_probs'].items()}
+        explanation = {primary: main['reasoning']}
+        if attributions[i]:
+            explanation[versions['xgb']] = attributions[i]['reasoning']
+        rows.append({
+            "match_id": m['id'],
+            "player1_id": p1,
+            "player2_id": m['player2_id'],
+            "match_date": m.get('date'),
+            "model_version": primary,
+            "prob_p1": round(prob, 4),
+            "predicted_winner_id": main['winner_id'],
+            "confidence": round(max(prob, 1.0 - prob), 4),
+            "model_probs": model_probs,
+            "features": main['metrics']['features'],
+            "explanation": explanation,
+            "attribution": attributions[i] or {},
+            "run_id": run_id,
+            "generated_at": generated_at
+        })
+
+    saved = 0
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        chunk = rows[i:i + UPSERT_CHUNK]
+        r = db._request_with_retry(
+            'post', f"{db.url}/rest/v1/slate_predictions?on_conflict=match_id", json=chunk,
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"}
+        )
+        if r and r.status_code in [200, 201, 204]:
+            saved += len(chunk)
+        else:
+            print(f"  [Slate] Upsert failed: {r.text if r else 'No resp'}")
+
+    print(f"  [Slate] {saved}/{len(rows)} rows written (run {run_id}, {primary} over {list(versions.values())}) in {time.time() - started:.1f}s")
+    return saved
+
+def slate_to_prediction(row, p1_id):
+    """
+    slate_predictions row -> StatsEngine-shaped prediction, oriented to p1_id.
+    """
+    flipped = row['player1_id'] != p1_id
+    prob = float(row['prob_p1'])
+    attribution = row.get('attribution') or {}
+    if flipped and attribution:
+        # Contributions are log-odds of the stored player 1: negate for the other side
+        attribution = dict(attribution,
+                           base=-attribution.get('base', 0.0),
+                           contributions={k: -v for k, v in attribution.get('contributions', {}).items()},
+                           top=[dict(r, contribution=-r['contribution']) for r in attribution.get('top', [])])
+    prob = 1.0 - prob if flipped else prob
+    return {
+        "winner_id": row['predicted_winner_id'],
+        "confidence": float(row['confidence']),
+        "prob_p1": round(prob, 4),
+        "model_version": row['model_version'],
+        "timestamp": row['generated_at'],
+        "reasoning": (row.get('explanation') or {}).get(row['model_version']),
+        "metrics": {
+            "features": row.get('features') or {},
+            "model_probs": {k: round(1.0 - v, 4) if flipped else v for k, v in (row.get('model_probs') or {}).items()},
+            # Feature values (and the "text" of top reasons) stay as seen from the stored player1_id
+            "attribution": dict(attribution, player1_id=row['player1_id']) if attribution else {}
+        },
+        "match_id": row['match_id'],
+        "source": "slate"
+    }
+
+class SlateIndex:
+    """
+    In-memory copy of the upcoming slate for the API, reloaded every SLATE_TTL seconds.
+    Lookups by match id or by unordered player pair.
+    """
+    def __init__(self, db, ttl=SLATE_TTL):
+        self.db = db
+        self.ttl = ttl
+        self.by_match = {}
+        self.by_pair = {}
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def maybe_reload(self):
+        if time.time() - self.loaded_at < self.ttl:
+            return
+        with self.lock:
+            if time.time() - self.loaded_at < self.ttl:
+                return
+            self.loaded_at = time.time()
+            today = datetime.now().strftime('%Y-%m-%d')
+            endpoint = f"{self.db.url}/rest/v1/slate_predictions"
+            params = {"select": "*", "match_date": f"gte.{today}"}
+            try:
+                r = self.db._request_with_retry('get', endpoint, params=params)
+                if not r or r.status_code != 200:
+                    print(f"  [Slate] Reload failed: {r.text if r else 'No resp'}")
+                    return
+                rows = r.json()
+            except Exception as e:
+                print(f"  [Slate] Reload error: {e}")
+                return
+            self.by_match = {row['match_id']: row for row in rows}
+            self.by_pair = {frozenset([row['player1_id'], row['player2_id']]): row for row in rows}
+
+    def for_match(self, match_id):
+        self.maybe_reload()
+        return self.by_match.get(match_id)
+
+    def for_pair(self, p1_id, p2_id):
+        self.maybe_reload()
+        row = self.by_pair.get(frozenset([p1_id, p2_id]))
+        return slate_to_prediction(row, p1_id) if row else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=DAYS_AHEAD, help="Days ahead to include")
+    args = parser.parse_args()
+    materialize_slate(days_ahead=args.days)
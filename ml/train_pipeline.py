@@ -1,31 +1,65 @@
 import os
 import sys
+import shutil
+import argparse
+import tempfile
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import joblib
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, log_loss
-from sklearn.calibration import CalibratedClassifierCV, calibration_curve
+from sklearn.calibration import CalibratedClassifierCV
 
 # Add root to system path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scrapers.db_client import get_db_client
+from ml.registry import ModelRegistry, XGB_MODEL
+from ai_engine.feature_builder import FeatureBuilder
+from ml.feature_matrix import build_feature_matrix, META_COLUMNS
+from ml.attribution import mean_abs_contributions
+from ml.incremental import matrix_watermark
+from ml.compiled import export_compiled, verify_compiled, CompiledScorer, COMPILED_FILE, MAX_EXPORT_ERROR
 
-MODEL_PATH = "ml/models/xgb_v1.joblib"
-os.makedirs("ml/models", exist_ok=True)
+FEATURE_SET_VERSION = "v1" # Bump when feature logic changes (invalidates the cached matrix)
+XGB_PARAMS = {"n_estimators": 200, "learning_rate": 0.05, "max_depth": 6}
+TEST_SIZE = 0.2 # Chronological holdout: the most recent share of rows
+
+def make_model(params=None, n_jobs=None):
+    """
+    Calibrated XGBoost as trained in production (Platt scaling, CV=3).
+    Shared with the walk-forward backtester so folds train the same model.
+    """
+    base_model = XGBClassifier(**dict(XGB_PARAMS, **(params or {})), eval_metric='logloss', n_jobs=n_jobs)
+    return CalibratedClassifierCV(base_model, method='sigmoid', cv=3)
+
+def chronological_split(df, test_size=TEST_SIZE):
+    """
+    (train, test) rows as train_model splits them: date-ordered (when df has
+    the match_id/date columns), the newest test_size share held out.
+    Hyperparameter search (ml/tuning.py) only sees the train part.
+    """
+    if 'date' in df.columns:
+        df = df.sort_values(['date', 'match_id'], kind='stable')
+    return train_test_split(df, test_size=test_size, shuffle=False)
 
 class MLPipeline:
     def __init__(self):
         self.db = get_db_client()
         if not self.db:
             raise Exception("DB Client failed")
+        self.registry = ModelRegistry()
+        self.training_window = None
 
-    def fetch_data(self):
-        print("1. Fetching Match History...")
+    def fetch_data(self, since=None):
+        """
+        since: only matches on/after this date (incremental runs; the feature cache holds the rest).
+        """
+        print(f"1. Fetching Match History{f' since {since}' if since else ''}...")
         endpoint = f"{self.db.url}/rest/v1/matches?select=*,player_a:player1_id(name,rank_single),player_b:player2_id(name,rank_single)&order=date.asc"
+        if since:
+            endpoint += f"&date=gte.{since}"
         r = self.db._request_with_retry('get', endpoint)
         if not r or r.status_code != 200:
             raise Exception("Failed to fetch data")
@@ -35,112 +69,132 @@ class MLPipeline:
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
         # Drop rows with invalid dates if any
         df = df.dropna(subset=['date']).sort_values('date')
+        if not df.empty:
+            self.training_window = (df['date'].min().date(), df['date'].max().date())
         print(f"   Loaded {len(df)} matches.")
         return df
 
     def feature_engineering(self, df):
-        print("2. Feature Engineering (Rolling Window)...")
-        # Initialize containers for calculated features
-        # We must iterate chronologically to avoid leakage
+        """
+        Training rows (features + target), without the match_id/date columns.
+        """
+        return self.feature_matrix(df).drop(columns=META_COLUMNS)
+
+    def feature_matrix(self, df, partial=False):
+        """
+        Cached point-in-time matrix (match_id, date, features, target).
+        partial: df only holds recent matches (None if the cache can't cover the rest).
+        """
+        print("2. Feature Engineering (Rolling Window, cached)...")
+        # Rows are computed chronologically from pre-match state to avoid leakage;
+        # only matches after the cached watermark are computed on each run.
+        # Completed matches only: a cached row is never revisited, so it must carry its final result
+        completed = df[df['winner_id'].notna()]
+        feat_df = build_feature_matrix(
+            completed, "xgb", FEATURE_SET_VERSION,
+            init_state=lambda: {"elo": {}, "builder": FeatureBuilder()},
+            row_fn=self._feature_row,
+            partial=partial
+        )
+        if feat_df is None:
+            return None
+        print(f"   Generated {len(feat_df)} training rows.")
+        return feat_df
+
+    @staticmethod
+    def _feature_row(state, row):
+        elo_state = state['elo']
+        builder = state['builder'] # Form / surface / H2H state, O(1) per match
+
+        p1 = row['player1_id']
+        p2 = row['player2_id']
+        winner = row['winner_id']
+        date = row['date']
         
-        # State trackers
-        elo_state = {} 
-        form_state = {} # {player_id: [last_5_results]}
+        # --- Get Pre-Match Features (Snapshot) ---
         
-        features = []
+        # ELO (Default 1500 if new)
+        elo1 = elo_state.get(p1, 1500)
+        elo2 = elo_state.get(p2, 1500)
         
-        for idx, row in df.iterrows():
-            p1 = row['player1_id']
-            p2 = row['player2_id']
-            winner = row['winner_id']
-            date = row['date']
-            
-            # --- Get Pre-Match Features (Snapshot) ---
-            
-            # ELO (Default 1500 if new)
-            elo1 = elo_state.get(p1, 1500)
-            elo2 = elo_state.get(p2, 1500)
-            
-            # Form (Win % last 5)
-            # Calculate from list
-            f1_hist = form_state.get(p1, [])
-            f2_hist = form_state.get(p2, [])
-            
-            form1 = sum(f1_hist)/len(f1_hist) if f1_hist else 0.5
-            form2 = sum(f2_hist)/len(f2_hist) if f2_hist else 0.5
-            
-            # Rank
-            # Usually we assume rank is in the row from scraper, if not found use 999
-            rank1 = 999 
-            rank2 = 999
-            # Try to parse rank if available in player_a object (joined)
-            if 'player_a' in row and isinstance(row['player_a'], dict):
-                rank1 = row['player_a'].get('rank_single') or 999
-            if 'player_b' in row and isinstance(row['player_b'], dict):
-                rank2 = row['player_b'].get('rank_single') or 999
-            
-            # Target
-            # We predict if Player 1 wins.
-            label = 1 if winner == p1 else 0
-            
-            # Store Feature Row
-            features.append({
-                'elo_diff': elo1 - elo2,
-                'form_diff': form1 - form2,
-                'rank_diff': (rank2 - rank1), # Higher rank is lower number, so (20 - 10) = +10 diff for P1? No.
-                                              # If P1 is #10 and P2 is #50. P1 is better.
-                                              # Diff = 50 - 10 = 40. Positive Rank Diff means P1 is better.
-                'elo_p1': elo1,
-                'elo_p2': elo2,
-                'target': label
-            })
-            
-            # --- Post-Match State Update (Learning) ---
-            
-            # ELO Update
-            expected1 = 1 / (1 + 10 ** ((elo2 - elo1) / 400))
-            score1 = 1 if label == 1 else 0
-            k = 32
-            
-            new_elo1 = elo1 + k * (score1 - expected1)
-            new_elo2 = elo2 + k * ((1-score1) - (1-expected1))
-            
-            elo_state[p1] = new_elo1
-            elo_state[p2] = new_elo2
-            
-            # Form Update
-            f1_hist.append(1 if label == 1 else 0)
-            f2_hist.append(1 if label == 0 else 0)
-            
-            # Keep only last 5
-            form_state[p1] = f1_hist[-5:]
-            form_state[p2] = f2_hist[-5:]
-            
-        feat_df = pd.DataFrame(features)
-        print(f"   Generated {len(feat_df)} training rows.")
-        return feat_df
+        # Form (Win % last 5)
+        form1 = builder.form_rate(p1, 5)
+        form2 = builder.form_rate(p2, 5)
+        
+        # Rank
+        # Usually we assume rank is in the row from scraper, if not found use 999
+        # (current rank at the time the row is first cached, not historical rank)
+        rank1 = 999 
+        rank2 = 999
+        # Try to parse rank if available in player_a object (joined)
+        if 'player_a' in row and isinstance(row['player_a'], dict):
+            rank1 = row['player_a'].get('rank_single') or 999
+        if 'player_b' in row and isinstance(row['player_b'], dict):
+            rank2 = row['player_b'].get('rank_single') or 999
+        
+        # Target
+        # We predict if Player 1 wins.
+        label = 1 if winner == p1 else 0
+        
+        # Feature Row
+        features = {
+            'elo_diff': elo1 - elo2,
+            'form_diff': form1 - form2,
+            'rank_diff': (rank2 - rank1), # Higher rank is lower number, so (20 - 10) = +10 diff for P1? No.
+                                          # If P1 is #10 and P2 is #50. P1 is better.
+                                          # Diff = 50 - 10 = 40. Positive Rank Diff means P1 is better.
+            'elo_p1': elo1,
+            'elo_p2': elo2,
+            'target': label
+        }
+        
+        # --- Post-Match State Update (Learning) ---
+        
+        # ELO Update
+        expected1 = 1 / (1 + 10 ** ((elo2 - elo1) / 400))
+        score1 = 1 if label == 1 else 0
+        k = 32
+        
+        new_elo1 = elo1 + k * (score1 - expected1)
+        new_elo2 = elo2 + k * ((1-score1) - (1-expected1))
+        
+        elo_state[p1] = new_elo1
+        elo_state[p2] = new_elo2
+        
+        # Form / Surface / H2H Update
+        builder.update(p1, p2, winner, row.get('surface'), date)
+        
+        return features
 
-    def train_model(self, df):
+    def train_model(self, df, params=None, tuning=None):
+        """
+        Full fit. df: training rows, or the feature matrix (with match_id/date,
+        which also records the training watermark for incremental runs).
+        params: XGBoost overrides of XGB_PARAMS (e.g. from ml/tuning.py);
+        tuning: search summary stored in the registry metadata.
+        """
         print("3. Training XGBoost Model with Probability Calibration (Platt Scaling)...")
         if df.empty:
             print("   No data to train.")
             return
 
-        X = df.drop(columns=['target'])
-        y = df['target']
-        
+        lineage = {"mode": "full", "full_trained_at": datetime.utcnow().isoformat()}
+
         # Split: Train (60%), Calibration (20%), Test (20%)
         # Or simpler: Cross-Validation Calibration (method='sigmoid' aka Platt)
         # Using 5-fold CV for calibration uses all data more efficiently.
         
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        base_model = XGBClassifier(
-            n_estimators=200, 
-            learning_rate=0.05, 
-            max_depth=6,
-            eval_metric='logloss'
-        )
+        # Chronological holdout: rows are date-ordered, the test set is the most recent 20%
+        train_df, test_df = chronological_split(df)
+        if 'date' in df.columns:
+            # Watermark = last row the model is fit on, so incremental runs
+            # pick up the (most recent) holdout rows as new data
+            self.training_window = (train_df['date'].min().date(), train_df['date'].max().date())
+            lineage["watermark"] = matrix_watermark(train_df)
+            train_df, test_df = train_df.drop(columns=META_COLUMNS), test_df.drop(columns=META_COLUMNS)
+
+        X_train, y_train = train_df.drop(columns=['target']), train_df['target']
+        X_test, y_test = test_df.drop(columns=['target']), test_df['target']
         
         # Fit base model first (needed if not using CV inside CalibratedClassifier, 
         # but CalibratedClassifierCV(cv=5) handles it)
@@ -150,7 +204,7 @@ class MLPipeline:
         
         # Let's use CalibratedClassifierCV with prefit=False (Default) and cv=3
         print("   Fitting Calibrated Classifier (CV=3)...")
-        calibrated_model = CalibratedClassifierCV(base_model, method='sigmoid', cv=3)
+        calibrated_model = make_model(params)
         calibrated_model.fit(X_train, y_train)
         
         # Eval
@@ -162,22 +216,66 @@ class MLPipeline:
         print(f"   Calibrated Accuracy: {acc:.4f}")
         print(f"   Calibrated Log Loss: {loss:.4f}")
         
-        # Feature importance is tricky with Wrapper. We can inspect one of the estimators.
-        try:
-            base_est = calibrated_model.calibrated_classifiers_[0].estimator
-            print("   Feature Importance (from Fold 1):")
-            imps = dict(zip(X.columns, base_est.feature_importances_))
-            for k, v in sorted(imps.items(), key=lambda x: x[1], reverse=True):
-                print(f"     - {k}: {v:.4f}")
-        except:
-            pass
+        # Global attribution: mean |tree contribution| over the holdout, all calibration folds
+        attribution = mean_abs_contributions(calibrated_model, X_test, list(X_train.columns))
+        print("   Feature Attribution (mean |log-odds contribution|, holdout):")
+        for k, v in sorted(attribution.items(), key=lambda x: x[1], reverse=True):
+            print(f"     - {k}: {v:.4f}")
             
-        # Save
-        joblib.dump(calibrated_model, MODEL_PATH)
-        print(f"   Model saved to {MODEL_PATH}")
+        # Save (versioned; serving processes pick it up without a restart)
+        metrics = {"accuracy": round(acc, 4), "log_loss": round(loss, 4),
+                   "train_rows": len(X_train), "test_rows": len(X_test),
+                   "feature_attribution": attribution}
+        if tuning:
+            metrics["tuning"] = tuning
+        return self.register_model(calibrated_model, list(X_train.columns), X_test, metrics,
+                                   params=dict(XGB_PARAMS, **(params or {}), calibration="sigmoid", cv=3),
+                                   lineage=lineage)
+
+    def register_model(self, calibrated_model, features, X_check, metrics, params, lineage):
+        """
+        Export the compiled scorer (checked against the sklearn model on X_check)
+        and register the version as current.
+        """
+        # Compiled NumPy scorer for serving/backtests, checked against the sklearn model
+        extra_files = {}
+        compiled_error = None
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            compiled_path = export_compiled(calibrated_model, features, os.path.join(tmp_dir, COMPILED_FILE))
+            compiled_error = verify_compiled(calibrated_model, CompiledScorer(compiled_path), X_check)
+            print(f"   Compiled scorer max error: {compiled_error:.2e}")
+            if compiled_error <= MAX_EXPORT_ERROR:
+                extra_files[COMPILED_FILE] = compiled_path
+            else:
+                print("   Compiled scorer rejected (error too large), serving will use the joblib artifact.")
+        except Exception as e:
+            print(f"   Compiled export failed: {e}")
+
+        metadata = self.registry.register(
+            XGB_MODEL,
+            calibrated_model,
+            features=features,
+            training_window=self.training_window,
+            metrics=dict(metrics, compiled_max_error=compiled_error),
+            params=params,
+            extra_files=extra_files,
+            lineage=lineage
+        )
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return metadata
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true", help="Update the current model from new matches only")
+    parser.add_argument("--mode", choices=["boost", "calibrate"], default="boost", help="Incremental update type")
+    parser.add_argument("--full", action="store_true", help="With --incremental: force a full retrain")
+    args = parser.parse_args()
+
     pipeline = MLPipeline()
-    raw_df = pipeline.fetch_data()
-    train_df = pipeline.feature_engineering(raw_df)
-    pipeline.train_model(train_df)
+    if args.incremental:
+        from ml.incremental import train_incremental
+        train_incremental(pipeline, args.mode, args.full)
+    else:
+        raw_df = pipeline.fetch_data()
+        pipeline.train_model(pipeline.feature_matrix(raw_df))
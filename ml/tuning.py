@@ -0,0 +1,231 @@
+"""
+Hyperparameter Search
+Evaluates XGBoost parameter sets for the calibrated match model with
+time-ordered CV (TimeSeriesSplit over the date-sorted feature matrix, so every
+validation fold is later than its training data) and registers the best one.
+The search only sees the training split of MLPipeline.train_model
+(chronological_split): its most recent TEST_SIZE rows stay an untouched test set.
+
+- grid:   every combination of SEARCH_SPACE (optionally capped to --trials, sampled)
+- random: --trials random combinations
+- bayes:  --trials sampled by optuna (TPE) when it is installed, else random
+
+Trials run in a process pool sized by the CPU budget: --cpus cores split into
+workers of --threads-per-trial XGBoost threads each. Results are cached per
+(feature matrix version, CV, params) in ml/.cache/tuning/trials.jsonl, so a
+rerun on unchanged data only evaluates new parameter sets.
+
+Usage:
+    python ml/tuning.py [--mode grid|random|bayes] [--trials 40] [--cv 4] [--cpus N] [--no-register]
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import log_loss, brier_score_loss
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.train_pipeline import MLPipeline, make_model, chronological_split, FEATURE_SET_VERSION
+from ml.feature_matrix import META_COLUMNS
+
+TUNING_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tuning", "trials.jsonl")
+CV_SPLITS = 4
+N_TRIALS = 40
+SEED = 42
+
+SEARCH_SPACE = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [3, 4, 6, 8],
+    "learning_rate": [0.03, 0.05, 0.1],
+    "subsample": [0.8, 1.0],
+    "min_child_weight": [1, 5]
+}
+
+def _optuna_available():
+    try:
+        import optuna # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def matrix_version(matrix):
+    """
+    Identifies the training data a trial was scored on: feature-set version,
+    row count and newest row. New matches or a feature bump invalidate trials.
+    """
+    last = matrix.iloc[-1] if len(matrix) else None
+    return f"{FEATURE_SET_VERSION}:{len(matrix)}:{last['match_id'] if last is not None else ''}"
+
+def trial_key(version, cv, params):
+    raw = json.dumps({"matrix": version, "cv": cv, "params": params}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+class TrialCache:
+    """
+    Append-only JSON lines of scored trials, keyed by trial_key().
+    """
+    def __init__(self, path=TUNING_CACHE):
+        self.path = path
+        self.trials = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        trial = json.loads(line)
+                        self.trials[trial['key']] = trial
+                    except (ValueError, KeyError):
+                        continue
+
+    def get(self, key):
+        return self.trials.get(key)
+
+    def add(self, trial):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(trial) + "\n")
+        self.trials[trial['key']] = trial
+
+def grid_candidates(space=SEARCH_SPACE):
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+def evaluate_params(params, X, y, cv=CV_SPLITS, n_jobs=1):
+    """
+    Mean out-of-sample log loss / Brier of the calibrated model over
+    time-ordered splits. Module level so it can run in worker processes.
+    """
+    started = time.time()
+    losses, briers = [], []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=cv).split(X):
+        model = make_model(params, n_jobs=n_jobs)
+        model.fit(X[train_idx], y[train_idx])
+        probs = model.predict_proba(X[test_idx])[:, 1]
+        losses.append(log_loss(y[test_idx], probs, labels=[0, 1]))
+        briers.append(brier_score_loss(y[test_idx], probs))
+    return {
+        "params": params,
+        "log_loss": float(np.mean(losses)),
+        "brier": float(np.mean(briers)),
+        "fold_log_loss": [round(float(v), 5) for v in losses],
+        "seconds": round(time.time() - started, 1)
+    }
+
+class Tuner:
+    def __init__(self, matrix, cv=CV_SPLITS, cpus=None, threads_per_trial=1, cache=None):
+        """
+        matrix: training rows only (the train part of chronological_split).
+        """
+        matrix = matrix.sort_values(['date', 'match_id'], kind='stable').reset_index(drop=True)
+        self.features = [c for c in matrix.columns if c not in META_COLUMNS and c != 'target']
+        self.X = matrix[self.features].to_numpy(dtype=np.float64)
+        self.y = matrix['target'].to_numpy(dtype=np.int64)
+        self.cv = cv
+        self.version = matrix_version(matrix)
+        self.threads = max(1, threads_per_trial)
+        self.workers = max(1, (cpus or os.cpu_count() or 1) // self.threads)
+        self.cache = cache or TrialCache()
+        self.results = []
+
+    def evaluate(self, candidates):
+        """
+        Score a batch of parameter sets (cached ones are not re-run).
+        """
+        keyed = [(trial_key(self.version, self.cv, p), p) for p in candidates]
+        todo = [(k, p) for k, p in keyed if not self.cache.get(k)]
+        print(f"   Trials: {len(keyed)} ({len(keyed) - len(todo)} cached), {self.workers} workers x {self.threads} threads")
+
+        if todo:
+            params = [p for _, p in todo]
+            if self.workers == 1 or len(todo) == 1:
+                scored = [evaluate_params(p, self.X, self.y, self.cv, self.threads) for p in params]
+            else:
+                n = len(params)
+                with ProcessPoolExecutor(max_workers=min(self.workers, n)) as pool:
+                    scored = list(pool.map(evaluate_params, params, [self.X] * n, [self.y] * n,
+                                           [self.cv] * n, [self.threads] * n))
+            for (key, _), result in zip(todo, scored):
+                self.cache.add(dict(result, key=key, matrix=self.version, cv=self.cv))
+                print(f"     log_loss {result['log_loss']:.4f} brier {result['brier']:.4f} ({result['seconds']}s) {result['params']}")
+
+        batch = [self.cache.get(k) for k, _ in keyed]
+        self.results.extend(batch)
+        return batch
+
+    def grid(self, trials=None):
+        candidates = grid_candidates()
+        if trials and trials < len(candidates):
+            candidates = random.Random(SEED).sample(candidates, trials)
+        return self.evaluate(candidates)
+
+    def random_search(self, trials=N_TRIALS):
+        candidates = grid_candidates()
+        return self.evaluate(random.Random(SEED).sample(candidates, min(trials, len(candidates))))
+
+    def bayes(self, trials=N_TRIALS):
+        """
+        Optuna TPE via ask/tell: each round asks for one trial per worker and
+        evaluates the round in parallel.
+        """
+        if not _optuna_available():
+            print("   optuna not installed, falling back to random search.")
+            return self.random_search(trials)
+        import optuna
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(direction="minimize", sampler=optuna.samplers.TPESampler(seed=SEED))
+        done = 0
+        while done < trials:
+            asked = [study.ask() for _ in range(min(self.workers, trials - done))]
+            candidates = [{k: t.suggest_categorical(k, SEARCH_SPACE[k]) for k in sorted(SEARCH_SPACE)} for t in asked]
+            for t, result in zip(asked, self.evaluate(candidates)):
+                study.tell(t, result['log_loss'])
+            done += len(asked)
+        return self.results
+
+    def best(self):
+        return min(self.results, key=lambda r: r['log_loss']) if self.results else None
+
+def tune(mode="random", trials=None, cv=CV_SPLITS, cpus=None, threads_per_trial=1, register=True):
+    print("--- Hyperparameter Search ---")
+    pipeline = MLPipeline()
+    matrix = pipeline.feature_matrix(pipeline.fetch_data())
+    # Same chronological split as train_model: the holdout it reports metrics on is never searched
+    train_rows, _ = chronological_split(matrix)
+    if len(train_rows) < cv * 50:
+        print("   Not enough history to tune.")
+        return None
+
+    tuner = Tuner(train_rows, cv, cpus, threads_per_trial)
+    if mode == "grid":
+        tuner.grid(trials)
+    elif mode == "bayes":
+        tuner.bayes(trials or N_TRIALS)
+    else:
+        tuner.random_search(trials or N_TRIALS)
+
+    best = tuner.best()
+    print(f"\n   Best: log_loss {best['log_loss']:.4f} brier {best['brier']:.4f} {best['params']}")
+    if register:
+        # Final model on the same training split (train_model re-splits the matrix
+        # identically), registered (and promoted) like a regular run
+        return pipeline.train_model(matrix, params=best['params'],
+                                    tuning={"mode": mode, "trials": len(tuner.results), "cv": cv,
+                                            "cv_log_loss": round(best['log_loss'], 4)})
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["grid", "random", "bayes"], default="random", help="Search strategy")
+    parser.add_argument("--trials", type=int, default=None, help=f"Parameter sets to evaluate (default: full grid / {N_TRIALS})")
+    parser.add_argument("--cv", type=int, default=CV_SPLITS, help="Time-ordered CV splits")
+    parser.add_argument("--cpus", type=int, default=None, help="CPU budget (default: all cores)")
+    parser.add_argument("--threads-per-trial", type=int, default=1, help="XGBoost threads per trial")
+    parser.add_argument("--no-register", action="store_true", help="Only report the best parameters")
+    args = parser.parse_args()
+    tune(args.mode, args.trials, args.cv, args.cpus, args.threads_per_trial, not args.no_register)
@@ -0,0 +1,174 @@
+"""
+Walk-Forward Backtest
+Time-ordered evaluation of the production model: matches are sorted by date
+and cut into consecutive out-of-sample folds. For every fold the model is
+retrained only on matches played before it (expanding window, or the last
+--window-days for a rolling window), then the whole fold is scored in one
+vectorized call. Folds are independent, so they run in parallel processes.
+
+Per fold: log loss, Brier score, accuracy, bets, ROI and max drawdown of the
+flat-stake value strategy, at real closing lines (--market-odds) or simulated
+odds as in ml/backtest.py.
+
+Usage:
+    python ml/walk_forward.py [--folds 5] [--mode expanding|rolling] [--window-days 365] [--workers N] [--market-odds]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.metrics import log_loss, brier_score_loss, accuracy_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.train_pipeline import MLPipeline, make_model
+from ml.feature_matrix import META_COLUMNS
+from ml.bankroll import simulate, strategy_grid
+from ml.odds_replay import load_market_odds, replay_odds, match_prices, two_sided_bets, match_names
+
+N_FOLDS = 5
+MIN_TRAIN_ROWS = 200
+WINDOW_DAYS = 365
+SEED = 42
+
+# Betting simulation (same rules as ml/backtest.py)
+BANKROLL = 1000.0
+STAKE = 20.0
+EDGE_THRESHOLD = 0.02
+MARKET_NOISE = 0.08
+MARGIN = 1.05
+
+def make_folds(dates, n_folds=N_FOLDS, mode="expanding", window_days=WINDOW_DAYS, min_train_rows=MIN_TRAIN_ROWS):
+    """
+    dates: match dates sorted oldest first.
+    Returns [(train_idx, test_idx), ...] as row positions. The history is cut
+    into n_folds + 1 blocks of about equal size; block 0 is only ever training
+    data. Boundaries are moved to the first match of a day so a day is never
+    split between train and test.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    n = len(dates)
+    folds = []
+    cuts = [int(round(n * k / (n_folds + 1))) for k in range(1, n_folds + 2)]
+    cuts = [int(np.searchsorted(dates, dates[c], side='left')) if c < n else n for c in cuts]
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        if end <= start:
+            continue
+        if mode == "rolling":
+            since = dates[start] - np.timedelta64(window_days, 'D')
+            train_start = int(np.searchsorted(dates, since, side='left'))
+        else:
+            train_start = 0
+        if start - train_start < min_train_rows:
+            continue
+        folds.append((np.arange(train_start, start), np.arange(start, end)))
+    return folds
+
+def simulate_bets(probs, outcomes, rng, market=None):
+    """
+    Flat-stake value betting over the fold (ml/bankroll.py).
+    market: real (odds_p1, odds_p2) per match (ml/odds_replay.py), both sides bet.
+    Without it, odds on P1 are simulated: model probability + N(0, MARKET_NOISE),
+    clamped, with a MARGIN vig.
+    """
+    if market is not None:
+        probs, odds, outcomes = two_sided_bets(probs, market[:, 0], market[:, 1], outcomes)
+    else:
+        odds = 1 / (np.clip(probs + rng.normal(0, MARKET_NOISE, len(probs)), 0.05, 0.95) * MARGIN)
+    strategy = strategy_grid(flat_stakes=(STAKE,), kelly_multipliers=(), min_edges=(EDGE_THRESHOLD,))
+    result = simulate(probs, odds, outcomes, strategy, bankroll=BANKROLL)[0].iloc[0]
+    return {
+        "bets": int(result['bets']),
+        "profit": float(result['final_bankroll'] - BANKROLL),
+        "roi": float(result['roi']),
+        "max_drawdown": float(result['max_drawdown'])
+    }
+
+def run_fold(fold, X_train, y_train, X_test, y_test, params=None, market=None, seed=SEED):
+    """
+    Train on the fold's past, score the fold in one call. Module level so it
+    can be sent to worker processes.
+    """
+    started = time.time()
+    model = make_model(params, n_jobs=1) # One core per fold, folds are the parallel unit
+    model.fit(X_train, y_train)
+    probs = model.predict_proba(X_test)[:, 1]
+    result = {
+        "fold": fold,
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "log_loss": float(log_loss(y_test, probs, labels=[0, 1])),
+        "brier": float(brier_score_loss(y_test, probs)),
+        "accuracy": float(accuracy_score(y_test, probs >= 0.5))
+    }
+    result.update(simulate_bets(probs, y_test, np.random.default_rng(seed + fold), market))
+    result["seconds"] = round(time.time() - started, 1)
+    return result
+
+def walk_forward(matrix, n_folds=N_FOLDS, mode="expanding", window_days=WINDOW_DAYS, workers=None, params=None, prices=None):
+    """
+    matrix: MLPipeline.feature_matrix() output (match_id, date, features, target).
+    prices: optional odds_replay.match_prices() output; bets use real odds when given.
+    Returns a DataFrame with one row per fold.
+    """
+    matrix = matrix.sort_values('date', kind='stable').reset_index(drop=True)
+    features = [c for c in matrix.columns if c not in META_COLUMNS and c != 'target']
+    X = matrix[features].to_numpy(dtype=np.float64)
+    y = matrix['target'].to_numpy(dtype=np.int64)
+    market = None
+    if prices is not None:
+        market = matrix[['match_id']].astype(str).merge(prices, on='match_id', how='left')[['odds_p1', 'odds_p2']].to_numpy(dtype=np.float64)
+
+    folds = make_folds(matrix['date'], n_folds, mode, window_days)
+    if not folds:
+        print("   Not enough history for a walk-forward split.")
+        return pd.DataFrame()
+
+    jobs = []
+    for k, (train_idx, test_idx) in enumerate(folds):
+        jobs.append((k, X[train_idx], y[train_idx], X[test_idx], y[test_idx], params,
+                     market[test_idx] if market is not None else None))
+        print(f"   Fold {k}: train {matrix['date'].iloc[train_idx[0]]:%Y-%m-%d}..{matrix['date'].iloc[train_idx[-1]]:%Y-%m-%d} ({len(train_idx)}), "
+              f"test {matrix['date'].iloc[test_idx[0]]:%Y-%m-%d}..{matrix['date'].iloc[test_idx[-1]]:%Y-%m-%d} ({len(test_idx)})")
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        results = [run_fold(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_fold, *zip(*jobs)))
+    return pd.DataFrame(results)
+
+def summarize(results):
+    print("\n--- Walk-Forward Results ---")
+    print(results.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    weights = results['test_rows']
+    print("\n--- Aggregate ---")
+    print(f"Out-of-sample matches: {int(weights.sum())} in {len(results)} folds")
+    print(f"Log Loss (weighted): {np.average(results['log_loss'], weights=weights):.4f}")
+    print(f"Brier (weighted): {np.average(results['brier'], weights=weights):.4f}")
+    print(f"Total Bets: {int(results['bets'].sum())}, Profit: ${results['profit'].sum():.2f}")
+    print(f"Mean ROI per fold: {results['roi'].mean():.2f}%, Worst Drawdown: {results['max_drawdown'].max():.2f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=N_FOLDS, help="Out-of-sample folds")
+    parser.add_argument("--mode", choices=["expanding", "rolling"], default="expanding", help="Training window")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Rolling window length")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel folds (default: CPU count)")
+    parser.add_argument("--market-odds", action="store_true", help="Bet at real closing lines from market_odds")
+    args = parser.parse_args()
+
+    print("--- Walk-Forward Backtest ---")
+    pipeline = MLPipeline()
+    raw_df = pipeline.fetch_data()
+    matrix = pipeline.feature_matrix(raw_df)
+    prices = None
+    if args.market_odds:
+        matches = matrix[['match_id', 'date']].astype({'match_id': str}).merge(match_names(raw_df), on='match_id', how='left')
+        prices = match_prices(replay_odds(matches, load_market_odds(pipeline.db)))
+    results = walk_forward(matrix, args.folds, args.mode, args.window_days, args.workers, prices=prices)
+    if not results.empty:
+        summarize(results)
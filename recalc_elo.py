@@ -40,10 +40,10 @@ def recalc_history():
     matches = r.json()
     print(f"Processing {len(matches)} matches...")
     
-    for i, m in enumerate(matches):
-        if i % 50 == 0:
-            print(f"  Processing {i}/{len(matches)}...")
-        engine.process_match(m)
+    # Replay in memory and write ratings back in one upsert
+    # (per-match read/write made year-long backfills impractical)
+    updated = engine.process_matches(matches)
+    print(f"  Updated {updated} rating rows.")
         
     print("ELO Recalculation Complete.")
 
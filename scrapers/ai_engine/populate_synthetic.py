@@ -1,7 +1,23 @@
+"""
+Synthetic Data
+Reproducible (seeded) generators for realistic-looking tennis data, shared by
+the REST populator below and the benchmark suite (benchmarks/run.py):
+
+- players:  latent skill (+ per-surface offsets) -> rank_single, points
+- matches:  weighted by activity, surface by season, Grand Slams best of 5;
+            outcomes and set scores drawn from the skill gap
+- fixtures: upcoming matches (no winner/score yet)
+- odds:     bookmaker snapshots drifting towards the true price before the start
+- ledger:   resolved prediction_ledger rows from a slightly noisy model
+
+Generators are vectorized with NumPy and return DataFrames; `to_records`
+turns them into JSON-ready rows (ISO dates, None for missing values).
+"""
 import os
 import requests
 import random
 import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -18,84 +34,394 @@ HEADERS = {
     "Prefer": "return=minimal"
 }
 
-def populate_synthetic_data(num_matches=1000):
+TOP_PLAYERS = [
+    "Jannik Sinner", "Carlos Alcaraz", "Novak Djokovic", "Daniil Medvedev",
+    "Alexander Zverev", "Andrey Rublev", "Holger Rune", "Casper Ruud",
+    "Stefanos Tsitsipas", "Hubert Hurkacz", "Taylor Fritz", "Grigor Dimitrov",
+    "Tommy Paul", "Ben Shelton", "Frances Tiafoe", "Karen Khachanov"
+]
+FIRST_NAMES = [
+    "Alex", "Luca", "Mateo", "Hugo", "Daniel", "Jan", "Marco", "Felix", "Tomas", "Pablo",
+    "Nicolas", "Arthur", "Jakub", "Adrian", "Sebastian", "Leo", "Emil", "Kai", "Ivan", "Yuki",
+    "Diego", "Oscar", "Lorenzo", "Stefan", "Rafael", "Mikael", "Jordan", "Benoit", "Taro", "Nuno"
+]
+LAST_NAMES = [
+    "Moreno", "Keller", "Novak", "Rossi", "Duval", "Horvat", "Silva", "Lindqvist", "Kovac", "Ferreira",
+    "Bauer", "Marchetti", "Petrov", "Laurent", "Sato", "Jensen", "Navarro", "Kowalski", "Costa", "Weber",
+    "Ortiz", "Nielsen", "Popescu", "Garcia", "Fischer", "Romero", "Dumont", "Ivanov", "Tanaka", "Haas"
+]
+COUNTRIES = ["ESP", "ITA", "FRA", "USA", "ARG", "GER", "AUS", "SRB", "CZE", "GBR", "RUS", "CAN", "JPN", "POR", "CHI"]
+
+SURFACES = ['hard', 'clay', 'grass', 'indoor']
+# Surface weights by month (clay spring, short grass swing, indoor autumn)
+SURFACE_SEASON = {
+    1: [1.0, 0.05, 0, 0.05], 2: [0.6, 0.3, 0, 0.1], 3: [0.95, 0.05, 0, 0],
+    4: [0.1, 0.9, 0, 0], 5: [0.05, 0.95, 0, 0], 6: [0.1, 0.4, 0.5, 0],
+    7: [0.3, 0.5, 0.2, 0], 8: [0.9, 0.1, 0, 0], 9: [0.7, 0.1, 0, 0.2],
+    10: [0.4, 0, 0, 0.6], 11: [0.2, 0, 0, 0.8], 12: [0.8, 0, 0, 0.2]
+}
+TOURNAMENTS = {
+    'hard': ["Miami Open", "Indian Wells Masters", "Cincinnati Open", "Canadian Open", "Dubai Championships", "China Open"],
+    'clay': ["Monte-Carlo Masters", "Madrid Open", "Italian Open", "Barcelona Open", "Hamburg Open", "Rio Open"],
+    'grass': ["Queen's Club Championships", "Halle Open", "Eastbourne International"],
+    'indoor': ["Paris Masters", "Vienna Open", "Basel Indoors", "Stockholm Open"]
+}
+# (month, surface, name): played best of 5
+GRAND_SLAMS = [(1, 'hard', "Australian Open"), (6, 'clay', "Roland Garros"), (7, 'grass', "Wimbledon"), (9, 'hard', "US Open")]
+GRAND_SLAM_SHARE = 0.15 # Matches of a slam month played at the slam
+
+SKILL_SCALE = 0.5          # Logit of P(win a set) per unit of skill gap
+SURFACE_SKILL_SD = 0.3
+LOSER_GAMES = [0, 1, 2, 3, 4, 5, 6] # 5 -> 7-5, 6 -> 7-6
+LOSER_GAMES_P = [0.04, 0.09, 0.16, 0.22, 0.24, 0.11, 0.14]
+
+BOOKMAKERS = {'pinnacle': 1.025, 'betfair': 1.02, 'bet365': 1.06, 'williamhill': 1.07, 'unibet': 1.065}
+SHARP_NOISE = 0.08         # Logit noise of a sharp book's closing line
+SOFT_NOISE = 0.18
+OPENING_DRIFT = 0.25       # Extra logit noise at the first snapshot, gone at the close
+SNAPSHOT_HOURS = 72        # First snapshot this long before the start
+MAX_PRICE = 500.0          # market_odds prices are NUMERIC(5, 2)
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _uuids(n, rng):
+    """
+    Deterministic UUID4-shaped ids from the generator's stream.
+    """
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    # One hex string sliced per id: ~3x faster than uuid.UUID objects at millions of rows
+    hx = raw.tobytes().hex()
+    return [f"{hx[i:i + 8]}-{hx[i + 8:i + 12]}-{hx[i + 12:i + 16]}-{hx[i + 16:i + 20]}-{hx[i + 20:i + 32]}"
+            for i in range(0, len(hx), 32)]
+
+def to_records(df):
+    """
+    DataFrame -> list of JSON-ready dicts (ISO timestamps, None for NaN).
+    """
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime('%Y-%m-%dT%H:%M:%S')
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict('records')
+
+def generate_players(n, seed=42, top_names=TOP_PLAYERS, first_names=FIRST_NAMES):
+    """
+    id, name, rank_single, points, plays_hand, country, skill and per-surface
+    offsets (skill_hard, ...). Ranks follow skill plus noise. The best players
+    take `top_names`, the rest are drawn from `first_names` x LAST_NAMES.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(top_names[:n])
+    seen = set(names)
+    while len(names) < n:
+        name = f"{rng.choice(first_names)} {rng.choice(LAST_NAMES)}"
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+
+    skill = np.sort(rng.normal(0.0, 1.0, n))[::-1]
+    rank = np.argsort(np.argsort(-(skill + rng.normal(0.0, 0.2, n)))) + 1
+    players = pd.DataFrame({
+        'id': _uuids(n, rng),
+        'name': names,
+        'rank_single': rank,
+        'points': np.round(12000 * np.exp(-rank / (n / 8 + 5))).astype(int) + 10,
+        'plays_hand': rng.choice(['R', 'L'], n, p=[0.85, 0.15]),
+        'country': rng.choice(COUNTRIES, n),
+        'skill': skill
+    })
+    for surface in SURFACES:
+        players[f'skill_{surface}'] = rng.normal(0.0, SURFACE_SKILL_SD, n)
+    return players
+
+def player_rows(players):
+    """
+    Player columns of the `players` table (latent skill dropped).
+    """
+    return players[['id', 'name', 'rank_single', 'points', 'plays_hand', 'country']]
+
+def set_win_probability(players, p1_idx, p2_idx, surfaces):
+    """
+    P(player 1 wins a set) from the skill gap on the match surface.
+    """
+    gap = players['skill'].to_numpy()[p1_idx] - players['skill'].to_numpy()[p2_idx]
+    for surface in SURFACES:
+        mask = surfaces == surface
+        offsets = players[f'skill_{surface}'].to_numpy()
+        gap[mask] += offsets[p1_idx[mask]] - offsets[p2_idx[mask]]
+    return _expit(SKILL_SCALE * gap)
+
+def _draw_pairs(players, n, rng):
+    # Better players go deeper in draws, so they play more often
+    rank = players['rank_single'].to_numpy()
+    activity = np.exp(-rank / (len(players) / 3)) + 0.2
+    activity /= activity.sum()
+    p1 = rng.choice(len(players), n, p=activity)
+    p2 = rng.choice(len(players), n, p=activity)
+    clash = p1 == p2
+    while clash.any():
+        p2[clash] = rng.choice(len(players), clash.sum(), p=activity)
+        clash = p1 == p2
+    return p1, p2
+
+def _schedule(n, start, days, rng, tournaments=TOURNAMENTS, grand_slams=GRAND_SLAMS, slam_best_of=5):
+    """
+    Sorted kick-off times, surfaces, tournaments and best-of per match.
+    """
+    minutes = np.sort(rng.integers(0, max(days, 1), n) * 1440 + rng.integers(10, 22, n) * 60)
+    offsets = minutes // 1440
+    dates = pd.Timestamp(start).normalize() + pd.to_timedelta(minutes, unit='m')
+    months = dates.month.to_numpy()
+    surfaces = np.empty(n, dtype=object)
+    events = np.empty(n, dtype=object)
+    best_of = np.full(n, 3)
+    weeks = (offsets // 7).astype(int)
+
+    for month, weights in SURFACE_SEASON.items():
+        idx = np.flatnonzero(months == month)
+        if not len(idx):
+            continue
+        p = np.asarray(weights, dtype=float) / sum(weights)
+        surfaces[idx] = rng.choice(SURFACES, len(idx), p=p)
+        for s in SURFACES:
+            sub = idx[surfaces[idx] == s]
+            names = tournaments[s]
+            # One event per (week, surface), rotating through the calendar
+            events[sub] = [names[w % len(names)] for w in weeks[sub]]
+        for slam_month, slam_surface, slam in grand_slams:
+            if slam_month == month:
+                sub = idx[(surfaces[idx] == slam_surface) & (rng.random(len(idx)) < GRAND_SLAM_SHARE)]
+                events[sub] = slam
+                best_of[sub] = slam_best_of
+    return dates, surfaces, events, best_of
+
+def _score_sets(set_prob, best_of, rng):
+    """
+    Set-by-set simulation: (p1 won the match, score strings from player 1's side).
+    """
+    n = len(set_prob)
+    need = (best_of + 1) // 2
+    p1_sets = rng.random((n, 5)) < set_prob[:, None]
+    c1 = np.cumsum(p1_sets, axis=1)
+    c2 = np.cumsum(~p1_sets, axis=1)
+    finished = (c1 >= need[:, None]) | (c2 >= need[:, None])
+    played = finished.argmax(axis=1) + 1
+    p1_won = c1[np.arange(n), played - 1] >= need
+
+    loser = rng.choice(LOSER_GAMES, size=(n, 5), p=LOSER_GAMES_P)
+    winner_games = np.where(loser >= 5, 7, 6)
+    won = np.char.add(np.char.add(winner_games.astype(str), '-'), loser.astype(str))
+    lost = np.char.add(np.char.add(loser.astype(str), '-'), winner_games.astype(str))
+    sets = np.where(p1_sets, won, lost).astype(object)
+
+    score = pd.Series(sets[:, 0])
+    for k in range(1, 5):
+        score = score.where(played <= k, score + ' ' + sets[:, k])
+    return p1_won, score.to_numpy()
+
+def generate_matches(players, n, start_date=None, days=365, seed=42, **calendar):
+    """
+    n completed matches over `days` days from start_date (default: `days` ago).
+    Columns of `matches` plus best_of and p1_set_prob (true P(player 1 wins a set)).
+    calendar: tournaments / grand_slams / slam_best_of overrides (other tours).
+    """
+    rng = np.random.default_rng(seed)
+    start = start_date or (datetime.now() - timedelta(days=days))
+    dates, surfaces, tournaments, best_of = _schedule(n, start, days, rng, **calendar)
+    p1, p2 = _draw_pairs(players, n, rng)
+    set_prob = set_win_probability(players, p1, p2, surfaces)
+    p1_won, score = _score_sets(set_prob, best_of, rng)
+
+    ids = players['id'].to_numpy()
+    return pd.DataFrame({
+        'id': _uuids(n, rng),
+        'tournament_name': tournaments,
+        'date': dates,
+        'surface': surfaces,
+        'player1_id': ids[p1],
+        'player2_id': ids[p2],
+        'winner_id': np.where(p1_won, ids[p1], ids[p2]),
+        'score_full': score,
+        'best_of': best_of,
+        'p1_set_prob': set_prob
+    })
+
+def generate_fixtures(players, n, days_ahead=2, seed=43):
+    """
+    Upcoming (unplayed) matches over the next `days_ahead` days.
+    """
+    rng = np.random.default_rng(seed)
+    dates, surfaces, tournaments, best_of = _schedule(n, datetime.now() + timedelta(days=1), days_ahead, rng)
+    p1, p2 = _draw_pairs(players, n, rng)
+    ids = players['id'].to_numpy()
+    return pd.DataFrame({
+        'id': _uuids(n, rng),
+        'tournament_name': tournaments,
+        'date': dates,
+        'surface': surfaces,
+        'player1_id': ids[p1],
+        'player2_id': ids[p2],
+        'winner_id': None,
+        'score_full': None,
+        'best_of': best_of,
+        'p1_set_prob': set_win_probability(players, p1, p2, surfaces)
+    })
+
+def match_win_probability(set_prob, best_of):
+    """
+    P(player 1 wins the match) from the set probability (best of 3 or 5).
+    """
+    p, q = set_prob, 1 - set_prob
+    bo3 = p ** 2 * (1 + 2 * q)
+    bo5 = p ** 3 * (1 + 3 * q + 6 * q ** 2)
+    return np.where(best_of == 5, bo5, bo3)
+
+def generate_odds(matches, players, bookmakers=None, snapshots=4, seed=44, end=None):
+    """
+    market_odds snapshots per (match, bookmaker): `snapshots` pre-match prices
+    evenly spaced from SNAPSHOT_HOURS before the start to the close (15 minutes
+    before the start, or `end` if earlier; a single snapshot is the close),
+    converging to a noisy estimate of the true price, with the book's margin.
+    Home/away follow player1/player2 except for ~10% of listings.
+    """
+    rng = np.random.default_rng(seed)
+    books = bookmakers or list(BOOKMAKERS)
+    names = dict(zip(players['id'], players['name']))
+    true_prob = match_win_probability(matches['p1_set_prob'].to_numpy(), matches['best_of'].to_numpy())
+    true_logit = np.log(true_prob / (1 - true_prob))
+    starts = pd.to_datetime(matches['date']).to_numpy().astype('datetime64[s]')
+    last = starts - np.timedelta64(15, 'm')
+    if end is not None:
+        last = np.minimum(last, np.datetime64(pd.Timestamp(end).to_pydatetime(), 's'))
+    first = np.minimum(starts - np.timedelta64(SNAPSHOT_HOURS, 'h'), last)
+    p1_names = matches['player1_id'].map(names).to_numpy()
+    p2_names = matches['player2_id'].map(names).to_numpy()
+    n = len(matches)
+
+    frames = []
+    for book in books:
+        margin = BOOKMAKERS.get(book, 1.06)
+        noise = SHARP_NOISE if book in ('pinnacle', 'betfair') else SOFT_NOISE
+        closing = true_logit + rng.normal(0.0, noise, n)
+        opening = rng.normal(0.0, OPENING_DRIFT, n)
+        swapped = rng.random(n) < 0.1
+        for k in range(snapshots):
+            frac = k / (snapshots - 1) if snapshots > 1 else 1.0 # 0 at the first snapshot, 1 at the close
+            prob = _expit(closing + opening * (1 - frac))
+            at = first + ((last - first) * frac).astype('timedelta64[s]')
+            price_p1 = np.round(np.clip(1 / (prob * margin), 1.01, MAX_PRICE), 2)
+            price_p2 = np.round(np.clip(1 / ((1 - prob) * margin), 1.01, MAX_PRICE), 2)
+            frames.append(pd.DataFrame({
+                'match_id': matches['id'].to_numpy(),
+                'bookmaker': book,
+                'player_home': np.where(swapped, p2_names, p1_names),
+                'player_away': np.where(swapped, p1_names, p2_names),
+                'price_home': np.where(swapped, price_p2, price_p1),
+                'price_away': np.where(swapped, price_p1, price_p2),
+                'extracted_at': at.astype('datetime64[ns]'),
+                'is_live': False
+            }))
+    odds = pd.concat(frames, ignore_index=True).sort_values('extracted_at', kind='stable').reset_index(drop=True)
+    odds.insert(0, 'id', _uuids(len(odds), rng))
+    return odds
+
+def generate_ledger(matches, fraction=0.5, model_version="xgb_calibrated@synthetic", seed=45):
+    """
+    Resolved prediction_ledger rows for a sample of completed matches, from a
+    model that sees the true probability through logit noise (slightly overconfident).
+    """
+    rng = np.random.default_rng(seed)
+    sample = matches[rng.random(len(matches)) < fraction]
+    n = len(sample)
+    true_prob = match_win_probability(sample['p1_set_prob'].to_numpy(), sample['best_of'].to_numpy())
+    logit = np.log(true_prob / (1 - true_prob))
+    prob_p1 = np.round(np.clip(_expit(1.1 * logit + rng.normal(0.0, 0.3, n)), 0.01, 0.99), 4)
+    home_odds = np.round(np.clip(1 / (true_prob * 1.05), 1.01, MAX_PRICE), 2)
+    away_odds = np.round(np.clip(1 / ((1 - true_prob) * 1.05), 1.01, MAX_PRICE), 2)
+    pick_p1 = prob_p1 >= 0.5
+    p1_won = (sample['winner_id'] == sample['player1_id']).to_numpy()
+    won = pick_p1 == p1_won
+    price = np.where(pick_p1, home_odds, away_odds)
+    prob = np.where(pick_p1, prob_p1, 1 - prob_p1)
+    dates = pd.to_datetime(sample['date'])
+    return pd.DataFrame({
+        'id': _uuids(n, rng),
+        'match_id': sample['id'].to_numpy(),
+        'prediction_date': dates - pd.Timedelta(hours=12),
+        'prob_p1': prob_p1,
+        'prob_p2': np.round(1 - prob_p1, 4),
+        'model_version': model_version,
+        'bookmaker': rng.choice(list(BOOKMAKERS), n),
+        'home_odds': home_odds,
+        'away_odds': away_odds,
+        'selected_pick': np.where(pick_p1, 'player_a', 'player_b'),
+        'ev_calculated': np.round(np.clip((prob * price - 1) * 100, -100, 9999.99), 2), # NUMERIC(6, 2)
+        'stake_suggested': np.round(np.clip((prob * price - 1) / (price - 1), 0, 0.2) * 50, 2),
+        'result_status': np.where(won, 'won', 'lost'),
+        'profit_loss': np.round(np.where(won, price - 1, -1.0), 2),
+        'resolved_at': dates + pd.Timedelta(hours=3)
+    })
+
+def match_rows(matches):
+    """
+    Columns of the `matches` table (generator-only columns dropped).
+    """
+    return matches.drop(columns=['best_of', 'p1_set_prob']).assign(stats_json=[{"generated": True}] * len(matches))
+
+def populate_synthetic_data(num_matches=1000, num_players=16, seed=None):
     print(f"Generating {num_matches} synthetic matches...")
-    
-    # 1. Create/Get Dummy Players
-    top_players = [
-        "Jannik Sinner", "Carlos Alcaraz", "Novak Djokovic", "Daniil Medvedev", 
-        "Alexander Zverev", "Andrey Rublev", "Holger Rune", "Casper Ruud",
-        "Stefanos Tsitsipas", "Hubert Hurkacz", "Taylor Fritz", "Grigor Dimitrov",
-        "Tommy Paul", "Ben Shelton", "Frances Tiafoe", "Karen Khachanov"
-    ]
-    
-    player_ids = []
+    seed = seed if seed is not None else random.randrange(1 << 30)
+
+    # 1. Create/Get Players (ids as stored in the DB)
+    players = generate_players(num_players, seed)
+
+    player_ids = {}
     print("Upserting players...")
-    for name in top_players:
-        payload = {"name": name, "plays_hand": "R", "country": "UNK"}
+    for row in to_records(player_rows(players).drop(columns=['id'])):
+        name = row['name']
         try:
-            r = requests.post(f"{SUPABASE_URL}/rest/v1/players", 
-                             headers={**HEADERS, "Prefer": "return=representation,resolution=merge-duplicates"}, 
-                             json=payload)
+            r = requests.post(f"{SUPABASE_URL}/rest/v1/players",
+                             headers={**HEADERS, "Prefer": "return=representation,resolution=merge-duplicates"},
+                             json=row)
             if r.status_code in [200, 201] and r.json():
-                player_ids.append(r.json()[0]['id'])
+                player_ids[name] = r.json()[0]['id']
             else:
                 if r.status_code == 409:
                     # Fetch existing
                     url_get = f"{SUPABASE_URL}/rest/v1/players?name=eq.{name}&select=id"
                     r2 = requests.get(url_get, headers=HEADERS)
                     if r2.status_code == 200 and r2.json():
-                        player_ids.append(r2.json()[0]['id'])
+                        player_ids[name] = r2.json()[0]['id']
                         print(f"    Found existing {name}")
                 else:
                      print(f"    Failed {name}: {r.status_code} - {r.text[:100]}")
         except Exception as e:
             print(f"Error player {name}: {e}")
-            
+
     if len(player_ids) < 2:
         print("Not enough players.")
         return
 
     # 2. Generate Matches
-    matches = []
-    surfaces = ['hard', 'clay', 'grass']
-    start_date = datetime.now() - timedelta(days=365)
-    
-    for i in range(num_matches):
-        p1 = random.choice(player_ids)
-        p2 = random.choice(player_ids)
-        if p1 == p2: continue
-        
-        date = start_date + timedelta(days=random.randint(0, 365))
-        surface = random.choice(surfaces)
-        
-        # Determine winner (random for synthetic, but keep some consistency if we wanted)
-        winner = p1 if random.random() > 0.5 else p2
-        
-        # Score
-        score = "6-4 6-4" if random.random() > 0.5 else "6-3 4-6 6-4"
-        
-        match = {
-            "tournament_name": f"Synthetic Open {surface}",
-            "date": date.strftime("%Y-%m-%d"),
-            "surface": surface,
-            "player1_id": p1, # In DB schema, p1/p2 fields, winner_id indicates outcome
-            "player2_id": p2,
-            "winner_id": winner,
-            "score_full": score,
-            "stats_json": {"generated": True}
-        }
-        matches.append(match)
-        
-        if len(matches) >= 100:
-            # Batch Insert
-            # print(f"Debug Match Payload: {matches[0]}")
-            r = requests.post(f"{SUPABASE_URL}/rest/v1/matches", headers=HEADERS, json=matches)
-            if r.status_code != 201:
-                print(f"Error inserting batch: {r.text}") # Full text
-            else:
-                print(f"Inserted batch of {len(matches)}")
-            matches = []
+    players = players[players['name'].isin(player_ids)].reset_index(drop=True)
+    players['id'] = players['name'].map(player_ids)
+    matches = match_rows(generate_matches(players, num_matches, seed=seed)).drop(columns=['id'])
+    matches['date'] = matches['date'].dt.strftime("%Y-%m-%d")
+    records = to_records(matches)
+
+    for i in range(0, len(records), 100):
+        # Batch Insert
+        batch = records[i:i + 100]
+        r = requests.post(f"{SUPABASE_URL}/rest/v1/matches", headers=HEADERS, json=batch)
+        if r.status_code != 201:
+            print(f"Error inserting batch: {r.text}") # Full text
+        else:
+            print(f"Inserted batch of {len(batch)}")
 
     print("Synthetic population complete.")
 
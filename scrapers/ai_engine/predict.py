@@ -1,4 +1,5 @@
 import os
+import sys
 import requests
 import pandas as pd
 import joblib
@@ -8,6 +9,12 @@ from dotenv import load_dotenv
 base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(base_path, '.env'))
 
+sys.path.append(os.path.dirname(base_path))
+from ml.registry import ModelRegistry, RF_MODEL
+from ai_engine.feature_builder import FeatureBuilder
+
+FEATURE_SET_VERSION = "v2" # Must match scrapers/ai_engine/training.py
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
@@ -21,10 +28,21 @@ HEADERS = {
 MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tennis_model.pkl')
 
 def load_ai_model():
+    """
+    Current registered version (dict with 'artifact_id' added), or the legacy pickle.
+    """
+    try:
+        artifact, metadata = ModelRegistry().load(RF_MODEL)
+        if metadata.get('params', {}).get('feature_set', 'v1') != FEATURE_SET_VERSION:
+            print(f"Warning: {metadata['artifact_id']} was trained on an older feature set "
+                  f"(surface rates now use normalized surfaces). Retrain with training.py.")
+        return dict(artifact, artifact_id=metadata['artifact_id'])
+    except FileNotFoundError:
+        pass
     if not os.path.exists(MODEL_PATH):
         print("Model not found. Run training.py first.")
         return None
-    return joblib.load(MODEL_PATH)
+    return dict(joblib.load(MODEL_PATH), artifact_id="v1_rfc_rest_syn")
 
 def get_player_history_rest(player_id, before_date):
     # Fetch recent history via REST
@@ -87,37 +105,22 @@ def predict_upcoming_matches():
         # Fetch P2 history
         hist_p2 = get_player_history_rest(p2, today_iso)
         
-        def calculate_stats(history, player, opponent, surf):
-            if not history: return 0.5, 0.5, 0.5
-            
-            # Surface WR
-            s_matches = [x for x in history if x.get('surface') == surf]
-            wins = len([x for x in s_matches if x.get('winner_id') == player])
-            wr = wins / len(s_matches) if s_matches else 0.5
-            
-            # Form
-            rec = history[:10]
-            wins_rec = len([x for x in rec if x.get('winner_id') == player])
-            form = wins_rec / len(rec) if rec else 0.5
-            
-            # H2H - Filter from history where opponent is opponent
-            # In history, 'opponent' is not explicitly stored in matches table rows, 
-            # we must infer it. A match has p1_id, p2_id.
-            # If we are 'player', 'opponent' is the other one.
-            # But get_player_history_rest returns row dicts.
-            
-            # Refine H2H logic for ID schema:
-            h2h_matches = [
-                x for x in history 
-                if (x.get('player1_id') == opponent or x.get('player2_id') == opponent)
-            ]
-            wins_h2h = len([x for x in h2h_matches if x.get('winner_id') == player])
-            h2h = wins_h2h / len(h2h_matches) if h2h_matches else 0.5
-            
-            return wr, form, h2h
+        # Replay both histories (deduped, oldest first) through the same
+        # incremental builder the training pipeline uses
+        builder = FeatureBuilder()
+        seen = set()
+        for x in sorted(hist_p1 + hist_p2, key=lambda x: str(x.get('date'))):
+            if x.get('id') in seen or not x.get('player1_id') or not x.get('player2_id'):
+                continue
+            seen.add(x.get('id'))
+            builder.update(x['player1_id'], x['player2_id'], x.get('winner_id'), x.get('surface'), x.get('date'))
+
+        def calculate_stats(player, opponent, surf):
+            if not builder.matches_played(player): return 0.5, 0.5, 0.5
+            return builder.surface_rate(player, surf), builder.form_rate(player, 10), builder.h2h_rate(player, opponent)
 
-        wr_a, form_a, h2h_a = calculate_stats(hist_p1, p1, p2, surface)
-        wr_b, form_b, h2h_b = calculate_stats(hist_p2, p2, p1, surface)
+        wr_a, form_a, h2h_a = calculate_stats(p1, p2, surface)
+        wr_b, form_b, h2h_b = calculate_stats(p2, p1, surface)
         
         # Encode surface
         try:
@@ -156,7 +159,7 @@ def predict_upcoming_matches():
             "suggested_pick": pick, # storing ID for now
             "confidence_percent": round(conf * 100, 1),
             "risk_level": risk,
-            "ai_model_version": "v1_rfc_rest_syn",
+            "ai_model_version": artifact['artifact_id'],
             "created_at": today_iso
         }
         
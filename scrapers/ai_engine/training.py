@@ -1,8 +1,7 @@
 import os
 import sys
 import pandas as pd
-import numpy as np
-import joblib
+import hashlib
 import requests
 from datetime import datetime
 from dotenv import load_dotenv
@@ -11,6 +10,11 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import LabelEncoder
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from ml.registry import ModelRegistry, RF_MODEL
+from ai_engine.feature_builder import FeatureBuilder
+from ml.feature_matrix import build_feature_matrix, META_COLUMNS
+
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
@@ -27,8 +31,11 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'tennis_model.pkl')
-ENCODER_PATH = os.path.join(os.path.dirname(__file__), 'encoders.pkl')
+# Bump when feature logic changes (invalidates the cached matrix).
+# v2: surface win rates keyed by normalize_surface instead of the raw string;
+# models trained on v1 rows must be retrained (predict.py warns).
+FEATURE_SET_VERSION = "v2"
+SWAP_SEED = 42
 
 def fetch_historical_data_rest():
     print("Fetching historical match data via REST API...")
@@ -51,93 +58,85 @@ def fetch_historical_data_rest():
         print(f"Error requesting data: {e}")
         return pd.DataFrame()
 
+def swap_sides(match_id):
+    """
+    Deterministic per-match side swap (same answer on every run and for
+    incrementally cached rows), so training is reproducible.
+    """
+    digest = hashlib.sha1(f"{SWAP_SEED}:{match_id}".encode()).digest()
+    return digest[0] & 1 == 1
+
+def feature_row(state, row):
+    builder = state['builder'] # Incremental per-player / per-surface state (O(1) per match)
+
+    p1 = row.get('player1_id')
+    p2 = row.get('player2_id')
+    winner_id = row.get('winner_id')
+    
+    if not p1 or not p2: return None
+    
+    surface = row.get('surface', 'Hard')
+    date = row['date']
+    
+    # --- Helper to calculate stats ---
+    def get_stats(player, opponent):
+        count = builder.matches_played(player)
+        if not count:
+            return {'wr': 0.5, 'form': 0.5, 'h2h': 0.5, 'count': 0}
+        return {
+            'wr': builder.surface_rate(player, surface),    # Surface WR
+            'form': builder.form_rate(player, 10),          # Form (Last 10)
+            'h2h': builder.h2h_rate(player, opponent),      # H2H vs this opponent
+            'count': count
+        }
+        
+    # --- Swap sides for training (seeded per match) ---
+    # p1 and p2 are IDs. We need to know who won.
+    # Check if p1 == winner_id
+    p1_won = (p1 == winner_id)
+    
+    if swap_sides(row['id']):
+        player_a, player_b = p2, p1
+        target = 0 if p1_won else 1 # A is p2: A won only if p1 lost
+    else:
+        player_a, player_b = p1, p2
+        target = 1 if p1_won else 0
+        
+    stats_a = get_stats(player_a, player_b)
+    stats_b = get_stats(player_b, player_a)
+    
+    # --- Update History (Post-Match) ---
+    builder.update(p1, p2, winner_id, surface, date)
+    
+    # Skip training if not enough history
+    # Relax constraint for synthetic demo to ensure SOME training happens even with low history at start
+    if stats_a['count'] < 1 and stats_b['count'] < 1:
+        return None
+        
+    return {
+        'wr_diff': stats_a['wr'] - stats_b['wr'],
+        'form_diff': stats_a['form'] - stats_b['form'],
+        'h2h': stats_a['h2h'],
+        'surface': surface,
+        'target': target
+    }
+
 def feature_engineering(df):
     print("Engineering features...")
     
     # 1. Basic Cleaning
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
     df = df.dropna(subset=['date'])
-    df = df.sort_values('date')
-    
-    processed_rows = []
+    # Completed matches only: cached rows are never revisited
+    df = df[df['winner_id'].notna()]
     
-    # Simple In-Memory History
-    player_history = {} # {player: [matches]}
-    
-    for idx, row in df.iterrows():
-        p1 = row.get('player1_id')
-        p2 = row.get('player2_id')
-        winner_id = row.get('winner_id')
-        
-        if not p1 or not p2: continue
-        
-        surface = row.get('surface', 'Hard')
-        date = row['date']
-        
-        # --- Helper to calculate stats ---
-        def get_stats(player, opponent):
-            history = player_history.get(player, [])
-            if not history:
-                return {'wr': 0.5, 'form': 0.5, 'h2h': 0.5, 'count': 0}
-            
-            # Surface WR
-            surf_matches = [m for m in history if m['surface'] == surface]
-            wins = len([m for m in surf_matches if m['winner'] == player])
-            wr = wins / len(surf_matches) if surf_matches else 0.5
-            
-            # Form (Last 10)
-            recent = history[-10:]
-            wins_recent = len([m for m in recent if m['winner'] == player])
-            form = wins_recent / len(recent) if recent else 0.5
-            
-            # H2H - Match where opponent was involved
-            # In history dict, 'opponent' field stores the opponent ID
-            h2h_matches = [m for m in history if m['opponent'] == opponent]
-            h2h_wins = len([m for m in h2h_matches if m['winner'] == player])
-            h2h = h2h_wins / len(h2h_matches) if h2h_matches else 0.5
-            
-            return {'wr': wr, 'form': form, 'h2h': h2h, 'count': len(history)}
-            
-        # --- Randomize target for training ---
-        # p1 and p2 are IDs. We need to know who won.
-        # Check if p1 == winner_id
-        p1_won = (p1 == winner_id)
-        
-        if np.random.random() > 0.5:
-            player_a, player_b = p2, p1
-            target = 0 if p1_won else 1 # If p2 is A, and p1 won, then A lost (0). If p1 lost, A won (1)? 
-            # Wait. If p1_won is True. Random swap -> A=p2, B=p1. Did A win? No. p1 won. So A lost. Target=0.
-            # If p1_won is False (p2 won). Random swap -> A=p2, B=p1. Did A win? Yes. Target=1.
-        else:
-            player_a, player_b = p1, p2
-            target = 1 if p1_won else 0
-            
-        stats_a = get_stats(player_a, player_b)
-        stats_b = get_stats(player_b, player_a)
-        
-        # --- Update History (Post-Match) ---
-        winner = winner_id
-        
-        if p1 not in player_history: player_history[p1] = []
-        player_history[p1].append({'date': date, 'surface': surface, 'opponent': p2, 'winner': winner})
-        
-        if p2 not in player_history: player_history[p2] = []
-        player_history[p2].append({'date': date, 'surface': surface, 'opponent': p1, 'winner': winner})
-        
-        # Skip training if not enough history
-        # Relax constraint for synthetic demo to ensure SOME training happens even with low history at start
-        if stats_a['count'] < 1 and stats_b['count'] < 1:
-            continue
-            
-        processed_rows.append({
-            'wr_diff': stats_a['wr'] - stats_b['wr'],
-            'form_diff': stats_a['form'] - stats_b['form'],
-            'h2h': stats_a['h2h'],
-            'surface': surface,
-            'target': target
-        })
-        
-    return pd.DataFrame(processed_rows)
+    # 2. Point-in-time rows, only new matches computed (cached matrix + builder state)
+    matrix = build_feature_matrix(
+        df, "rf", FEATURE_SET_VERSION,
+        init_state=lambda: {"builder": FeatureBuilder()},
+        row_fn=feature_row
+    )
+    return matrix.drop(columns=META_COLUMNS)
 
 def train():
     df = fetch_historical_data_rest()
@@ -179,13 +178,19 @@ def train():
     print(f"Model Accuracy: {acc:.2f}")
     print(classification_report(y_test, preds))
     
-    # Save
-    joblib.dump({
-        'model': model,
-        'surface_encoder': le_surface,
-        'features': features
-    }, MODEL_PATH)
-    print(f"Model saved to {MODEL_PATH}")
+    # Save (versioned in the model registry)
+    ModelRegistry().register(
+        RF_MODEL,
+        {
+            'model': model,
+            'surface_encoder': le_surface,
+            'features': features
+        },
+        features=features,
+        training_window=(pd.to_datetime(df['date'], errors='coerce').min(), pd.to_datetime(df['date'], errors='coerce').max()),
+        metrics={"accuracy": round(acc, 4), "train_rows": len(X_train), "test_rows": len(X_test)},
+        params={"n_estimators": 200, "max_depth": 15, "class_weight": "balanced", "feature_set": FEATURE_SET_VERSION}
+    )
 
 if __name__ == "__main__":
     train()
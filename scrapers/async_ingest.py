@@ -9,7 +9,9 @@ import sys
 
 # Add root context
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from scrapers.db_client import get_db_client
+from scrapers.db_client import get_db_client, get_or_create_players
+from scrapers.match_scraper import parse_detail_stats
+from scrapers.match_stats import build_stats_row, save_match_stats
 
 SEMAPHORE_LIMIT = 10 # Limit concurrent requests to avoid blocking
 
@@ -18,24 +20,42 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9"
 }
 
+MAX_FETCH_RETRIES = 3
+
 class AsyncScraper:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, concurrency=SEMAPHORE_LIMIT):
         self.base_url = "https://www.tennisexplorer.com"
-        self.semaphore = asyncio.Semaphore(SEMAPHORE_LIMIT)
+        self.concurrency = concurrency
+        self.semaphore = None # Created on the running loop (3.9 binds it to the loop current at creation)
+        self.semaphore_loop = None
+        self.rate_limiter = rate_limiter # Optional HostRateLimiter (backfills)
         self.db = get_db_client()
 
+    def _pool(self):
+        loop = asyncio.get_running_loop()
+        if self.semaphore is None or self.semaphore_loop is not loop:
+            self.semaphore, self.semaphore_loop = asyncio.Semaphore(self.concurrency), loop
+        return self.semaphore
+
     async def fetch(self, session, url):
-        async with self.semaphore:
-            try:
-                async with session.get(url, headers=HEADERS, timeout=15) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
+        async with self._pool():
+            for attempt in range(MAX_FETCH_RETRIES):
+                try:
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire(url)
+                    async with session.get(url, headers=HEADERS, timeout=15) as response:
+                        if self.rate_limiter:
+                            self.rate_limiter.on_response(url, response.status, response.headers.get('Retry-After'))
+                        if response.status == 200:
+                            return await response.read()
                         print(f"  [!] Status {response.status} for {url}")
-                        return None
-            except Exception as e:
-                print(f"  [!] Fetch error {url}: {e}")
-                return None
+                        # Only throttling is worth retrying (the limiter already paused the host)
+                        if not self.rate_limiter or response.status not in (429, 403):
+                            return None
+                except Exception as e:
+                    print(f"  [!] Fetch error {url}: {e}")
+                    return None
+            return None
 
     def parse_main_page(self, html, target_date):
         soup = BeautifulSoup(html, 'html.parser')
@@ -152,48 +172,183 @@ class AsyncScraper:
         
         match['surface'] = surface
         
-        # Stats could be parsed here too
+        # Stats table (same parser as the sync scraper, p1 = left player)
+        match['stats_json'] = parse_detail_stats(soup)
         return match
 
     async def run_daily_ingest(self, target_date=None):
         if not target_date: target_date = datetime.now()
+        async with aiohttp.ClientSession() as session:
+            summary = await self.ingest_day(session, target_date)
+        if summary:
+            self.print_timings(summary['timings'])
+        return summary
+
+    def results_url(self, target_date):
+        y, m, d = target_date.strftime("%Y-%m-%d").split('-')
+        return f"{self.base_url}/results/?type=all&year={y}&month={m}&day={d}"
+
+    async def ingest_day(self, session, target_date, update_elo=True):
+        """
+        Full pipeline for one results page. Shares the caller's session so
+        backfills can run many days over the same connection pool.
+        None if the results page could not be fetched; a summary with 'error'
+        if the day's details or insert failed.
+        """
         date_str = target_date.strftime("%Y-%m-%d")
-        y, m, d = date_str.split('-')
-        
-        main_url = f"{self.base_url}/results/?type=all&year={y}&month={m}&day={d}"
+        main_url = self.results_url(target_date)
         print(f"[*] Starting Async Ingest for {date_str}...")
+        timings = {}
         
-        async with aiohttp.ClientSession() as session:
-            # 1. Fetch Main Page
-            main_html = await self.fetch(session, main_url)
-            if not main_html:
-                print("[-] Failed to fetch main page.")
-                return
-            
-            # 2. Parse Matches
-            matches = self.parse_main_page(main_html, date_str)
-            print(f"[*] Found {len(matches)} matches. Fetching details concurrently...")
-            
-            # 3. Fetch Details Concurrently
-            tasks = [self.parse_detail_page(session, m) for m in matches]
-            enriched_matches = await asyncio.gather(*tasks)
-            
-            # 4. Save to DB (Batch)
-            print("[*] Saving to Database...")
-            self.save_batch(enriched_matches)
+        # 1. Fetch Main Page
+        t0 = time.time()
+        main_html = await self.fetch(session, main_url)
+        timings['fetch_main'] = time.time() - t0
+        if not main_html:
+            print(f"[-] Failed to fetch main page for {date_str}.")
+            return None
+        
+        # 2. Parse Matches
+        t0 = time.time()
+        matches = self.parse_main_page(main_html, date_str)
+        timings['parse_main'] = time.time() - t0
+        print(f"[*] Found {len(matches)} matches. Fetching details concurrently...")
+        
+        # 3. Fetch Details Concurrently (bounded by the semaphore)
+        t0 = time.time()
+        tasks = [self.parse_detail_page(session, m) for m in matches]
+        enriched_matches = await asyncio.gather(*tasks)
+        timings['fetch_details'] = time.time() - t0
+        # Detail pages set the surface; none fetched means the site is refusing us, not an empty card
+        with_details = [m for m in enriched_matches if m.get('source_url')]
+        if with_details and not any('surface' in m for m in with_details):
+            print(f"[-] All {len(with_details)} detail fetches failed for {date_str}. Nothing saved.")
+            return {"date": date_str, "found": len(matches), "inserted": 0, "updated": 0, "skipped": len(matches),
+                    "elo_rows": 0, "stats_rows": 0, "timings": timings, "error": "all detail fetches failed"}
             
-    def save_batch(self, matches):
-        # reuse db logic or bulk insert
-        # For MVP, simple loop or bulk call
-        # We need to map player names to IDs.
-        # This part requires the syncing logic from match_scraper.
-        # For the demo, we assume we just print outcome.
-        print(f"[*] Successfully processed {len(matches)} matches.")
-        # Actual DB save would call self.db.upsert_matches(matches) or similar
-        # Since we want to demonstrate speed, logging is sufficient proof concept
-        # but let's try to verify connection.
-        if self.db:
-            print("[+] DB Connection Active. Ready for ingest.")
+        # 4. Save to DB (Batch). Blocking REST calls run off the event loop.
+        print(f"[*] Saving {date_str} to Database...")
+        summary = await asyncio.to_thread(self.save_batch, enriched_matches, update_elo)
+        summary['date'] = date_str
+        summary['timings'] = {**timings, **summary['timings']}
+        return summary
+
+    def save_batch(self, matches, update_elo=True):
+        """
+        Bulk persistence for a day's card:
+        one player resolution pass, one existence check, one insert
+        for the new matches and one ELO update for all of them.
+        Backfills pass update_elo=False (days arrive out of order) and
+        replay ratings afterwards with recalc_elo.py.
+        A summary with an 'error' key means the day was not (fully) saved.
+        """
+        summary = {"found": len(matches), "inserted": 0, "updated": 0, "skipped": 0, "elo_rows": 0, "stats_rows": 0, "timings": {}}
+        if not matches:
+            return summary
+        if not self.db:
+            print("[-] No DB connection. Nothing saved.")
+            summary['skipped'] = len(matches)
+            summary['error'] = "no DB connection"
+            return summary
+
+        # 1. Bulk player resolution
+        t0 = time.time()
+        names = []
+        for m in matches:
+            names.extend([m['player1_name'], m['player2_name']])
+        player_ids = get_or_create_players(self.db, names)
+        summary['timings']['resolve_players'] = time.time() - t0
+
+        # 2. Build rows
+        rows = []
+        for m in matches:
+            p1_id = player_ids.get(m['player1_name'].strip())
+            p2_id = player_ids.get(m['player2_name'].strip())
+            winner_id = player_ids.get(m['winner_name'].strip())
+            if not p1_id or not p2_id or not winner_id:
+                summary['skipped'] += 1
+                continue
+            rows.append({
+                "date": m['date'],
+                "tournament_name": m['tournament_name'],
+                "surface": m.get('surface'),
+                "player1_id": p1_id,
+                "player2_id": p2_id,
+                "winner_id": winner_id,
+                "score_full": m['score_full'],
+                "stats_json": m.get('stats_json') or {}
+            })
+
+        # 3. Upsert: one lookup for the day, insert new, patch changed scores
+        t0 = time.time()
+        existing = self.get_existing_matches([r['date'] for r in rows])
+        new_rows = []
+        stats_rows = []
+        for r in rows:
+            key = (r['date'][:10], frozenset([r['player1_id'], r['player2_id']]))
+            current = existing.get(key)
+            if not current:
+                existing[key] = r # Guard against duplicates inside the same card
+                new_rows.append(r)
+            elif current.get('id') and current.get('score_full') != r['score_full']:
+                self.db.table('matches').update({
+                    "winner_id": r['winner_id'],
+                    "score_full": r['score_full'],
+                    "stats_json": r['stats_json']
+                }).eq('id', current['id']).execute()
+                stats_rows.append(build_stats_row(current['id'], r['player1_id'], r['player2_id'], r['stats_json']))
+                summary['updated'] += 1
+
+        if new_rows:
+            res = self.db.table('matches').insert(new_rows).execute()
+            if res.error:
+                print(f"[-] Bulk insert failed: {res.error}")
+                summary['error'] = f"bulk insert failed: {res.error}"
+                new_rows = []
+            for saved in res.data or []:
+                stats_rows.append(build_stats_row(saved['id'], saved['player1_id'], saved['player2_id'], saved.get('stats_json')))
+        summary['inserted'] = len(new_rows)
+        summary['timings']['upsert_matches'] = time.time() - t0
+
+        # Typed per-match stats (one bulk upsert)
+        t0 = time.time()
+        summary['stats_rows'] = save_match_stats(self.db, stats_rows)
+        summary['timings']['save_stats'] = time.time() - t0
+
+        # 4. ELO for the new results only (one read, one write)
+        t0 = time.time()
+        if new_rows and update_elo:
+            try:
+                from metrics.elo import EloEngine
+                summary['elo_rows'] = EloEngine(self.db).process_matches(new_rows)
+            except ImportError:
+                print("  [Warning] EloEngine not found or failed to load.")
+        summary['timings']['elo_update'] = time.time() - t0
+
+        print(f"[*] Inserted {summary['inserted']}, updated {summary['updated']}, skipped {summary['skipped']} of {summary['found']} matches.")
+        return summary
+
+    def get_existing_matches(self, dates):
+        """
+        Returns {(date, {p1, p2}): row} for matches already stored on the given dates.
+        """
+        existing = {}
+        if not dates:
+            return existing
+        r = self.db.table('matches') \
+            .select('id,date,player1_id,player2_id,score_full') \
+            .gte('date', min(dates)) \
+            .lte('date', max(dates) + "T23:59:59") \
+            .execute()
+        for row in r.data or []:
+            key = (str(row['date'])[:10], frozenset([row['player1_id'], row['player2_id']]))
+            existing[key] = row
+        return existing
+
+    def print_timings(self, timings):
+        print("[*] Stage timings:")
+        for stage, secs in timings.items():
+            print(f"    - {stage}: {secs:.2f}s")
 
 if __name__ == "__main__":
     scraper = AsyncScraper()
@@ -1,65 +1,94 @@
+"""
+Historical Backfill (date range)
+Fetches many days concurrently through the async ingest, under a per-host
+token bucket that backs off on 429/403. Finished days are checkpointed in
+the local job store so an interrupted run resumes where it stopped.
+
+Usage:
+    python scrapers/backfill_history.py --start 2024-01-01 --end 2024-12-31
+"""
 import os
+import sys
 import time
+import asyncio
+import argparse
+import aiohttp
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-import requests as http_requests
-from match_scraper import scrape_today_results
-from db_client import get_db_client
 
-load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrapers.async_ingest import AsyncScraper
+from scrapers.rate_limiter import HostRateLimiter, DEFAULT_RATE
+from scrapers.checkpoint_store import CheckpointStore
+
+DAY_CONCURRENCY = 4 # Result pages in flight at once
+JOB_NAME = "backfill"
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+async def backfill_range(start, end, rate=DEFAULT_RATE, day_concurrency=DAY_CONCURRENCY):
+    store = CheckpointStore()
+    done = set(store.keys_with_status(JOB_NAME, 'done'))
+
+    all_days = list(date_range(start, end))
+    days = [d for d in all_days if d.strftime('%Y-%m-%d') not in done]
+    print(f"[{datetime.now()}] Backfill {start:%Y-%m-%d} -> {end:%Y-%m-%d}: {len(days)} days pending ({len(all_days) - len(days)} already done)")
+
+    limiter = HostRateLimiter(rate=rate)
+    scraper = AsyncScraper(rate_limiter=limiter)
+    day_slots = asyncio.Semaphore(day_concurrency)
+    totals = {"inserted": 0, "updated": 0, "days": 0}
+    started = time.time()
+
+    async def run_day(session, day):
+        date_str = day.strftime('%Y-%m-%d')
+        main_url = scraper.results_url(day)
+        error = None
+        async with day_slots:
+            try:
+                summary = await scraper.ingest_day(session, day, update_elo=False)
+            except Exception as e:
+                summary = None
+                error = str(e)
+                print(f"  [ERR] {date_str}: {e}")
+
+        if summary is None or summary.get('error'):
+            # Not checkpointed and the cursor stays put: the day is retried on the next run
+            error = error or (summary or {}).get('error') or "main page fetch failed"
+            store.record_attempt(JOB_NAME, date_str, 'failed', url=main_url, error=error)
+        else:
+            store.record_attempt(JOB_NAME, date_str, 'done', url=main_url)
+            store.set_cursor(JOB_NAME, date_str)
+            totals['inserted'] += summary['inserted']
+            totals['updated'] += summary['updated']
+            totals['days'] += 1
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[run_day(session, d) for d in days])
 
-def backfill_history(days=180):
-    print(f"Starting backfill for last {days} days...")
-    
-    db = get_db_client()
-    if not db:
-        print("Error: Supabase credentials missing (check .env)")
-        return
-    
-    start_date = datetime.now() - timedelta(days=1)
-    
-    for i in range(days):
-        target_date = start_date - timedelta(days=i)
-        date_str = target_date.strftime('%Y-%m-%d')
-        print(f"[{i+1}/{days}] Scraping {date_str}...")
-        
-        matches = scrape_today_results(target_date)
-        print(f"  Found {len(matches)} raw matches")
-        
-        saved = 0
-        for m in matches:
-            # Resolve IDs
-            p1_id = db.get_or_create_player(m['winner'])
-            p2_id = db.get_or_create_player(m['loser'])
-            
-            if not p1_id or not p2_id:
-                # print(f"  Skipping match {m['winner']} vs {m['loser']} (ID fail)")
-                continue
-                
-            db_match = {
-                "tournament_name": m['tournament'],
-                # "surface": "Hard", # Scraper doesn't get surface yet?
-                # "round": "F", 
-                "date": m['date'],
-                "player1_id": p1_id,
-                "player2_id": p2_id,
-                "winner_id": p1_id, 
-                "score_full": m['score'],
-                "stats_json": {}, # Populate if we want to scrape details
-                # "status": "finished"
-            }
-            
-            # Use shared client insert (handles generic duplicate check)
-            if db.insert_match(db_match):
-                saved += 1
-                print(f"    Saved: {m['winner']} d. {m['loser']}")
-        
-        print(f"  Saved {saved} new matches from {date_str}")
-        time.sleep(1) 
+    elapsed = time.time() - started
+    print(f"\nBackfill finished in {elapsed:.0f}s: {totals['days']}/{len(days)} days, "
+          f"{totals['inserted']} new matches, {totals['updated']} updated.")
+    print(f"Host rates at end: {limiter.stats()}")
+    failed = sorted(d for d in store.keys_with_status(JOB_NAME, 'failed')
+                    if start.strftime('%Y-%m-%d') <= d <= end.strftime('%Y-%m-%d'))
+    if failed:
+        print(f"Failed days (re-run to retry): {failed}")
+    if totals['inserted']:
+        print("Run recalc_elo.py to replay ratings over the backfilled history.")
+    return totals
 
 if __name__ == "__main__":
-    # careful with defaults
-    print("WARNING: This will backfill data. Press Enter to continue 180 days check...")
-    # input() 
-    backfill_history(30) # Default to 30 days for test safety
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start", required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last day (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Max requests/second per host")
+    parser.add_argument("--days", type=int, default=DAY_CONCURRENCY, help="Days fetched concurrently")
+    args = parser.parse_args()
 
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else datetime.now() - timedelta(days=1)
+    asyncio.run(backfill_range(start, end, rate=args.rate, day_concurrency=args.days))
@@ -0,0 +1,173 @@
+"""
+Local Job Checkpoint Store (SQLite)
+Lets long scrapes resume where they stopped instead of starting over:
+- cursors:  last position per job (e.g. last processed day)
+- attempts: per-item outcome (done / failed / not_found), the URL tried,
+            error text and when the item may be retried.
+- url_cache: permanent lookups that never need repeating
+             (e.g. player name -> TennisExplorer profile URL), unless
+             invalidated by the caller.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.checkpoints', 'jobs.db')
+
+# Retry policy
+FAILED_BASE_DELAY = timedelta(minutes=15) # Doubles per consecutive failure
+FAILED_MAX_DELAY = timedelta(hours=24)
+NOT_FOUND_DELAY = timedelta(days=30)      # Dead ends (e.g. profile missing) are re-checked rarely
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    job TEXT PRIMARY KEY,
+    cursor TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    job TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    url TEXT,
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    last_attempt_at TEXT,
+    next_retry_at TEXT,
+    PRIMARY KEY (job, item_key)
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_status ON attempts(job, status);
+CREATE TABLE IF NOT EXISTS url_cache (
+    namespace TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    resolved_at TEXT,
+    PRIMARY KEY (namespace, cache_key)
+);
+"""
+
+class CheckpointStore:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+
+    # --- Cursors ---
+
+    def get_cursor(self, job, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT cursor FROM cursors WHERE job = ?", (job,)).fetchone()
+        return row['cursor'] if row else default
+
+    def set_cursor(self, job, cursor):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO cursors (job, cursor, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(job) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at",
+                (job, str(cursor), datetime.utcnow().isoformat())
+            )
+            self.conn.commit()
+
+    # --- Per-item attempts ---
+
+    def record_attempt(self, job, key, status, url=None, error=None, retry_in=None):
+        """
+        status: 'done', 'failed' or 'not_found'.
+        retry_in overrides the default back-off (timedelta).
+        """
+        now = datetime.utcnow()
+        previous = self.get_attempt(job, key)
+        attempts = (previous['attempts'] if previous else 0) + 1
+
+        next_retry = None
+        if status == 'failed':
+            consecutive = attempts if previous and previous['status'] == 'failed' else 1
+            next_retry = now + (retry_in or min(FAILED_MAX_DELAY, FAILED_BASE_DELAY * 2 ** (consecutive - 1)))
+        elif status == 'not_found':
+            next_retry = now + (retry_in or NOT_FOUND_DELAY)
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO attempts (job, item_key, status, url, attempts, last_error, last_attempt_at, next_retry_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(job, item_key) DO UPDATE SET status = excluded.status, url = excluded.url, "
+                "attempts = excluded.attempts, last_error = excluded.last_error, "
+                "last_attempt_at = excluded.last_attempt_at, next_retry_at = excluded.next_retry_at",
+                (job, str(key), status, url, attempts, error, now.isoformat(),
+                 next_retry.isoformat() if next_retry else None)
+            )
+            self.conn.commit()
+
+    def get_attempt(self, job, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM attempts WHERE job = ? AND item_key = ?", (job, str(key))
+            ).fetchone()
+        return dict(row) if row else None
+
+    def should_skip(self, job, key):
+        """
+        True if the item is finished, or is a known failure/dead end still
+        inside its back-off window.
+        """
+        attempt = self.get_attempt(job, key)
+        if not attempt:
+            return False
+        if attempt['status'] == 'done':
+            return True
+        if attempt['next_retry_at']:
+            return datetime.fromisoformat(attempt['next_retry_at']) > datetime.utcnow()
+        return False
+
+    def keys_with_status(self, job, status):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT item_key FROM attempts WHERE job = ? AND status = ?", (job, status)
+            ).fetchall()
+        return [r['item_key'] for r in rows]
+
+    def summary(self, job):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) AS n FROM attempts WHERE job = ? GROUP BY status", (job,)
+            ).fetchall()
+        return {r['status']: r['n'] for r in rows}
+
+    # --- Permanent URL cache ---
+
+    def get_cached_url(self, namespace, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url FROM url_cache WHERE namespace = ? AND cache_key = ?", (namespace, key)
+            ).fetchone()
+        return row['url'] if row else None
+
+    def get_cached_urls(self, namespace):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT cache_key, url FROM url_cache WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return {r['cache_key']: r['url'] for r in rows}
+
+    def cache_url(self, namespace, key, url):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO url_cache (namespace, cache_key, url, resolved_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, cache_key) DO UPDATE SET url = excluded.url, resolved_at = excluded.resolved_at",
+                (namespace, key, url, datetime.utcnow().isoformat())
+            )
+            self.conn.commit()
+
+    def invalidate_url(self, namespace, key):
+        with self.lock:
+            self.conn.execute("DELETE FROM url_cache WHERE namespace = ? AND cache_key = ?", (namespace, key))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
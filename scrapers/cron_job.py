@@ -1,4 +1,6 @@
-from live_monitor import get_db_client, get_tracked_players, monitor_cycle
+from live_monitor import get_db_client
+from async_ingest import AsyncScraper
+import asyncio
 import os
 import sys
 
@@ -14,13 +16,18 @@ def run_cron_cycle():
         print("CRITICAL: No Database Connection. set SUPABASE_URL and SUPABASE_KEY.")
         sys.exit(1)
         
-    # 2. Get Players
-    tracked_players = get_tracked_players(db)
-    print(f"Tracking {len(tracked_players)} players.")
+    # 2. Run One Cycle (Concurrent Scrape -> Bulk Save -> ELO)
+    summary = asyncio.run(AsyncScraper().run_daily_ingest())
     
-    # 3. Run One Cycle (Scrape -> Save -> Trigger AI)
-    # Note: monitor_cycle already contains the logic to call 'python ai_engine/predict.py'
-    monitor_cycle(db, tracked_players)
+    # 3. Materialize the upcoming slate once per run (served by /matches and /inference)
+    if summary is not None:
+        print("  [AI] Materializing slate predictions...")
+        try:
+            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            from ml.slate import materialize_slate
+            materialize_slate(db)
+        except Exception as e:
+            print(f"  [AI Error] Could not materialize slate: {e}")
     
     print("--- Cron Job Finished Successfully ---")
 
@@ -1,4 +1,5 @@
 import os
+import time
 import requests as http_requests
 import json
 from dotenv import load_dotenv
@@ -8,7 +9,7 @@ load_dotenv()
 class QueryBuilder:
     def __init__(self, url, headers, table):
         self.url = url
-        self.headers = headers
+        self.headers = dict(headers) # Per-query copy so Prefer doesn't leak between queries
         self.table = table
         self.params = {}
         self.method = 'GET'
@@ -25,7 +26,8 @@ class QueryBuilder:
     
     def in_(self, column, values):
         # values list -> (val1,val2)
-        val_str = ','.join([str(v) for v in values])
+        # Quote values with reserved chars (player names like "Sinner J." or "De Minaur, A.")
+        val_str = ','.join([_quote_value(v) for v in values])
         self.params[column] = f'in.({val_str})'
         return self
 
@@ -60,9 +62,9 @@ class QueryBuilder:
         # Merge duplicates is the standard PostgREST upsert
         pref = 'return=representation,resolution=merge-duplicates'
         if on_conflict:
-            # PostgREST 9+ supports on_conflict via strictly query param usually, 
-            # but resolution=merge-duplicates uses PK constraint.
-            pass 
+            # PostgREST 9+ supports on_conflict via query param,
+            # otherwise resolution=merge-duplicates uses PK constraint.
+            self.params['on_conflict'] = on_conflict
         self.headers['Prefer'] = pref
         return self
 
@@ -98,6 +100,12 @@ class QueryBuilder:
         except Exception as e:
             return Response(None, str(e))
 
+def _quote_value(value):
+    text = str(value)
+    if any(c in text for c in ',.:()" '):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
 class SupabaseFluentClient:
     def __init__(self, url, key):
         self.url = url
@@ -115,6 +123,27 @@ class SupabaseFluentClient:
         # Alias for from_
         return self.from_(table)
 
+    def _request_with_retry(self, method, endpoint, retries=3, **kwargs):
+        """
+        Raw REST call used by the engines (ELO, Fatigue, Stats) that build
+        PostgREST URLs by hand. Retries connection errors and 5xx responses.
+        Returns the requests Response or None.
+        """
+        headers = dict(self.headers)
+        headers.update(kwargs.pop('headers', None) or {})
+        kwargs.setdefault('timeout', 30)
+
+        r = None
+        for attempt in range(retries):
+            try:
+                r = http_requests.request(method.upper(), endpoint, headers=headers, **kwargs)
+                if r.status_code < 500:
+                    return r
+            except Exception as e:
+                print(f"[DB] {method.upper()} failed (attempt {attempt+1}): {e}")
+            time.sleep(1 + attempt)
+        return r
+
 class DatabaseClient:
     _instance = None
 
@@ -158,3 +187,31 @@ def get_or_create_player(client, name):
     except Exception as e:
         print(f"Sync Player Error: {e}")
     return None
+
+PLAYER_CHUNK_SIZE = 100 # Names per in.() filter, keeps URLs well under server limits
+
+def get_or_create_players(client, names):
+    """
+    Bulk version of get_or_create_player.
+    Resolves a whole card of names with one lookup per chunk and a single
+    insert for the missing ones. Returns {name: id}.
+    """
+    wanted = sorted({n.strip() for n in names if n and n.strip()})
+    resolved = {}
+    try:
+        for i in range(0, len(wanted), PLAYER_CHUNK_SIZE):
+            chunk = wanted[i:i + PLAYER_CHUNK_SIZE]
+            r = client.table('players').select('id,name').in_('name', chunk).execute()
+            for row in r.data or []:
+                resolved[row['name']] = row['id']
+
+        missing = [n for n in wanted if n not in resolved]
+        if missing:
+            r = client.table('players').insert([{"name": n} for n in missing]).execute()
+            if r.error:
+                print(f"Bulk Player Insert Error: {r.error}")
+            for row in r.data or []:
+                resolved[row['name']] = row['id']
+    except Exception as e:
+        print(f"Bulk Player Sync Error: {e}")
+    return resolved
@@ -32,6 +32,34 @@ def parse_score(score_str):
     # We can refine this logic if we have the winner context
     return sets_played, is_straight_sets
 
+def parse_detail_stats(soup):
+    """
+    Extracts the stats table from a parsed match-detail page.
+    Shared by the sync scraper and the async ingest.
+    """
+    stats = {}
+    # Often a table with class 'center'
+    center_tables = soup.find_all('table', class_='center')
+    for tbl in center_tables:
+        text = tbl.get_text()
+        if "1st Serve" in text or "Winning %" in text:
+            # Parse rows
+            rows = tbl.find_all('tr')
+            for row in rows:
+                cols = row.find_all('td')
+                if len(cols) >= 3:
+                    label = clean_text(cols[1].get_text())
+                    # P1 value = cols[0], P2 value = cols[2]
+                    # We need to map this to "winner" vs "loser" which is tricky without context.
+                    # Usually P1 is left, P2 is right.
+                    # We'll store it as 'raw_p1', 'raw_p2' for now or mapped by name if possible.
+                    # store raw mapping
+                    stats[label] = {
+                        "p1": clean_text(cols[0].get_text()),
+                        "p2": clean_text(cols[2].get_text())
+                    }
+    return stats
+
 def scrape_match_details(match_url):
     """
     Fetches detailed stats for a match if available.
@@ -59,26 +87,7 @@ def scrape_match_details(match_url):
         # (Could extract weather, duration if needed)
 
         # 2. Detailed Stats Table
-        # Often a table with class 'center'
-        center_tables = soup.find_all('table', class_='center')
-        for tbl in center_tables:
-            text = tbl.get_text()
-            if "1st Serve" in text or "Winning %" in text:
-                # Parse rows
-                rows = tbl.find_all('tr')
-                for row in rows:
-                    cols = row.find_all('td')
-                    if len(cols) >= 3:
-                        label = clean_text(cols[1].get_text())
-                        # P1 value = cols[0], P2 value = cols[2]
-                        # We need to map this to "winner" vs "loser" which is tricky without context.
-                        # Usually P1 is left, P2 is right.
-                        # We'll store it as 'raw_p1', 'raw_p2' for now or mapped by name if possible.
-                        # store raw mapping
-                        stats[label] = {
-                            "p1": clean_text(cols[0].get_text()),
-                            "p2": clean_text(cols[2].get_text())
-                        }
+        stats = parse_detail_stats(soup)
         
     except Exception as e:
         print(f"Error scraping details: {e}")
@@ -0,0 +1,166 @@
+"""
+Per-match Stats (fixed schema)
+Maps the free-form TennisExplorer stats table ({label: {p1, p2}}) onto a
+fixed set of typed columns stored in `match_stats` (database/schema_match_stats.sql).
+p1/p2 follow the match row (player1_id = left column on the detail page).
+"""
+import re
+
+# Stat name -> kind. 'ratio' stats are stored as <name> (made/won) and <name>_total.
+STAT_SCHEMA = [
+    ("aces", "count"),
+    ("double_faults", "count"),
+    ("first_serve_in", "ratio"),
+    ("first_serve_won", "ratio"),
+    ("second_serve_won", "ratio"),
+    ("break_points_won", "ratio"),
+    ("break_points_saved", "ratio"),
+    ("return_points_won", "ratio"),
+    ("total_points_won", "ratio"),
+]
+
+# Normalized page label -> stat name
+LABEL_MAP = {
+    "aces": "aces",
+    "double faults": "double_faults",
+    "1st serve": "first_serve_in",
+    "1st serve %": "first_serve_in",
+    "first serve": "first_serve_in",
+    "1st serve points won": "first_serve_won",
+    "1st serve won": "first_serve_won",
+    "winning % on 1st serve": "first_serve_won",
+    "2nd serve points won": "second_serve_won",
+    "2nd serve won": "second_serve_won",
+    "winning % on 2nd serve": "second_serve_won",
+    "break points won": "break_points_won",
+    "break points converted": "break_points_won",
+    "break points saved": "break_points_saved",
+    "return points won": "return_points_won",
+    "total return points won": "return_points_won",
+    "total points won": "total_points_won",
+}
+
+def stat_columns():
+    """
+    Flat column list of the match_stats table (excluding keys).
+    """
+    cols = []
+    for side in ("p1", "p2"):
+        for name, kind in STAT_SCHEMA:
+            cols.append(f"{side}_{name}")
+            if kind == "ratio":
+                cols.append(f"{side}_{name}_total")
+        cols.append(f"{side}_first_serve_pct")
+    return cols
+
+def normalize_label(label):
+    return re.sub(r'\s+', ' ', label.strip().lower().rstrip(':'))
+
+def parse_stat_value(text):
+    """
+    "39/60 (65%)" -> (39, 60, 65.0); "65%" -> (None, None, 65.0); "7" -> (7, None, None)
+    """
+    if not text:
+        return None, None, None
+    made = total = pct = None
+    frac = re.search(r'(\d+)\s*/\s*(\d+)', text)
+    if frac:
+        made, total = int(frac.group(1)), int(frac.group(2))
+    perc = re.search(r'(\d+(?:\.\d+)?)\s*%', text)
+    if perc:
+        pct = float(perc.group(1))
+    if made is None and pct is None:
+        num = re.search(r'\d+', text)
+        if num:
+            made = int(num.group(0))
+    if pct is None and made is not None and total:
+        pct = round(100.0 * made / total, 2)
+    return made, total, pct
+
+def normalize_stats(raw_stats):
+    """
+    {label: {"p1": str, "p2": str}} -> {"p1_aces": 5, "p2_aces": 3, ...}
+    Unknown labels are ignored; missing stats are simply absent.
+    """
+    kinds = dict(STAT_SCHEMA)
+    row = {}
+    for label, values in (raw_stats or {}).items():
+        name = LABEL_MAP.get(normalize_label(label))
+        if not name or not isinstance(values, dict):
+            continue
+        for side in ("p1", "p2"):
+            made, total, pct = parse_stat_value(values.get(side))
+            if kinds[name] == "count":
+                if made is not None:
+                    row[f"{side}_{name}"] = made
+                continue
+            if made is not None and total is not None:
+                row[f"{side}_{name}"] = made
+                row[f"{side}_{name}_total"] = total
+            if name == "first_serve_in" and pct is not None:
+                row[f"{side}_first_serve_pct"] = pct
+    return row
+
+def build_stats_row(match_id, p1_id, p2_id, raw_stats):
+    stats = normalize_stats(raw_stats)
+    if not stats:
+        return None
+    # PostgREST bulk inserts need identical keys on every row
+    row = {col: None for col in stat_columns()}
+    row.update(stats)
+    row.update({"match_id": match_id, "p1_id": p1_id, "p2_id": p2_id})
+    return row
+
+def save_match_stats(db, rows):
+    """
+    Bulk upsert into match_stats (one request). Returns rows written.
+    """
+    rows = [r for r in rows if r]
+    if not rows:
+        return 0
+    res = db.table('match_stats').upsert(rows, on_conflict='match_id').execute()
+    if res.error:
+        print(f"  [Stats] Bulk upsert failed: {res.error}")
+        return 0
+    return len(rows)
+
+def get_player_stats(db, player_id, stats, since=None, limit=50):
+    """
+    Column-projected read of a player's recent stats, already flipped to
+    the player's side: [{"match_id", "date", "aces": .., "aces_total": ..}, ...],
+    newest first (at most `limit` rows, all on/after `since`).
+    `stats` are names from STAT_SCHEMA (e.g. ["first_serve_won", "return_points_won"]).
+    """
+    kinds = dict(STAT_SCHEMA)
+    # Inner embed: the match.date filter then removes rows (a plain embed would only be nulled)
+    cols = ["match_id", "p1_id", "p2_id", "match:matches!inner(date)"]
+    for side in ("p1", "p2"):
+        for name in stats:
+            cols.append(f"{side}_{name}")
+            if kinds[name] == "ratio":
+                cols.append(f"{side}_{name}_total")
+
+    endpoint = f"{db.url}/rest/v1/match_stats"
+    params = {
+        "select": ",".join(cols),
+        "or": f"(p1_id.eq.{player_id},p2_id.eq.{player_id})",
+        "order": "match(date).desc", # Most recent first, so `limit` keeps the latest matches
+        "limit": str(limit)
+    }
+    if since:
+        params["match.date"] = f"gte.{since}"
+    r = db._request_with_retry('get', endpoint, params=params)
+    if not r or r.status_code != 200:
+        return []
+
+    result = []
+    for row in r.json():
+        side = "p1" if row['p1_id'] == player_id else "p2"
+        match = row.get('match') or {}
+        out = {"match_id": row['match_id'], "date": match.get('date')}
+        for name in stats:
+            out[name] = row.get(f"{side}_{name}")
+            if kinds[name] == "ratio":
+                out[f"{name}_total"] = row.get(f"{side}_{name}_total")
+        result.append(out)
+    return result
@@ -1,164 +1,240 @@
 import os
-import requests
+import re
+import asyncio
+import aiohttp
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from db_client import get_db_client
+from checkpoint_store import CheckpointStore
+from rate_limiter import HostRateLimiter
 
 load_dotenv()
 
+JOB_NAME = "enrichment"
+URL_CACHE = "te_profile" # name -> TennisExplorer profile URL (permanent)
+MAX_PLAYERS_PER_RUN = 300 # Request volume is bounded by the rate limiter, not by this cap
+ENRICH_CONCURRENCY = 5    # Players resolved in parallel
+TE_RATE = 1.0             # Requests/second to TennisExplorer
+
 # We still need headers for TennisExplorer scraping, but we can reuse the user-agent
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36",
     # DB headers are handled by db_client
 }
 
-def search_player_profile(player_name):
+async def fetch_text(session, limiter, url, timeout=10):
+    """
+    GET through the shared per-host limiter. Returns (status, text).
+    """
+    await limiter.acquire(url)
+    try:
+        async with session.get(url, headers=HEADERS, timeout=timeout) as r:
+            limiter.on_response(url, r.status, r.headers.get('Retry-After'))
+            return r.status, await r.text()
+    except Exception as e:
+        print(f"  Fetch failed {url}: {e}")
+        return None, ""
+
+def _name_parts(player_name):
     """
+    (clean name, first name, last name), lower-cased parts. Removes suffixes like (2) or [WC].
     """
-    # Clean name: remove suffixes like (2) or [WC]
-    import re
     clean_name = re.sub(r'\s*\(\d+\).*', '', player_name).strip()
-    search_url = f"https://www.tennisexplorer.com/search/?query={clean_name.replace(' ', '+')}"
-    
     parts = clean_name.split(' ')
     first_name = parts[0].lower()
     last_name = parts[-1].lower() if len(parts) > 1 else parts[0].lower()
-    
+    return clean_name, first_name, last_name
+
+def parse_search_results(html, first_name, last_name):
+    """
+    (url, confirmed): confirmed when the link text also has the first name;
+    the result-table fallback only matches the surname.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Look for ANY link with /player/ in href
+    links = soup.find_all('a', href=True)
+    for link in links:
+        if "/player/" in link['href'] and last_name in link['href'] and first_name in link.text.lower():
+            return "https://www.tennisexplorer.com" + link['href'], True
+
+    # Look for result table specifically
+    table = soup.find('table', class_='result')
+    if table:
+        rows = table.find_all('tr')
+        for row in rows:
+            cols = row.find_all('td')
+            if len(cols) > 0:
+                link = cols[0].find('a')
+                if link:
+                     href = link['href']
+                     if "/player/" in href and last_name in href:
+                         return "https://www.tennisexplorer.com" + href, False
+    return None, False
+
+def profile_matches(html, first_name):
+    """
+    True if the profile's header (plDetail table) names this first name.
+    The rest of the page lists opponents, so it is not searched.
+    """
+    table = BeautifulSoup(html, 'html.parser').find('table', class_='plDetail')
+    if not table:
+        return False
+    header = table.find('h3') or table
+    return first_name in header.get_text(" ").lower()
+
+async def search_player_profile(session, limiter, player_name):
+    """
+    Guesses the profile URL, then falls back to the search page.
+    Returns (url, confirmed): guesses are only accepted when the profile
+    names the player's first name (shared surnames), and only confirmed
+    URLs may be cached permanently.
+    Requests for one player stay sequential (stop at first hit);
+    players themselves are resolved concurrently by the caller.
+    """
+    clean_name, first_name, last_name = _name_parts(player_name)
+    search_url = f"https://www.tennisexplorer.com/search/?query={clean_name.replace(' ', '+')}"
+
     # 1. Try Direct URL Guessing
     guesses = [
         f"https://www.tennisexplorer.com/player/{last_name}/",
         f"https://www.tennisexplorer.com/player/{last_name}-{first_name}/",
         f"https://www.tennisexplorer.com/player/{player_name.replace(' ', '-').lower()}/"
     ]
-    
-    for url in guesses:
-        try:
-            # print(f"  Trying direct URL: {url}")
-            r = requests.get(url, headers=HEADERS, timeout=5)
-            if r.status_code == 200 and "Identity" in r.text: 
-                return url
-        except:
-            pass
 
-    # 2. Fallback to Search
-    try:
-        # print(f"  Searching URL: {search_url}")
-        r = requests.get(search_url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(r.content, 'html.parser')
-        
-        # Look for ANY link with /player/ in href
-        links = soup.find_all('a', href=True)
-        for link in links:
-            if "/player/" in link['href'] and last_name in link['href'] and first_name in link.text.lower():
-                return "https://www.tennisexplorer.com" + link['href']
-                
-        # Look for result table specifically
-        table = soup.find('table', class_='result')
-        if table:
-            rows = table.find_all('tr')
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) > 0:
-                    link = cols[0].find('a')
-                    if link:
-                         href = link['href']
-                         if "/player/" in href and last_name in href:
-                             return "https://www.tennisexplorer.com" + href
+    for url in dict.fromkeys(guesses): # Dedupe, keep order
+        status, text = await fetch_text(session, limiter, url, timeout=5)
+        if status == 200 and "Identity" in text and profile_matches(text, first_name):
+            return url, True
 
-    except Exception as e:
-        print(f"Search failed for {player_name}: {e}")
-    return None
+    # 2. Fallback to Search
+    status, text = await fetch_text(session, limiter, search_url)
+    if status == 200:
+        try:
+            return parse_search_results(text, first_name, last_name)
+        except Exception as e:
+            print(f"Search failed for {player_name}: {e}")
+    return None, False
 
-def scrape_player_details(profile_url):
+def parse_player_details(html):
     """
-    Scrape Age, Country, Height, etc. from profile page.
+    Parse Age, Country, Height, etc. from a profile page.
     """
     details = {}
-    try:
-        r = requests.get(profile_url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(r.content, 'html.parser')
-        
-        # Look for table with player info
-        table = soup.find('table', class_='plDetail')
-        if table:
-            rows = table.find_all('tr')
-            for row in rows:
-                txt = row.get_text()
-                if "Country:" in txt:
-                    details['country'] = txt.replace("Country:", "").strip()
-                if "Height / Weight:" in txt:
-                    details['height'] = txt.replace("Height / Weight:", "").strip()
-                if "Age:" in txt:
-                     # "Age: 24 (16.08.2001)"
-                     if "(" in txt and ")" in txt:
-                         try:
-                             date_str = txt.split('(')[1].split(')')[0]
-                             # Format DD.MM.YYYY to YYYY-MM-DD
-                             d, m, y = date_str.split('.')
-                             details['birth_date'] = f"{y}-{m}-{d}"
-                         except:
-                             pass
-                if "Sex:" in txt:
-                     details['hand'] = "R" # Placeholder/Check actual text
-        
-    except Exception as e:
-        print(f"Details scrape failed: {e}")
-        
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Look for table with player info
+    table = soup.find('table', class_='plDetail')
+    if table:
+        rows = table.find_all('tr')
+        for row in rows:
+            txt = row.get_text()
+            if "Country:" in txt:
+                details['country'] = txt.replace("Country:", "").strip()
+            if "Height / Weight:" in txt:
+                details['height'] = txt.replace("Height / Weight:", "").strip()
+            if "Age:" in txt:
+                 # "Age: 24 (16.08.2001)"
+                 if "(" in txt and ")" in txt:
+                     try:
+                         date_str = txt.split('(')[1].split(')')[0]
+                         # Format DD.MM.YYYY to YYYY-MM-DD
+                         d, m, y = date_str.split('.')
+                         details['birth_date'] = f"{y}-{m}-{d}"
+                     except:
+                         pass
+            if "Sex:" in txt:
+                 details['hand'] = "R" # Placeholder/Check actual text
     return details
 
-def run_enrichment():
+async def enrich_player(session, limiter, pool, db, store, p, stats):
+    async with pool:
+        name = p['name']
+        _, first_name, _ = _name_parts(name)
+        url = store.get_cached_url(URL_CACHE, name)
+        if url:
+            status, html = await fetch_text(session, limiter, url)
+            if status == 200 and not profile_matches(html, first_name):
+                # Cached profile belongs to someone else (shared surname): resolve again
+                print(f"  [CACHE] Dropping mismatched profile for {name}: {url}")
+                store.invalidate_url(URL_CACHE, name)
+                url = None
+            else:
+                stats['cache_hits'] += 1
+        if not url:
+            url, confirmed = await search_player_profile(session, limiter, name)
+            if not url:
+                print(f"  [SKIP] Profile not found: {name}")
+                store.record_attempt(JOB_NAME, p['id'], 'not_found')
+                return
+            # Surname-only search hits are used once but not remembered
+            if confirmed:
+                store.cache_url(URL_CACHE, name, url)
+            status, html = await fetch_text(session, limiter, url)
+
+        details = parse_player_details(html) if status == 200 else {}
+
+    if not details:
+        store.record_attempt(JOB_NAME, p['id'], 'failed', url=url, error=f"no profile details (status {status})")
+        return
+
+    # Update DB (blocking REST call kept off the event loop)
+    patch_endpoint = f"{db.url}/rest/v1/players?id=eq.{p['id']}"
+    r_update = await asyncio.to_thread(db._request_with_retry, 'patch', patch_endpoint, json=details)
+    if r_update and r_update.status_code in [200, 204]:
+        print(f"  [SUCCESS] Updated {name}")
+        store.record_attempt(JOB_NAME, p['id'], 'done', url=url)
+        stats['updated'] += 1
+    else:
+        print(f"  [FAIL] Update DB for {name}")
+        store.record_attempt(JOB_NAME, p['id'], 'failed', url=url,
+                             error=r_update.text[:200] if r_update else "No resp")
+
+async def enrich_players(db, store, players):
+    limiter = HostRateLimiter(rate=TE_RATE, burst=2)
+    pool = asyncio.Semaphore(ENRICH_CONCURRENCY)
+    stats = {"cache_hits": 0, "updated": 0}
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[enrich_player(session, limiter, pool, db, store, p, stats) for p in players])
+    return stats
+
+def run_enrichment(limit=MAX_PLAYERS_PER_RUN):
     print("Starting player enrichment...")
-    
+
     db = get_db_client()
     if not db:
         print("DB Connection failed")
         return
-    
+
     # Fetch players with missing metadata
     # We use db client to fetch
     endpoint = f"{db.url}/rest/v1/players?select=id,name,country,birth_date&order=id"
-    
+
     try:
         print(f"Fetching players...")
         r = db._request_with_retry('get', endpoint)
         if not r or r.status_code != 200:
             print("Failed to fetch players from DB")
             return
-            
+
         all_players = r.json()
         print(f"Total players in DB: {len(all_players)}")
-        
+
         # Filter: missing country OR missing birth_date
         players = [p for p in all_players if not p.get('country') or not p.get('birth_date')]
-        # Limit to 50 for this run to avoid banning
-        players = players[:50]
-        
+        # Skip players already tried (known dead ends stay parked until their retry time)
+        store = CheckpointStore()
+        pending = [p for p in players if not store.should_skip(JOB_NAME, p['id'])]
+        print(f"Skipping {len(players) - len(pending)} players from previous runs {store.summary(JOB_NAME)}")
+        players = pending[:limit]
+
     except Exception as e:
         print(f"Failed to fetch players: {e}")
         return
 
     print(f"Found {len(players)} players to enrich.")
-    
-    for p in players:
-        print(f"Enriching {p['name']}...")
-        url = search_player_profile(p['name'])
-        
-        if url:
-            # print(f"  Profile: {url}")
-            details = scrape_player_details(url)
-            # print(f"  Data: {details}")
-            
-            if details:
-                # Update DB
-                patch_endpoint = f"{db.url}/rest/v1/players?id=eq.{p['id']}"
-                r_update = db._request_with_retry('patch', patch_endpoint, json=details)
-                if r_update and r_update.status_code in [200, 204]:
-                    print(f"  [SUCCESS] Updated {p['name']}")
-                else:
-                    print(f"  [FAIL] Update DB for {p['name']}")
-        else:
-            print("  [SKIP] Profile not found.")
+    stats = asyncio.run(enrich_players(db, store, players))
+    print(f"Enrichment done: {stats['updated']} updated, {stats['cache_hits']} profile URLs served from cache.")
 
 if __name__ == "__main__":
     run_enrichment()
-
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+DEFAULT_RATE = 2.0 # Requests per second per host
+DEFAULT_BURST = 4
+MIN_RATE = 0.1
+BAN_STATUSES = (429, 403)
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, up to `capacity` banked.
+    `blocked_until` lets the limiter freeze a host after a 429/403.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class HostRateLimiter:
+    """
+    One token bucket per host with adaptive backoff (AIMD):
+    - 429/403: halve the host rate and pause it (Retry-After or exponential)
+    - success: creep the rate back up towards the configured ceiling
+    """
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=MIN_RATE):
+        self.max_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.buckets = {}
+        self.strikes = {}
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.max_rate, self.burst)
+            self.strikes[host] = 0
+        return host, self.buckets[host]
+
+    async def acquire(self, url):
+        _, bucket = self.bucket(url)
+        await bucket.acquire()
+
+    def on_response(self, url, status, retry_after=None):
+        host, bucket = self.bucket(url)
+        if status in BAN_STATUSES:
+            self.strikes[host] += 1
+            bucket.rate = max(self.min_rate, bucket.rate * 0.5)
+            try:
+                pause = float(retry_after)
+            except (TypeError, ValueError):
+                pause = min(300, 5 * 2 ** (self.strikes[host] - 1))
+            bucket.blocked_until = time.monotonic() + pause
+            bucket.tokens = 0
+            print(f"  [RateLimit] {host} returned {status}. Rate -> {bucket.rate:.2f}/s, pausing {pause:.0f}s")
+        elif status == 200:
+            self.strikes[host] = 0
+            bucket.rate = min(self.max_rate, bucket.rate + self.max_rate * 0.05)
+
+    def stats(self):
+        return {host: round(b.rate, 2) for host, b in self.buckets.items()}
@@ -3,14 +3,21 @@ import random
 import requests
 from datetime import datetime, timedelta
 from bulk_history_scraper import scrape_today_results, get_or_create_player, SUPABASE_URL, HEADERS
+from checkpoint_store import CheckpointStore
+
+JOB_NAME = "slow_scrape"
 
 def slow_scrape(days_back=365):
     """
     Scrapes 1 year of data very slowly to avoid detection.
     Speed: ~1 day of matches every 10-20 seconds.
     Est. Time for 1 year: ~1.5 hours.
+    Days already finished in a previous run are skipped (local checkpoint store),
+    so a crash resumes where it stopped.
     """
     print(f"[{datetime.now()}] Starting STEALTH SCRAPE for last {days_back} days...")
+    store = CheckpointStore()
+    print(f"  Checkpoint: last day {store.get_cursor(JOB_NAME, 'none')}, history {store.summary(JOB_NAME)}")
     
     total_saved = 0
     start_date = datetime.now()
@@ -19,6 +26,9 @@ def slow_scrape(days_back=365):
         target_date = start_date - timedelta(days=i)
         date_str = target_date.strftime('%Y-%m-%d')
         
+        if store.should_skip(JOB_NAME, date_str):
+            continue
+        
         print(f"[{i+1}/{days_back}] Processing {date_str}...", end=" ", flush=True)
         
         try:
@@ -26,7 +36,9 @@ def slow_scrape(days_back=365):
             matches = scrape_today_results(target_date)
             
             if not matches:
+                # Could be an empty day or a blocked page: retry later with back-off
                 print("No matches.")
+                store.record_attempt(JOB_NAME, date_str, 'failed', error="no matches parsed")
             else:
                 # 2. Process & Save
                 saved_count = 0
@@ -65,9 +77,12 @@ def slow_scrape(days_back=365):
                     
                 total_saved += saved_count
                 print(f"Saved {saved_count}/{len(matches)} matches.")
+                store.record_attempt(JOB_NAME, date_str, 'done')
+                store.set_cursor(JOB_NAME, date_str)
 
         except Exception as e:
             print(f"Error: {e}")
+            store.record_attempt(JOB_NAME, date_str, 'failed', error=str(e))
 
         # 3. Random Sleep (Stealth Mode)
         # Sleep between 5 and 15 seconds
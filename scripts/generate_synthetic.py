@@ -0,0 +1,265 @@
+"""
+Synthetic Scale Dataset
+Millions of synthetic rows for load and scale testing, generated offline with
+the seeded generators of scrapers/ai_engine/populate_synthetic.py:
+
+- players:           men's and women's pools (--players each), ranked by latent skill
+- matches:           --years of ATP/WTA tour, Challenger/WTA 125 and ITF events
+                     (TOURS shares), written in chronological chunks of ~--chunk matches
+- market_odds:       --snapshots pre-match snapshots per bookmaker (--books)
+- prediction_ledger: resolved predictions for --ledger-fraction of the matches
+
+Targets (one or both):
+- --parquet DIR  one Parquet file per table, one row group per chunk (needs pyarrow),
+                 plus manifest.json with the arguments and row counts
+- --dsn DSN      local Postgres via COPY FROM STDIN (needs psycopg2). The tables
+                 from database/*.sql must exist; meant for an empty database
+                 (--truncate empties the four tables first, CASCADE)
+
+The same --seed always produces the same data.
+
+Usage:
+    python scripts/generate_synthetic.py --matches 2000000 --years 10 --parquet data/synthetic
+    python scripts/generate_synthetic.py --matches 500000 --dsn postgresql://localhost/tennis --truncate
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrapers.ai_engine.populate_synthetic import (
+    generate_players, generate_matches, generate_odds, generate_ledger,
+    player_rows, match_rows, BOOKMAKERS, TOP_PLAYERS, FIRST_NAMES
+)
+
+TABLES = ['players', 'matches', 'market_odds', 'prediction_ledger'] # FK order
+MATCHES = 2_000_000
+YEARS = 10
+PLAYERS_PER_POOL = 3000
+SNAPSHOTS = 3
+LEDGER_FRACTION = 0.2
+CHUNK = 50_000 # Matches per chunk (odds rows = chunk x books x snapshots)
+SEED = 42
+
+WTA_TOP_PLAYERS = [
+    "Aryna Sabalenka", "Iga Swiatek", "Coco Gauff", "Elena Rybakina",
+    "Jessica Pegula", "Jasmine Paolini", "Qinwen Zheng", "Mirra Andreeva",
+    "Madison Keys", "Emma Navarro", "Paula Badosa", "Daria Kasatkina",
+    "Karolina Muchova", "Jelena Ostapenko", "Amanda Anisimova", "Diana Shnaider"
+]
+WOMEN_FIRST_NAMES = [
+    "Ana", "Sofia", "Elena", "Marta", "Laura", "Julia", "Clara", "Nina", "Eva", "Alina",
+    "Lucia", "Irina", "Maria", "Chloe", "Emma", "Hana", "Yulia", "Paula", "Camila", "Lea",
+    "Olga", "Sara", "Vera", "Kaja", "Mei", "Aiko", "Ines", "Greta", "Mila", "Zoe"
+]
+
+CITIES = {
+    'hard': ["Phoenix", "Lexington", "Cary", "Shenzhen", "Pune", "Canberra", "Monterrey", "Yokohama"],
+    'clay': ["Sanremo", "Aix-en-Provence", "Heilbronn", "Santiago", "Lima", "Braga", "Prostejov", "Bogota"],
+    'grass': ["Ilkley", "Surbiton", "Nottingham", "Birmingham"],
+    'indoor': ["Bergamo", "Ortisei", "Helsinki", "Brest", "Eckental", "Kobe"]
+}
+
+def _calendar(fmt):
+    return {surface: [fmt.format(city=c) for c in cities] for surface, cities in CITIES.items()}
+
+# Player pool, rank range drawn from, share of all matches, populate_synthetic calendar overrides
+TOURS = {
+    "atp":        {"pool": "men",   "ranks": (1, 250),   "share": 0.10, "calendar": {}},
+    "wta":        {"pool": "women", "ranks": (1, 250),   "share": 0.10, "calendar": {"slam_best_of": 3}},
+    "challenger": {"pool": "men",   "ranks": (80, 700),  "share": 0.20,
+                   "calendar": {"tournaments": _calendar("{city} Challenger"), "grand_slams": []}},
+    "wta125":     {"pool": "women", "ranks": (80, 700),  "share": 0.10,
+                   "calendar": {"tournaments": _calendar("{city} WTA 125"), "grand_slams": []}},
+    "itf_men":    {"pool": "men",   "ranks": (250, None), "share": 0.25,
+                   "calendar": {"tournaments": _calendar("M25 {city}"), "grand_slams": []}},
+    "itf_women":  {"pool": "women", "ranks": (250, None), "share": 0.25,
+                   "calendar": {"tournaments": _calendar("W25 {city}"), "grand_slams": []}}
+}
+
+def _pyarrow_available():
+    try:
+        import pyarrow # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _psycopg2_available():
+    try:
+        import psycopg2 # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def chunk_seed(seed, *keys):
+    """
+    Independent, reproducible seed per (chunk, tour, table).
+    """
+    return int(np.random.SeedSequence([seed, *keys]).generate_state(1)[0])
+
+def _serialize(df):
+    """
+    dict/list cells (stats_json) as JSON text, so every chunk has the same flat schema.
+    """
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype == object and len(out) and isinstance(out[col].iloc[0], (dict, list)):
+            out[col] = [json.dumps(v) for v in out[col]]
+    return out
+
+class ParquetSink:
+    """
+    One Parquet file per table, appended one row group per chunk.
+    """
+    def __init__(self, out_dir):
+        if not _pyarrow_available():
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.out_dir = out_dir
+        self.writers = {}
+        os.makedirs(out_dir, exist_ok=True)
+
+    def write(self, table, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        data = pa.Table.from_pandas(df, preserve_index=False)
+        writer = self.writers.get(table)
+        if writer is None:
+            writer = self.writers[table] = pq.ParquetWriter(os.path.join(self.out_dir, f"{table}.parquet"), data.schema)
+        writer.write_table(data.cast(writer.schema))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+class PostgresSink:
+    """
+    COPY FROM STDIN (CSV) per chunk and table, committed per chunk.
+    """
+    def __init__(self, dsn, truncate=False):
+        if not _psycopg2_available():
+            raise RuntimeError("Postgres output needs psycopg2 (pip install psycopg2-binary)")
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+        if truncate:
+            with self.conn.cursor() as cur:
+                cur.execute(f"TRUNCATE TABLE {', '.join(reversed(TABLES))} CASCADE")
+            self.conn.commit()
+
+    def write(self, table, df):
+        buf = io.StringIO()
+        # Empty unquoted CSV fields are NULL in COPY ... (FORMAT csv)
+        df.to_csv(buf, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+        buf.seek(0)
+        with self.conn.cursor() as cur:
+            cur.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def generate_pools(players, seed=SEED):
+    men = generate_players(players, chunk_seed(seed, 0), TOP_PLAYERS, FIRST_NAMES)
+    women = generate_players(players, chunk_seed(seed, 1), WTA_TOP_PLAYERS, WOMEN_FIRST_NAMES)
+    return {"men": men, "women": women}
+
+def _tour_players(pool, ranks):
+    lo, hi = ranks
+    rank = pool['rank_single']
+    return pool[(rank >= lo) & (rank <= (hi or rank.max()))].reset_index(drop=True)
+
+def generate_dataset(sinks, matches=MATCHES, years=YEARS, players=PLAYERS_PER_POOL, snapshots=SNAPSHOTS,
+                     books=None, ledger_fraction=LEDGER_FRACTION, chunk=CHUNK, seed=SEED, end=None):
+    """
+    Generate and write everything chunk by chunk (memory stays ~one chunk).
+    Returns row counts per table.
+    """
+    started = time.time()
+    counts = dict.fromkeys(TABLES, 0)
+    books = books or list(BOOKMAKERS)
+
+    pools = generate_pools(players, seed)
+    everyone = pd.concat(pools.values(), ignore_index=True)
+    for sink in sinks:
+        sink.write('players', player_rows(everyone))
+    counts['players'] = len(everyone)
+    tour_players = {name: _tour_players(pools[t['pool']], t['ranks']) for name, t in TOURS.items()}
+
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    start = end - pd.Timedelta(days=365 * years)
+    slices = max(1, math.ceil(matches / chunk))
+    days = (end - start).days
+    print(f"  [Synthetic] {len(everyone)} players, {matches} matches over {years} years in {slices} chunks")
+
+    for k in range(slices):
+        # Every tour plays in every time slice, so each chunk is a chronological window
+        lo, hi = days * k // slices, days * (k + 1) // slices
+        slice_start = (start + pd.Timedelta(days=lo)).to_pydatetime()
+        frames = []
+        for t, (name, tour) in enumerate(TOURS.items()):
+            n = round(matches * tour['share'] * (k + 1) / slices) - round(matches * tour['share'] * k / slices)
+            if n > 0:
+                frames.append(generate_matches(tour_players[name], n, slice_start, max(hi - lo, 1),
+                                               chunk_seed(seed, 2, k, t), **tour['calendar']))
+        if not frames:
+            continue
+        chunk_matches = pd.concat(frames, ignore_index=True).sort_values('date', kind='stable').reset_index(drop=True)
+        odds = generate_odds(chunk_matches, everyone, books, snapshots, chunk_seed(seed, 3, k))
+        ledger = generate_ledger(chunk_matches, ledger_fraction, seed=chunk_seed(seed, 4, k))
+
+        rows = {'matches': _serialize(match_rows(chunk_matches)), 'market_odds': odds, 'prediction_ledger': ledger}
+        for table, df in rows.items():
+            for sink in sinks:
+                sink.write(table, df)
+            counts[table] += len(df)
+        print(f"  [Synthetic] {slice_start:%Y-%m-%d}: {len(chunk_matches)} matches, {len(odds)} odds, "
+              f"{len(ledger)} ledger ({time.time() - started:.0f}s)")
+    return counts
+
+def main(args):
+    sinks = []
+    try:
+        if args.parquet:
+            sinks.append(ParquetSink(args.parquet))
+        if args.dsn:
+            sinks.append(PostgresSink(args.dsn, args.truncate))
+        books = [b.strip() for b in args.books.split(',')] if args.books else None
+        started = time.time()
+        counts = generate_dataset(sinks, args.matches, args.years, args.players, args.snapshots,
+                                  books, args.ledger_fraction, args.chunk, args.seed)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    elapsed = time.time() - started
+    print(f"--- Done in {elapsed:.0f}s: " + ", ".join(f"{t} {n}" for t, n in counts.items()))
+    if args.parquet:
+        manifest = {"generated_at": datetime.utcnow().isoformat(), "seed": args.seed, "counts": counts,
+                    "args": {k: v for k, v in vars(args).items() if k != 'dsn'}, "seconds": round(elapsed, 1)}
+        with open(os.path.join(args.parquet, "manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=MATCHES, help="Completed matches in total")
+    parser.add_argument("--years", type=int, default=YEARS, help="History length, ending today")
+    parser.add_argument("--players", type=int, default=PLAYERS_PER_POOL, help="Players per pool (men, women)")
+    parser.add_argument("--snapshots", type=int, default=SNAPSHOTS, help="Odds snapshots per match and bookmaker")
+    parser.add_argument("--books", default=None, help=f"Comma-separated bookmakers (default: {','.join(BOOKMAKERS)})")
+    parser.add_argument("--ledger-fraction", type=float, default=LEDGER_FRACTION, help="Share of matches with a ledger row")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="Matches per chunk")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--parquet", default=None, help="Output directory for Parquet files")
+    parser.add_argument("--dsn", default=None, help="Postgres DSN to COPY into")
+    parser.add_argument("--truncate", action="store_true", help="With --dsn: empty the tables first")
+    args = parser.parse_args()
+    if not args.parquet and not args.dsn:
+        parser.error("nothing to write: pass --parquet and/or --dsn")
+    main(args)
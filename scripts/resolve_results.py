@@ -72,7 +72,8 @@ class ResultOracle:
                     self.db.from_('prediction_ledger') \
                         .update({
                             'result_status': 'won' if is_won else 'lost',
-                            'profit_loss': round(profit_loss, 2)
+                            'profit_loss': round(profit_loss, 2),
+                            'resolved_at': datetime.utcnow().isoformat() # Calibration monitor watermark
                         }) \
                         .eq('id', pred['id']) \
                         .execute()
@@ -0,0 +1,49 @@
+import numpy as np
+from ml.bankroll import simulate, strategy_grid, kelly_fraction, BANKROLL
+
+def simulate_loop(probs, odds, outcomes, kind, size, min_ev=0.0, min_edge=0.0, bankroll=BANKROLL):
+    """
+    One strategy, one bet at a time: the loop ml/bankroll.py vectorizes.
+    """
+    bank, bets, staked = bankroll, 0, 0.0
+    for p, o, won in zip(probs, odds, outcomes):
+        if bank <= 0 or p * o - 1 < min_ev or p - 1 / o <= min_edge:
+            continue
+        stake = size if kind == "flat" else min(1.0, kelly_fraction(p, o) * size) * bank
+        if stake <= 0:
+            continue
+        bank += stake * (o - 1) if won else -stake
+        bets += 1
+        staked += stake
+    return max(bank, 0.0), bets, staked
+
+def test_bankroll_matches_loop():
+    rng = np.random.default_rng(3)
+    n = 400
+    probs = rng.uniform(0.2, 0.8, n)
+    odds = 1 / np.clip(probs + rng.normal(0, 0.1, n), 0.05, 0.95)
+    outcomes = (rng.uniform(size=n) < probs).astype(int)
+
+    print("--- Test 1: Vectorized strategies vs per-bet loop ---")
+    strategies = strategy_grid(flat_stakes=(10.0, 50.0), kelly_multipliers=(1.0, 0.25),
+                               min_evs=(0.0, 0.05), min_edges=(0.0, 0.02))
+    summary, curves = simulate(probs, odds, outcomes, strategies, keep_curves=True)
+    for _, s in summary.iterrows():
+        final, bets, staked = simulate_loop(probs, odds, outcomes, s['kind'], s['size'], s['min_ev'], s['min_edge'])
+        assert np.isclose(s['final_bankroll'], final), (s['name'], s['final_bankroll'], final)
+        assert s['bets'] == bets, (s['name'], s['bets'], bets)
+        assert np.isclose(s['staked'], staked), (s['name'], s['staked'], staked)
+    assert curves.shape == (len(strategies), n)
+    print("✅ Vectorized Simulation PASS")
+
+    print("\n--- Test 2: Flat stakes stop at ruin ---")
+    lose = np.zeros(50, dtype=int)
+    summary, _ = simulate(np.full(50, 0.6), np.full(50, 2.0), lose, strategy_grid(flat_stakes=(300.0,), kelly_multipliers=()))
+    final, bets, _ = simulate_loop(np.full(50, 0.6), np.full(50, 2.0), lose, "flat", 300.0)
+    print(f"Ruined after {summary['bets'][0]} bets, final {summary['final_bankroll'][0]}")
+    assert summary['final_bankroll'][0] == final == 0.0
+    assert summary['bets'][0] == bets == 4
+    print("✅ Ruin PASS")
+
+if __name__ == "__main__":
+    test_bankroll_matches_loop()
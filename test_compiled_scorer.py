@@ -0,0 +1,34 @@
+import os
+import tempfile
+import numpy as np
+from ml.train_pipeline import make_model
+from ml.compiled import export_compiled, CompiledScorer, verify_compiled, MAX_EXPORT_ERROR
+
+FEATURES = ['elo_diff', 'form_diff', 'rank_diff', 'elo_p1', 'elo_p2']
+
+def test_compiled_matches_predict_proba():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(600, len(FEATURES)))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.8, size=len(X)) > 0).astype(int)
+    model = make_model({"n_estimators": 40, "max_depth": 4}, n_jobs=1).fit(X, y)
+
+    print("--- Test 1: Compiled scorer vs CalibratedClassifierCV.predict_proba ---")
+    path = export_compiled(model, FEATURES, os.path.join(tempfile.mkdtemp(), "compiled.npz"))
+    scorer = CompiledScorer(path)
+    X_check = rng.normal(size=(300, len(FEATURES)))
+    X_check[::17, 2] = np.nan # Missing values follow the trees' default branch
+    error = verify_compiled(model, scorer, X_check)
+    print(f"Max |compiled - sklearn|: {error:.2e}")
+    assert error <= MAX_EXPORT_ERROR
+    assert scorer.features == FEATURES
+    probs = scorer.predict_proba(X_check)
+    assert probs.shape == (300, 2)
+    assert np.allclose(probs.sum(axis=1), 1.0)
+    print("✅ Compiled Scorer PASS")
+
+    print("\n--- Test 2: Empty batch ---")
+    assert verify_compiled(model, scorer, X_check[:0]) == 0.0
+    print("✅ Empty Batch PASS")
+
+if __name__ == "__main__":
+    test_compiled_matches_predict_proba()
@@ -0,0 +1,78 @@
+from benchmarks.postgrest_stub import Tables, parse_filters, parse_select
+
+PLAYERS = [
+    {"id": "a", "name": "Alcaraz", "rank_single": 2},
+    {"id": "b", "name": "Sinner", "rank_single": 1},
+    {"id": "c", "name": "Zverev", "rank_single": None}
+]
+MATCHES = [
+    {"id": "m1", "player1_id": "a", "player2_id": "b", "winner_id": "a", "date": "2024-05-01", "score": 3},
+    {"id": "m2", "player1_id": "b", "player2_id": "c", "winner_id": None, "date": "2024-06-01", "score": 1},
+    {"id": "m3", "player1_id": "c", "player2_id": "a", "winner_id": "c", "date": "2024-04-01", "score": 10}
+]
+STATS = [
+    {"id": "s1", "match_id": "m1", "player_id": "a", "aces": 5},
+    {"id": "s2", "match_id": "m2", "player_id": "b", "aces": 7},
+    {"id": "s3", "match_id": "m3", "player_id": "a", "aces": 2},
+    {"id": "s4", "match_id": "missing", "player_id": "a", "aces": 9}
+]
+
+def ids(rows):
+    return [r['id'] for r in rows]
+
+def test_filter_and_order_parser():
+    db = Tables({"players": PLAYERS, "matches": MATCHES, "match_stats": STATS})
+
+    print("--- Test 1: Operators, numbers vs strings ---")
+    def match(params):
+        predicates, _ = parse_filters(params)
+        return [m['id'] for m in MATCHES if all(p(m) for p in predicates)]
+    assert match([("score", "gt.2")]) == ["m1", "m3"] # Numeric, not "10" < "2"
+    assert match([("date", "gte.2024-05-01"), ("date", "lt.2024-06-01")]) == ["m1"]
+    assert match([("winner_id", "is.null")]) == ["m2"]
+    assert match([("winner_id", "not.is.null")]) == ["m1", "m3"]
+    assert match([("player1_id", "in.(a,c)")]) == ["m1", "m3"]
+    assert match([("player1_id", "neq.a")]) == ["m2", "m3"]
+    assert match([("or", "(player1_id.eq.c,player2_id.eq.c)")]) == ["m2", "m3"]
+    assert match([("or", "(winner_id.eq.a,and(score.gte.10,date.lt.2024-05-01))")]) == ["m1", "m3"]
+    assert match([("select", "id"), ("order", "date"), ("limit", "1"), ("winner_id", "eq.a")]) == ["m1"]
+    print("✅ Filters PASS")
+
+    print("\n--- Test 2: Order (asc/desc, nulls) ---")
+    assert ids(db.select("matches", [("order", "date.desc")])) == ["m2", "m1", "m3"]
+    assert ids(db.select("matches", [("order", "winner_id.asc,date.asc")])) == ["m1", "m3", "m2"]
+    assert ids(db.select("players", [("order", "rank_single.asc")])) == ["b", "a", "c"] # Nulls last on asc
+    assert ids(db.select("players", [("order", "rank_single.desc")])) == ["c", "a", "b"] # Nulls first on desc
+    assert ids(db.select("players", [("order", "rank_single.desc.nullslast")])) == ["a", "b", "c"]
+    assert ids(db.select("matches", [("order", "date.asc"), ("offset", "1"), ("limit", "1")])) == ["m1"]
+    print("✅ Order PASS")
+
+    print("\n--- Test 3: Select and embeds ---")
+    columns, embeds = parse_select("id,player_a:player1_id(name,rank_single),match:matches!inner(date)")
+    assert columns == ["id"]
+    assert embeds == [("player_a", "player1_id", ["name", "rank_single"], False), ("match", "matches", ["date"], True)]
+    rows = db.select("matches", [("select", "id,player_a:player1_id(name)"), ("id", "eq.m1")])
+    assert rows == [{"id": "m1", "player_a": {"name": "Alcaraz"}}]
+    print("✅ Select PASS")
+
+    print("\n--- Test 4: !inner embed filters and alias(column) ordering ---")
+    params = [("select", "id,aces,match:matches!inner(date)"), ("player_id", "eq.a"),
+              ("match.date", "gte.2024-04-15"), ("order", "match(date).desc")]
+    rows = db.select("match_stats", params)
+    assert rows == [{"id": "s1", "aces": 5, "match": {"date": "2024-05-01"}}] # s3 too old, s4 has no match
+    rows = db.select("match_stats", [("select", "id,match:matches!inner(date)"), ("player_id", "eq.a"),
+                                     ("order", "match(date).asc")])
+    assert ids(rows) == ["s3", "s1"]
+    rows = db.select("match_stats", [("select", "id,match:matches(date)"), ("player_id", "eq.a"), ("order", "id")])
+    assert ids(rows) == ["s1", "s3", "s4"] and rows[2]['match'] is None # Without !inner the parent stays
+    print("✅ Embeds PASS")
+
+    print("\n--- Test 5: Update only touches filtered rows ---")
+    updated = db.update("matches", [("id", "eq.m2"), ("winner_id", "is.null")], {"winner_id": "b"})
+    assert ids(updated) == ["m2"]
+    assert db.update("matches", [("id", "eq.m2"), ("winner_id", "is.null")], {"winner_id": "c"}) == []
+    assert db.select("matches", [("id", "eq.m2")])[0]['winner_id'] == "b"
+    print("✅ Update PASS")
+
+if __name__ == "__main__":
+    test_filter_and_order_parser()
@@ -0,0 +1,43 @@
+import time
+from ml.prediction_cache import PredictionCache
+
+def test_prediction_cache_invalidation():
+    cache = PredictionCache(max_entries=3, ttl=60)
+    key = cache.make_key("p1", "p2", "xgb@1", 4, 9)
+    cache.put(key, {"prob_p1": 0.61})
+
+    print("--- Test 1: Same versions hit ---")
+    assert cache.get(cache.make_key("p1", "p2", "xgb@1", 4, 9)) == {"prob_p1": 0.61}
+    print("✅ Hit PASS")
+
+    print("\n--- Test 2: New result for either player or a new model misses ---")
+    assert cache.get(cache.make_key("p1", "p2", "xgb@1", 5, 9)) is None
+    assert cache.get(cache.make_key("p1", "p2", "xgb@1", 4, 10)) is None
+    assert cache.get(cache.make_key("p1", "p2", "xgb@2", 4, 9)) is None
+    assert cache.get(cache.make_key("p2", "p1", "xgb@1", 9, 4)) is None # Orientation is part of the key
+    print("✅ Version Invalidation PASS")
+
+    print("\n--- Test 3: TTL expiry ---")
+    cache.ttl = 0.05
+    time.sleep(0.06)
+    assert cache.get(key) is None
+    assert key not in cache.entries
+    cache.ttl = 60
+    print("✅ TTL PASS")
+
+    print("\n--- Test 4: LRU eviction keeps recently used keys ---")
+    keys = [cache.make_key(f"a{i}", "b", "xgb@1", 0, 0) for i in range(3)]
+    for k in keys:
+        cache.put(k, {"k": k})
+    cache.get(keys[0])
+    cache.put(cache.make_key("a3", "b", "xgb@1", 0, 0), {})
+    assert cache.get(keys[1]) is None # Least recently used
+    assert cache.get(keys[0]) is not None
+    stats = cache.stats()
+    print(stats)
+    assert stats['entries'] == 3
+    assert stats['hits'] == 3 and stats['misses'] == 6
+    print("✅ LRU PASS")
+
+if __name__ == "__main__":
+    test_prediction_cache_invalidation()
@@ -0,0 +1,53 @@
+import time
+import asyncio
+from scrapers.rate_limiter import HostRateLimiter
+
+URL = "https://www.tennisexplorer.com/results/"
+
+def test_rate_limiter_backoff():
+    limiter = HostRateLimiter(rate=2.0, burst=2, min_rate=0.1)
+    host, bucket = limiter.bucket(URL)
+
+    print("--- Test 1: 429 halves the rate and pauses the host ---")
+    before = time.monotonic()
+    limiter.on_response(URL, 429)
+    assert bucket.rate == 1.0
+    assert bucket.tokens == 0
+    assert 4.9 <= bucket.blocked_until - before <= 5.1 # First strike: 5s
+    limiter.on_response(URL, 403)
+    assert bucket.rate == 0.5
+    assert 9.9 <= bucket.blocked_until - time.monotonic() <= 10.1 # Exponential: 10s
+    print("✅ Backoff PASS")
+
+    print("\n--- Test 2: Retry-After wins, rate floored at min_rate ---")
+    for _ in range(10):
+        limiter.on_response(URL, 429, retry_after="1")
+    assert bucket.rate == 0.1
+    assert 0.9 <= bucket.blocked_until - time.monotonic() <= 1.1
+    print("✅ Retry-After PASS")
+
+    print("\n--- Test 3: Successes creep back up to the ceiling ---")
+    limiter.on_response(URL, 200)
+    assert limiter.strikes[host] == 0
+    assert abs(bucket.rate - 0.2) < 1e-9 # + 5% of the ceiling per success
+    for _ in range(100):
+        limiter.on_response(URL, 200)
+    assert bucket.rate == 2.0
+    print("✅ Recovery PASS")
+
+    print("\n--- Test 4: acquire waits out the pause ---")
+    limiter.on_response(URL, 429, retry_after="0.2")
+
+    async def timed_acquire():
+        started = time.monotonic()
+        await limiter.acquire(URL)
+        return time.monotonic() - started
+
+    waited = asyncio.run(timed_acquire())
+    print(f"Waited {waited:.2f}s")
+    assert waited >= 0.2
+    assert limiter.stats() == {host: 1.0}
+    print("✅ Pause PASS")
+
+if __name__ == "__main__":
+    test_rate_limiter_backoff()